@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Load test of the dashboard API (phase5_dashboard/api_server.py): N concurrent
+simulated dashboards each repeatedly load the five endpoints the way
+js/data.js does (revalidating with If-None-Match, accepting gzip).
+
+By default an in-process server is started over synthetic data (a scratch
+database on --uri, or mongomock when no --uri is given), once with the
+response cache and once without it, with --db-latency seconds added to every
+query to stand in for the Atlas round trip. --url load-tests a running server.
+
+    python benchmarks/bench_api.py --clients 200 --duration 10 --db-latency 0.03
+    python benchmarks/bench_api.py --url http://localhost:5000/api --clients 200
+"""
+import argparse
+import asyncio
+import functools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from statistics import quantiles
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase5_dashboard'))
+
+import aiohttp
+from aiohttp import web
+
+import replay  # pins the offline environment before config is read
+import api_server
+
+DASHBOARD_REQUESTS = [
+    "/sentiment/summary?days=30&source=all",
+    "/sp500/returns?days=30",
+    "/correlation/data?days=30",
+    "/news/recent?limit=10&source=all",
+    "/metrics/performance",
+]
+
+
+def seed(db, days=400, articles_per_day=50, seed=0):
+    rng = random.Random(seed)
+    today = datetime.now(timezone.utc).date()
+    dates = [(today - timedelta(days=d)).isoformat() for d in range(days)]
+    labels = ["positive", "neutral", "negative"]
+    db[api_server.NEWS_COLLECTION].insert_many([
+        {"title": f"Article {d} {i}", "source": rng.choice(list(api_server.SOURCE_NAMES.values())),
+         "publishedAt": f"{d}T{rng.randrange(24):02d}:00:00Z", "url": f"https://example.com/{d}/{i}",
+         "sentiment": rng.choice(labels)}
+        for d in dates for i in range(articles_per_day)
+    ])
+    summaries = []
+    for d in dates:
+        counts = {label: rng.randrange(articles_per_day) for label in labels}
+        count = sum(counts.values()) or 1
+        summaries.append({"date": d, "count": count, **counts,
+                          "average_score": (counts["positive"] - counts["negative"]) / count})
+    db[api_server.SUMMARY_COLLECTION].insert_many(summaries)
+    db[api_server.RETURNS_COLLECTION].insert_many(
+        [{"Date": d, "Close": 5000.0, "Return": rng.gauss(0, 0.01)} for d in dates])
+    db[api_server.CORRELATION_COLLECTION].insert_many(
+        [{"date": s["date"], "overall_sentiment": "overall_positive" if s["average_score"] >= 0 else "overall_negative",
+          "correlation_with_market": rng.uniform(-1, 1)} for s in summaries])
+    db[api_server.MATCH_COLLECTION].insert_many(
+        [{"date": d, "match": rng.randrange(2), "return": 0.01} for d in dates])
+
+
+def add_db_latency(seconds):
+    """Make every endpoint query sleep first, like a remote database would."""
+    for name in ("sentiment_summary", "correlation_data", "recent_news", "sp500_returns", "performance_metrics"):
+        query = getattr(api_server, name)
+
+        @functools.wraps(query)
+        def slow(*args, _query=query, **kwargs):
+            time.sleep(seconds)
+            return _query(*args, **kwargs)
+        setattr(api_server, name, slow)
+
+
+async def dashboard_client(session, base_url, deadline, latencies, statuses):
+    etags = {}
+    while time.perf_counter() < deadline:
+        for path in DASHBOARD_REQUESTS:
+            headers = {"Accept-Encoding": "gzip"}
+            if path in etags:
+                headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            async with session.get(base_url + path, headers=headers) as resp:
+                await resp.read()
+                if "ETag" in resp.headers:
+                    etags[path] = resp.headers["ETag"]
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            latencies.append(time.perf_counter() - start)
+
+
+async def load_test(base_url, clients, duration):
+    latencies, statuses = [], {}
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(dashboard_client(session, base_url, deadline, latencies, statuses)
+                               for _ in range(clients)))
+    return latencies, statuses
+
+
+def report(label, latencies, statuses, duration, cache=None):
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    line = (f"{label:<10} {len(latencies) / duration:9.0f} req/s   p50 {cuts[49] * 1000:7.1f} ms   "
+            f"p95 {cuts[94] * 1000:7.1f} ms   statuses {dict(sorted(statuses.items()))}")
+    if cache is not None:
+        line += f"   db queries {cache.misses}"
+    print(line)
+
+
+async def run_local(db, clients, duration, cache_ttl):
+    app = api_server.create_app(db, cache_ttl=cache_ttl)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        latencies, statuses = await load_test(f"http://127.0.0.1:{port}/api", clients, duration)
+    finally:
+        await runner.cleanup()
+    return latencies, statuses, app["cache"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100, help="concurrent dashboards")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--url", help="load-test a running server instead (e.g. http://localhost:5000/api)")
+    parser.add_argument("--uri", help="MongoDB URI for a scratch database (default: mongomock)")
+    parser.add_argument("--db-latency", type=float, default=0.03, help="seconds added to every query")
+    args = parser.parse_args()
+
+    if args.url:
+        latencies, statuses = asyncio.run(load_test(args.url.rstrip("/"), args.clients, args.duration))
+        report("server", latencies, statuses, args.duration)
+        return
+
+    if args.uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.uri)
+        client.drop_database("bench_api")
+        db = client["bench_api"]
+    else:
+        import mongomock
+        db = mongomock.MongoClient()["bench_api"]
+    seed(db)
+    add_db_latency(args.db_latency)
+
+    print(f"{args.clients} dashboards, {args.duration:.0f}s per run, +{args.db_latency * 1000:.0f} ms per query")
+    for label, ttl in (("no cache", 0), ("cached", 30)):
+        latencies, statuses, cache = asyncio.run(run_local(db, args.clients, args.duration, ttl))
+        report(label, latencies, statuses, args.duration, cache)
+
+    if args.uri:
+        client.drop_database("bench_api")
+
+
+if __name__ == "__main__":
+    main()
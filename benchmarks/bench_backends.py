@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Accuracy-parity check and latency/throughput/RSS benchmark for each
+sentiment inference backend (torch fp32, int8 dynamic quantization, ONNX).
+
+Every backend runs in its own subprocess (SENTIMENT_BACKEND=<name>) so the
+reported RSS belongs to that backend alone. Labels on the fixture set are
+compared against the fp32 torch labels.
+
+    python benchmarks/bench_backends.py --n 512
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase2_sentiment_analysis'))
+
+from synthetic import synthetic_texts
+
+# Fixed fixture set for label parity; keep stable so results compare across commits
+PARITY_FIXTURES = [
+    "The Federal Reserve raised interest rates by 25 basis points, in line with expectations.",
+    "Stocks tumbled as inflation came in far hotter than forecast.",
+    "The S&P 500 closed at a record high after strong earnings from tech giants.",
+    "Unemployment rose to its highest level in two years, fueling recession fears.",
+    "GDP growth beat estimates, signalling a resilient economy.",
+    "The VIX spiked above 30 as investors rushed for safety.",
+    "Shares of the target surged 40% after the merger was announced.",
+    "The company cut its full-year guidance, citing weak demand.",
+    "Treasury yields were little changed ahead of the CPI release.",
+    "Analysts expect earnings season to be mixed.",
+    "Producer prices fell unexpectedly in March.",
+    "The acquisition was blocked by regulators, sending shares lower.",
+    "Consumer confidence improved for a third straight month.",
+    "Oil prices slid on concerns about slowing global growth.",
+    "The central bank left policy unchanged and offered no new guidance.",
+    "Bank stocks rallied after the stress test results were released.",
+    "Retail sales disappointed, dragging the index down 1.5%.",
+    "Volatility remained subdued through the holiday-shortened week.",
+    "The Fed signalled that rate cuts could begin later this year.",
+    "Job growth slowed sharply, but wages held firm.",
+]
+
+
+def _rss_mb():
+    """Current resident set size in MB (Linux /proc, falling back to peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_single_backend(n, batch_size):
+    """Runs inside the child process; returns a dict of measurements."""
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    import sentiment_analysis
+    sentiment_analysis.get_backend()
+    load_s = time.perf_counter() - t0
+
+    fixtures = [label for label, _ in sentiment_analysis.analyze_sentiment_batch(PARITY_FIXTURES)]
+
+    texts = synthetic_texts(n)
+    sentiment_analysis.analyze_sentiment(texts[0])
+    latencies = []
+    for t in texts[:min(len(texts), 100)]:
+        s = time.perf_counter()
+        sentiment_analysis.analyze_sentiment(t)
+        latencies.append((time.perf_counter() - s) * 1000)
+
+    t0 = time.perf_counter()
+    sentiment_analysis.analyze_sentiment_batch(texts, batch_size)
+    batch_s = time.perf_counter() - t0
+
+    return {
+        "backend": sentiment_analysis.BACKEND,
+        "load_s": load_s,
+        "latency_ms_p50": statistics.median(latencies),
+        "latency_ms_p95": sorted(latencies)[int(len(latencies) * 0.95) - 1],
+        "throughput_per_s": len(texts) / batch_s,
+        "rss_mb": _rss_mb(),
+        "model_rss_mb": _rss_mb() - rss_before,
+        "fixture_labels": fixtures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=256, help="texts for the throughput run")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--backends", default="torch,quantized,onnx")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_single_backend(args.n, args.batch_size)))
+        return
+
+    results = []
+    for name in args.backends.split(","):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--n", str(args.n)]
+        if args.batch_size:
+            cmd += ["--batch-size", str(args.batch_size)]
+        out = subprocess.run(
+            cmd, env={**os.environ, "SENTIMENT_BACKEND": name, "SENTIMENT_CACHE_ENABLED": "0"},
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    reference = next((r["fixture_labels"] for r in results if r["backend"] == "torch"), None)
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'art/s':>8} {'RSS MB':>8} {'parity':>8}")
+    for r in results:
+        parity = "n/a"
+        if reference:
+            agree = sum(a == b for a, b in zip(r["fixture_labels"], reference))
+            parity = f"{agree}/{len(reference)}"
+        print(f"{r['backend']:<10} {r['load_s']:7.2f} {r['latency_ms_p50']:8.2f} {r['latency_ms_p95']:8.2f} "
+              f"{r['throughput_per_s']:8.1f} {r['rss_mb']:8.0f} {parity:>8}")
+
+
+if __name__ == "__main__":
+    main()
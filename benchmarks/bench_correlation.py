@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the vectorized rolling metrics in correlation_index against
+recomputing every window from scratch, on synthetic daily sentiment and
+returns (no database needed).
+
+    python benchmarks/bench_correlation.py --years 10 --windows 20,60,120,250 --lags 0,1,2,3,4,5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase3_correlation_index'))
+
+import replay  # pins the offline environment before config is read
+import correlation_index
+
+
+def synthetic_frame(days, lags, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=days).strftime("%Y-%m-%d")
+    returns = pd.Series(rng.normal(0, 0.01, days), index=dates)
+    # Sentiment partly tracks the next day's return, with ties from coarse scores
+    sentiment = pd.Series(np.round(0.3 * returns.shift(-1).fillna(0) * 100 + rng.normal(0, 1, days), 2), index=dates)
+    return correlation_index.align_series(sentiment, returns, lags)
+
+
+def per_window_metrics(frame, windows, lags):
+    """Every window sliced and correlated on its own."""
+    x = frame["sentiment"]
+    out = {}
+    for k in lags:
+        y = frame[f"lag{k}"]
+        for w in windows:
+            pearson, spearman = [], []
+            for end in range(w, len(frame) + 1):
+                xs, ys = x.iloc[end - w:end], y.iloc[end - w:end]
+                pearson.append(xs.corr(ys))
+                spearman.append(xs.rank().corr(ys.rank()))
+            out[("pearson", w, k)] = pearson
+            out[("spearman", w, k)] = spearman
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--windows", default="20,60,120,250")
+    parser.add_argument("--lags", default="0,1,2,3,4,5")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    windows = [int(w) for w in args.windows.split(",")]
+    lags = [int(k) for k in args.lags.split(",")]
+    frame = synthetic_frame(args.years * 252, lags)
+    print(f"{len(frame)} trading days, windows {windows}, lags {lags}")
+
+    start = time.perf_counter()
+    metrics = correlation_index.compute_rolling_metrics(frame, windows, lags)
+    fast = time.perf_counter() - start
+    print(f"vectorized:  {fast:.3f}s  ({len(metrics)} series)")
+
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        slow_metrics = per_window_metrics(frame, windows, lags)
+        slow = time.perf_counter() - start
+        print(f"per-window:  {slow:.3f}s  (Pearson + Spearman only)  → {slow / fast:.0f}x")
+
+        worst = 0.0
+        for key, values in slow_metrics.items():
+            w = key[1]
+            got = metrics[key][w - 1:]
+            worst = max(worst, float(np.nanmax(np.abs(got - np.asarray(values, dtype=float)), initial=0.0)))
+        print(f"max abs difference vs per-window: {worst:.2e}")
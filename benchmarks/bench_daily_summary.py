@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark of daily_summary.summarize_sentiment (server-side $group + $merge)
+against the previous approach of streaming every scored article into
+Python, on N synthetic articles in a scratch database of a local mongod.
+
+    python benchmarks/bench_daily_summary.py --uri mongodb://localhost:27017 --n 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from statistics import mean
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase3_correlation_index'))
+
+import replay  # pins the offline environment before config is read
+import daily_summary
+import rollups
+from daily_summary import SENTIMENT_SCORES
+from synthetic import load_synthetic
+
+
+def legacy_summaries(collection):
+    """The Python-side grouping summarize_sentiment used to do (without the writes)."""
+    grouped = defaultdict(list)
+    for article in collection.find({"sentiment": {"$in": list(SENTIMENT_SCORES)}}):
+        published_at = article.get("publishedAt")
+        sentiment = article.get("sentiment")
+        if published_at and sentiment in SENTIMENT_SCORES:
+            grouped[published_at.split("T")[0]].append(SENTIMENT_SCORES[sentiment])
+    return {date: (mean(scores), len(scores)) for date, scores in grouped.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="bench_daily_summary")
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    # Rebinds database.db too, so dirty_dates and the writers use the scratch database
+    db = replay.use_database(args.uri, args.db)
+    client = db.client
+
+    t0 = time.perf_counter()
+    load_synthetic(db["financial_news"], args.n)
+    print(f"loaded {args.n} synthetic articles in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    legacy = legacy_summaries(db["financial_news"])
+    t_legacy = time.perf_counter() - t0
+
+    daily_summary.ensure_indexes()
+    t0 = time.perf_counter()
+    daily_summary.summarize_sentiment()
+    t_agg = time.perf_counter() - t0
+
+    merged = {d["date"]: (d["average_score"], d["count"]) for d in db["daily_sentiment_summary"].find()}
+    same = merged.keys() == legacy.keys() and all(
+        abs(merged[k][0] - legacy[k][0]) < 1e-9 and merged[k][1] == legacy[k][1] for k in legacy
+    )
+    print(f"python grouping : {t_legacy:7.2f}s")
+    print(f"$group + $merge : {t_agg:7.2f}s")
+    print(f"speedup         : {t_legacy / t_agg:7.2f}x  ({len(merged)} days, results identical: {same})")
+
+    if not args.keep:
+        client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    main()
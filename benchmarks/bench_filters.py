@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of extract_news.process_articles on a large synthetic set
+of raw NewsAPI articles, against the previous implementation (per-keyword
+substring scans, per-domain substring tests, URL re-normalization).
+
+    python benchmarks/bench_filters.py --n 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase1_data_extraction'))
+
+import replay  # pins the offline environment before config is read
+import extract_news
+from extract_news import FINANCIAL_SOURCES, MACRO_KEYWORDS, normalize_url
+
+WORDS = ("stocks rallied investors fell shares markets traders index futures outlook quarter "
+         "company reported analysts expect fedex federal agency cpi ppi gdp vix fed spx "
+         "interest rates inflation unemployment earnings merger acquisition volatility").split()
+HOSTS = ["www.reuters.com", "www.bloomberg.com", "www.cnbc.com", "finance.yahoo.com",
+         "www.microsoft.com", "www.marketwatch.com", "news.example.org", "www.ft.com"]
+
+
+def legacy_process_articles(raw):
+    """The substring-based process_articles that was replaced."""
+    out = []
+    now = datetime.now(timezone.utc).isoformat()
+    for a in raw:
+        title = a.get("title", "") or ""
+        desc = a.get("description", "") or ""
+        lower = (title + " " + desc).lower()
+        if not any(kw in lower for kw in MACRO_KEYWORDS):
+            continue
+        url = normalize_url(a.get("url", "") or "")
+        netloc = urlparse(url).netloc.lower()
+        if not url or not any(domain in netloc for domain in FINANCIAL_SOURCES):
+            continue
+        out.append({
+            "title":       title,
+            "description": desc,
+            "content":     a.get("content", "") or "",
+            "publishedAt": a.get("publishedAt", "") or "",
+            "source":      a.get("source", {}).get("name", ""),
+            "url":         url,
+            "fetchedAt":   now,
+            "sentiment":   None
+        })
+    return out
+
+
+def synthetic_raw(n, seed=0):
+    rng = random.Random(seed)
+    raw = []
+    for i in range(n):
+        url = f"https://{rng.choice(HOSTS)}/markets/{i}?utm_source=newsapi"
+        raw.append({
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize(),
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 40))),
+            "content": "",
+            "publishedAt": "2025-05-04T14:30:10Z",
+            "source": {"name": "Synthetic"},
+            "url": url,
+            # what the pagination loop attaches
+            "_normalized_url": normalize_url(url),
+        })
+    return raw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = synthetic_raw(args.n)
+
+    t0 = time.perf_counter()
+    legacy = legacy_process_articles(raw)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = extract_news.process_articles(raw)
+    t_new = time.perf_counter() - t0
+
+    print(f"legacy : {t_legacy:6.2f}s  {args.n / t_legacy:10.0f} articles/s  kept {len(legacy)}")
+    print(f"current: {t_new:6.2f}s  {args.n / t_new:10.0f} articles/s  kept {len(new)}")
+    print(f"speedup: {t_legacy / t_new:6.2f}x  (difference in kept articles comes from whole-word "
+          f"keywords like 'fed' vs 'fedex' and suffix domain matching like 'ft.com' vs 'microsoft.com')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the phase 2 module: time and RSS to import
+sentiment_analysis, and to import it and load the model (what importing
+used to cost before model loading was deferred).
+
+Each measurement runs in a fresh interpreter.
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PHASE2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase2_sentiment_analysis'))
+
+PROBE = """
+import json, sys, time
+sys.path.append({phase2!r})
+t0 = time.perf_counter()
+import sentiment_analysis
+imported = time.perf_counter() - t0
+if {load_model}:
+    sentiment_analysis.get_backend()
+total = time.perf_counter() - t0
+rss = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({{"import_s": imported, "total_s": total, "rss_mb": rss}}))
+"""
+
+
+def _measure(load_model, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(phase2=PHASE2, load_model=load_model)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "total_s": statistics.median(r["total_s"] for r in runs),
+        "rss_mb": statistics.median(r["rss_mb"] for r in runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lazy = _measure(False, args.repeat)
+    eager = _measure(True, args.repeat)
+    print(f"import only        : {lazy['total_s']:6.2f}s  {lazy['rss_mb']:7.0f} MB RSS")
+    print(f"import + load model: {eager['total_s']:6.2f}s  {eager['rss_mb']:7.0f} MB RSS")
+    print(f"cold-start saved   : {eager['total_s'] - lazy['total_s']:6.2f}s  "
+          f"{eager['rss_mb'] - lazy['rss_mb']:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Wall-clock benchmark of a full NewsAPI fetch for all MACRO_QUERIES:
+sequential extract_news.fetch_raw_articles vs. async_extract_news, both
+against the local fake server (no network, no API key, no database writes).
+
+--quota-check instead runs async_extract_news.collect_all into an
+in-process database with a request quota that runs out partway, then again
+with enough quota, and checks that no article was lost to a checkpoint
+that moved past pages the first run never fetched.
+
+    python benchmarks/bench_ingest.py --latency 0.2 --articles 1000
+    python benchmarks/bench_ingest.py --quota-check --articles 300 --quota 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase1_data_extraction'))
+
+from newsapi import NewsApiClient, const
+
+import replay  # pins the offline environment before config is read
+import async_extract_news
+import config
+import extract_news
+from fake_newsapi import FakeNewsAPI, serve_in_thread
+
+COLLECTION = "financial_news"
+
+
+def stored_urls():
+    return {a["url"] for a in replay.database.db[COLLECTION].find({}, {"url": 1})}
+
+
+def quota_check(fake, base_url, quota):
+    """collect_all with a quota that runs out, then without; compared with one unlimited run."""
+    fake.error_rate = 0.0
+    queries = extract_news.MACRO_QUERIES
+
+    replay.use_database(None, "bench_ingest_quota")
+    config.NEWS_API_REQUEST_QUOTA = quota
+    fake.requests = 0
+    async_extract_news.collect_all(queries, COLLECTION, base_url)
+    cut_off = [q for q in queries if not extract_news.load_checkpoint(q)]
+    print(f"quota {quota:>6}: {fake.requests:4d} requests, {len(stored_urls())} articles stored, "
+          f"{len(queries) - len(cut_off)}/{len(queries)} checkpoints saved")
+    config.NEWS_API_REQUEST_QUOTA = 10**6
+    async_extract_news.collect_all(queries, COLLECTION, base_url)
+    resumed = stored_urls()
+    assert all(extract_news.load_checkpoint(q) for q in queries), "a query is still without a checkpoint"
+
+    replay.use_database(None, "bench_ingest_unlimited")
+    async_extract_news.collect_all(queries, COLLECTION, base_url)
+    expected = stored_urls()
+    print(f"unlimited  : {len(expected)} articles stored; after the cut-off run and a rerun: {len(resumed)}")
+    missing = expected - resumed
+    assert not missing, f"{len(missing)} articles lost behind an advanced checkpoint"
+    print("quota check: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=1000, help="/everything results per query")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of 429 responses")
+    parser.add_argument("--quota-check", action="store_true",
+                        help="check checkpoints when the request quota runs out partway (needs mongomock)")
+    parser.add_argument("--quota", type=int, default=20, help="request quota of the first --quota-check run")
+    args = parser.parse_args()
+
+    fake = FakeNewsAPI(args.articles, args.latency, args.error_rate, earliest_days=20)
+    base_url = serve_in_thread(fake)
+    # The benchmark is about request scheduling, not the plan limits
+    config.NEWS_API_REQUEST_QUOTA = 10**6
+    config.NEWS_API_MAX_RPS = 1000
+    config.NEWS_API_BURST = 100
+    if args.quota_check:
+        quota_check(fake, base_url, args.quota)
+        return
+
+    # Sequential path: point newsapi-python at the fake server (429s are not retried there)
+    fake.error_rate = 0.0
+    const.EVERYTHING_URL = f"{base_url}/everything"
+    const.TOP_HEADLINES_URL = f"{base_url}/top-headlines"
+    client = NewsApiClient(api_key="bench")
+    fake.requests = 0
+    t0 = time.perf_counter()
+    seq_raw = sum(len(extract_news.fetch_raw_articles(q, client, set())) for q in extract_news.MACRO_QUERIES)
+    t_seq = time.perf_counter() - t0
+    seq_requests = fake.requests
+
+    fake.error_rate = args.error_rate
+    fake.requests = 0
+    t0 = time.perf_counter()
+    by_query, _, used = asyncio.run(async_extract_news.fetch_all_async(extract_news.MACRO_QUERIES, base_url))
+    t_async = time.perf_counter() - t0
+    async_raw = sum(len(v or []) for v in by_query.values())
+
+    print(f"sequential : {t_seq:7.2f}s  {seq_requests:4d} requests  {seq_raw} raw articles")
+    print(f"async      : {t_async:7.2f}s  {fake.requests:4d} requests  {async_raw} raw articles "
+          f"(incl. injected 429 retries)")
+    print(f"speedup    : {t_seq / t_async:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark of ingest-time near-duplicate clustering
+(phase1_data_extraction/near_duplicates.py) on N synthetic articles, where
+each story is republished 0-4 times with an edited headline, a source
+suffix or a shortened description.
+
+Articles arrive in publishedAt order, in ingest-sized batches. The cost per
+new article is reported as history grows, together with pair precision /
+recall against the true stories and the share of FinBERT inference saved.
+
+By default the representatives live in near_duplicates.MemoryIndex, trimmed
+to the dedup window as the stored lookup's publishedAt bound does. With --uri,
+every batch is inserted into a scratch database of a local mongod and
+clustered by cluster_new_articles, i.e. through the lshBands index.
+
+    python benchmarks/bench_near_duplicates.py --n 1000000
+    python benchmarks/bench_near_duplicates.py --uri mongodb://localhost:27017 --n 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import combinations
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase1_data_extraction'))
+
+import near_duplicates
+
+SOURCES = ["Reuters", "Bloomberg", "CNBC", "MarketWatch", "Yahoo Finance"]
+SUFFIXES = [" - Reuters", " | CNBC", " (Bloomberg)", " - MarketWatch", ""]
+
+
+def synthetic_stream(n, days=730, seed=0):
+    """(article, story id) in publishedAt order; ~40% of stories are republished."""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20000)]
+    start = datetime(2023, 1, 1)
+    articles = []
+    story = 0
+    while len(articles) < n:
+        title = rng.sample(vocab, rng.randint(8, 14))
+        desc = rng.sample(vocab, rng.randint(15, 30))
+        t = start + timedelta(seconds=rng.randrange(days * 86400))
+        copies = 1 + (rng.choice([0, 0, 0, 1, 1, 2, 3, 4]) if rng.random() < 0.4 else 0)
+        for c in range(copies):
+            t_title, t_desc = list(title), list(desc)
+            if c:
+                t_title[rng.randrange(len(t_title))] = rng.choice(vocab)  # one word edited
+                if rng.random() < 0.5:
+                    t_desc = t_desc[:len(t_desc) - rng.randint(1, 4)]
+            articles.append(({
+                "_id": len(articles),
+                "title": " ".join(t_title) + (rng.choice(SUFFIXES) if c else ""),
+                "description": " ".join(t_desc),
+                "publishedAt": (t + timedelta(minutes=rng.randrange(12 * 60) if c else 0)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "source": rng.choice(SOURCES),
+                "url": f"https://example.com/{story}/{c}",
+            }, story))
+        story += 1
+    articles = articles[:n]
+    articles.sort(key=lambda item: item[0]["publishedAt"])
+    return articles
+
+
+def pair_scores(assigned, stories):
+    """Precision / recall over same-cluster article pairs vs. same-story pairs."""
+    def pairs(labels):
+        groups = {}
+        for _id, label in labels.items():
+            groups.setdefault(label, []).append(_id)
+        return {p for ids in groups.values() if len(ids) > 1 for p in combinations(sorted(ids), 2)}
+    predicted, truth = pairs(assigned), pairs(stories)
+    hits = len(predicted & truth)
+    return (hits / len(predicted) if predicted else 1.0), (hits / len(truth) if truth else 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=100, help="articles per ingest batch")
+    parser.add_argument("--uri", help="cluster through a local mongod instead of the in-memory index")
+    parser.add_argument("--db", default="bench_near_duplicates")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stream = synthetic_stream(args.n)
+    stories = {article["_id"]: story for article, story in stream}
+    print(f"generated {len(stream)} articles in {time.perf_counter() - t0:.1f}s")
+
+    if args.uri:
+        from pymongo import MongoClient
+        import database
+        client = MongoClient(args.uri)
+        client.drop_database(args.db)
+        database.db = client[args.db]
+        collection = database.db["financial_news"]
+    else:
+        index = near_duplicates.MemoryIndex()
+
+    clusters = {}
+    report_every = max(args.batch, len(stream) // 10)
+    segment_time = segment_count = 0
+    print(f"{'history':>9} {'us/article':>11}")
+    for start in range(0, len(stream), args.batch):
+        batch = [article for article, _ in stream[start:start + args.batch]]
+
+        t0 = time.perf_counter()
+        if args.uri:
+            collection.insert_many([dict(a) for a in batch])
+            near_duplicates.cluster_new_articles("financial_news", batch)
+        else:
+            assigned = near_duplicates.cluster_batch(near_duplicates.prepare(batch), index)
+            clusters.update((_id, fields["clusterId"]) for _id, fields in assigned.items())
+        segment_time += time.perf_counter() - t0
+        segment_count += len(batch)
+
+        done = start + len(batch)
+        if segment_count >= report_every or done == len(stream):
+            print(f"{done:>9} {segment_time / segment_count * 1e6:>11.0f}")
+            segment_time = segment_count = 0
+            if not args.uri:
+                # Stand-in for the stored lookup's publishedAt bound (not timed)
+                oldest = near_duplicates._published(batch[0]) - near_duplicates.WINDOW
+                index.evict_before(oldest)
+
+    if args.uri:
+        clusters = {doc["_id"]: doc["clusterId"] for doc in collection.find({}, {"clusterId": 1})}
+        if not args.keep:
+            client.drop_database(args.db)
+
+    precision, recall = pair_scores(clusters, stories)
+    sizes = Counter(clusters.values())
+    print(f"clusters {len(sizes)} for {len(stories)} articles ({len(set(stories.values()))} true stories): "
+          f"inference saved {1 - len(sizes) / len(clusters):.1%}, pair precision {precision:.3f}, recall {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
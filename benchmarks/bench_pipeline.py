@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of phases 1-3, stage by stage and end to end, at several
+scales, with replayed NewsAPI responses, synthetic prices, a local database
+and (by default) the stub classifier from replay.py.
+
+For each scale, in a fresh process and a fresh database:
+
+  ingest       fetch_raw_articles + store_articles for every macro query
+  sentiment    analyze_and_update_articles
+  summary      fold_pending_articles (daily summary, rollups, fear index)
+  prices       load_returns with synthetic bars
+  correlation  compute_correlation_index
+  matching     compute_return_sentiment_match
+  pipeline     run_pipeline.run_pipeline, from another empty database
+
+Each stage reports wall time, throughput, p50/p95/p99 of the latencies the
+pipeline's metrics record (NewsAPI requests, inference batches, Mongo
+commands), DB round trips per command, and the process' peak RSS so far.
+The results are written as JSON; --compare prints the change against an
+earlier results file, so regressions between commits are visible.
+
+Without --uri the database is mongomock, which scans the whole collection
+for every query and update (so its cost grows quadratically): keep it to
+about 10k articles, and use a local mongod for the larger scales.
+
+    python benchmarks/bench_pipeline.py --scales 1000,10000 --out results.json
+    python benchmarks/bench_pipeline.py --uri mongodb://localhost:27017 --scales 1000,100000,1000000 \\
+        --out after.json --compare before.json
+    python benchmarks/bench_pipeline.py --backend torch --scales 1000        # real FinBERT
+    python benchmarks/bench_pipeline.py --replay newsapi_recording.jsonl     # recorded responses
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..'))
+
+import replay  # first: pins the offline environment
+import config
+import metrics
+
+STAGES = ["ingest", "sentiment", "summary", "prices", "correlation", "matching", "pipeline"]
+COLLECTION = "financial_news"
+LATENCY_SERIES = ("newsapi_request_seconds", "inference_batch_seconds", "mongo_command_seconds")
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def measure(stage, fn, count=lambda result: result):
+    """Run one stage with fresh metrics; returns its result row."""
+    metrics.reset()
+    rss = _rss_mb()
+    error = result = None
+    t0 = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        logging.exception(f"Stage '{stage}' failed")
+        error = repr(e)
+    wall = time.perf_counter() - t0
+    snap = metrics.snapshot()
+
+    items = count(result) if error is None else 0
+    round_trips = {s["labels"]["command"]: s["count"]
+                   for s in snap["histograms"] if s["name"] == "mongo_command_seconds"}
+    latencies = {}
+    for s in snap["histograms"]:
+        if s["name"] in LATENCY_SERIES:
+            label = ",".join(f"{k}={v}" for k, v in s["labels"].items())
+            latencies[f"{s['name']}{{{label}}}" if label else s["name"]] = {
+                "count": s["count"], "p50": s["p50"], "p95": s["p95"], "p99": s["p99"], "max": s["max"]
+            }
+    row = {
+        "stage": stage,
+        "wallSeconds": round(wall, 4),
+        "items": items,
+        "perSecond": round(items / wall, 2) if wall > 0 and items else None,
+        "dbRoundTrips": sum(round_trips.values()),
+        "dbRoundTripsByCommand": round_trips,
+        "latency": latencies,
+        "peakRssMb": round(_peak_rss_mb(), 1),
+        "rssGrowthMb": round(_rss_mb() - rss, 1),
+        "counters": {s["name"]: s["value"] for s in snap["counters"] if not s["labels"]},
+        "error": error,
+    }
+    print(f"  {stage:<12}{wall:>9.2f}s{items:>9}{row['perSecond'] or '-':>11}/s"
+          f"{row['dbRoundTrips']:>9} trips{row['peakRssMb']:>9.0f} MB" + (f"  FAILED {error}" if error else ""),
+          flush=True)
+    return row
+
+
+def run_scale(args, n):
+    """Every requested stage at one scale, in this process."""
+    import extract_news
+    import sentiment_analysis
+    import daily_summary
+    import correlation_index
+    import matching_function
+    import sp500_daily_returns
+    import run_pipeline
+
+    logging.getLogger().setLevel(logging.WARNING)
+    config.LOOKBACK_DAYS = args.days
+    stub = args.backend == "stub"
+
+    def newsapi():
+        if args.replay:
+            return replay.use_newsapi(replay.ReplayNewsAPI(args.replay))
+        return replay.use_newsapi(replay.SyntheticNewsAPI(n, extract_news.MACRO_QUERIES, days=args.days,
+                                                          duplicate_rate=args.duplicate_rate))
+
+    def ingest(api):
+        inserted = 0
+        for query in extract_news.MACRO_QUERIES:
+            raw = extract_news.fetch_raw_articles(query, newsapi=api)
+            inserted += extract_news.store_articles(raw, COLLECTION)
+        return inserted
+
+    rows = []
+    staged = [s for s in STAGES if s in args.stages and s != "pipeline"]
+    if staged:
+        replay.offline(args.uri, f"{args.db}_{n}", stub=stub, seconds_per_text=args.stub_seconds)
+        api = newsapi()
+        daily_summary.ensure_indexes(COLLECTION)
+        steps = {
+            "ingest": lambda: ingest(api),
+            "sentiment": lambda: sentiment_analysis.analyze_and_update_articles(COLLECTION, args.batch_size),
+            "summary": lambda: daily_summary.fold_pending_articles(COLLECTION),
+            "prices": lambda: sp500_daily_returns.load_returns(),
+            "correlation": lambda: correlation_index.compute_correlation_index(),
+            "matching": lambda: matching_function.compute_return_sentiment_match(),
+        }
+        counts = {"summary": len, "prices": len, "correlation": lambda _: 0, "matching": lambda _: 0}
+        for stage in staged:
+            rows.append(measure(stage, steps[stage], counts.get(stage, lambda result: result)))
+
+    if "pipeline" in args.stages:
+        replay.offline(args.uri, f"{args.db}_{n}_pipeline", stub=stub, seconds_per_text=args.stub_seconds)
+        newsapi()
+
+        def pipeline():
+            return run_pipeline.run_pipeline(COLLECTION, full_backfill=True, batch_size=args.batch_size)
+
+        def scored(report):
+            return sum(s["items"] for s in report if s["stage"] in ("sentiment", "backlog"))
+
+        rows.append(measure("pipeline", pipeline, scored))
+    return rows
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-stage throughput / round-trip changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["scale"], s["stage"]): s for r in baseline["results"] for s in r["stages"]}
+    print(f"\ncompared with {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+    print(f"{'scale':>9} {'stage':<12}{'wall before':>12}{'wall now':>10}{'change':>9}{'trips before':>14}{'now':>9}")
+    regressions = 0
+    for r in results:
+        for s in r["stages"]:
+            old = before.get((r["scale"], s["stage"]))
+            if not old or not old["wallSeconds"]:
+                continue
+            change = s["wallSeconds"] / old["wallSeconds"] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            regressions += bool(flag)
+            print(f"{r['scale']:>9} {s['stage']:<12}{old['wallSeconds']:>12.2f}{s['wallSeconds']:>10.2f}"
+                  f"{change:>+9.0%}{old['dbRoundTrips']:>14}{s['dbRoundTrips']:>9}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1000,10000", help="comma-separated article counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"subset of {','.join(STAGES)}")
+    parser.add_argument("--uri", help="local mongod to use instead of mongomock (a scratch db per scale)")
+    parser.add_argument("--db", default="bench_pipeline")
+    parser.add_argument("--backend", default="stub", choices=["stub", "torch", "quantized", "onnx"],
+                        help="sentiment classifier (stub: keyword counts, no model)")
+    parser.add_argument("--stub-seconds", type=float, default=0.0, help="simulated stub inference cost per text")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--days", type=int, default=30, help="days the synthetic articles span")
+    parser.add_argument("--duplicate-rate", type=float, default=0.15)
+    parser.add_argument("--replay", help="NewsAPI responses recorded with replay.py --record (ignores --scales sizes)")
+    parser.add_argument("--out", default="bench_pipeline_results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.stages = args.stages.split(",")
+
+    if args.child:
+        rows = run_scale(args, args.child)
+        with open(args.child_out, "w") as f:
+            json.dump(rows, f)
+        return
+
+    results = []
+    for n in [int(s) for s in args.scales.split(",")]:
+        print(f"{n} articles ({args.backend} classifier, {'mongod' if args.uri else 'mongomock'}):", flush=True)
+        # One process per scale, so peak RSS belongs to that scale alone
+        with tempfile.NamedTemporaryFile(suffix=".json") as out:
+            env = dict(os.environ)
+            if args.backend != "stub":
+                env["SENTIMENT_BACKEND"] = args.backend
+            child = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--child", str(n),
+                                    "--child-out", out.name], env=env)
+            if child.returncode:
+                print(f"  scale {n} exited with status {child.returncode}")
+                continue
+            with open(out.name) as f:
+                results.append({"scale": n, "stages": json.load(f)})
+
+    report = {
+        "commit": _commit(),
+        "finishedAt": datetime.now(timezone.utc).isoformat(),
+        "settings": {k: v for k, v in vars(args).items() if not k.startswith("child")},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.out}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark of dashboard range / source queries answered from the sentiment
+rollups (phase3_correlation_index/rollups.py) against aggregating the raw
+articles, on N synthetic articles in a scratch database of a local mongod.
+
+The rollups are built the way the pipeline maintains them: the articles are
+folded in batches through rollups.apply_deltas. Every query is checked
+against the raw aggregation's answer.
+
+    python benchmarks/bench_rollups.py --uri mongodb://localhost:27017 --n 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from statistics import median
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', 'phase3_correlation_index'))
+
+import replay  # pins the offline environment before config is read
+import rollups
+from daily_summary import SENTIMENT_SCORES
+from synthetic import load_synthetic
+
+SOURCES = ["all", "Reuters", "Bloomberg", "CNBC", "MarketWatch"]
+RANGES = [7, 30, 90, 365, 730]
+FIRST_DAY = date(2023, 1, 1)  # load_synthetic's start
+
+
+def raw_range(collection, start, end, source):
+    """The same totals, grouped from the articles on every request."""
+    match = {
+        "publishedAt": {"$gte": start.isoformat(), "$lt": (end + timedelta(days=1)).isoformat()},
+        "sentiment": {"$in": list(SENTIMENT_SCORES)},
+    }
+    if source != rollups.ALL_SOURCES:
+        match["source"] = source
+    totals = {field: 0 for field in rollups.FIELDS}
+    for group in collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$sentiment", "n": {"$sum": 1}}},
+    ]):
+        totals[group["_id"]] += group["n"]
+        totals["count"] += group["n"]
+        totals["score_sum"] += SENTIMENT_SCORES[group["_id"]] * group["n"]
+    return totals
+
+
+def build_rollups(collection, batch_size=10000):
+    batch = []
+    for article in collection.find({}, {"sentiment": 1, "publishedAt": 1, "source": 1}):
+        batch.append(article)
+        if len(batch) == batch_size:
+            rollups.apply_deltas(rollups.article_totals(batch))
+            batch = []
+    if batch:
+        rollups.apply_deltas(rollups.article_totals(batch))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="bench_rollups")
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=50, help="random range/source queries per range length")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    db = replay.use_database(args.uri, args.db)
+    client = db.client
+    articles = db["financial_news"]
+
+    t0 = time.perf_counter()
+    load_synthetic(articles, args.n)
+    articles.create_index([("source", 1), ("publishedAt", 1)])
+    articles.create_index("publishedAt")
+    print(f"loaded {args.n} synthetic articles in {time.perf_counter() - t0:.1f}s")
+
+    rollups.ensure_indexes()
+    t0 = time.perf_counter()
+    build_rollups(articles)
+    print(f"folded into {db[rollups.COLLECTION].count_documents({})} rollups in {time.perf_counter() - t0:.1f}s")
+
+    rng = random.Random(1)
+    print(f"{'days':>5} {'raw ms':>9} {'rollup ms':>10} {'speedup':>8} {'docs read':>10}  identical")
+    for days in RANGES:
+        raw_times, rollup_times, docs, same = [], [], [], True
+        for _ in range(args.queries):
+            start = FIRST_DAY + timedelta(days=rng.randrange(max(1, 730 - days + 1)))
+            end = start + timedelta(days=days - 1)
+            source = rng.choice(SOURCES)
+
+            t0 = time.perf_counter()
+            expected = raw_range(articles, start, end, source)
+            raw_times.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            got = rollups.query_range(start, end, source)
+            rollup_times.append(time.perf_counter() - t0)
+
+            docs.append(got["documents_read"])
+            same &= all(got[field] == expected[field] for field in rollups.FIELDS)
+        raw_ms, rollup_ms = median(raw_times) * 1000, median(rollup_times) * 1000
+        print(f"{days:>5} {raw_ms:>9.2f} {rollup_ms:>10.2f} {raw_ms / rollup_ms:>7.1f}x {median(docs):>10.0f}  {same}")
+
+    if not args.keep:
+        client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    main()
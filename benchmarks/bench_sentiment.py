@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: per-article analyze_sentiment vs. batched
+analyze_sentiment_batch on a synthetic set of news-like texts.
+
+With --pooling mean|attention, texts longer than one model window are scored
+as overlapping windows (see analyze_sentiment_windows); --max-phrases 400
+gives full-article lengths of up to a few thousand tokens.
+
+    python benchmarks/bench_sentiment.py --n 512 --batch-size 32
+    python benchmarks/bench_sentiment.py --n 64 --max-phrases 400 --pooling attention
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase2_sentiment_analysis')))
+
+import sentiment_analysis
+import metrics  # on the path sentiment_analysis sets up
+from synthetic import synthetic_texts
+
+
+def _rate(n, seconds):
+    return n / seconds if seconds > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=256, help="number of texts")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-phrases", type=int, default=12, help="longest text, in synthetic phrases")
+    parser.add_argument("--pooling", choices=sentiment_analysis.POOLINGS, default=sentiment_analysis.POOLING)
+    args = parser.parse_args()
+
+    sentiment_analysis.POOLING = args.pooling
+    texts = synthetic_texts(args.n, max_phrases=args.max_phrases)
+
+    # Warm-up so one-time allocation costs don't skew the first path
+    sentiment_analysis.analyze_sentiment(texts[0])
+
+    t0 = time.perf_counter()
+    single = [sentiment_analysis.analyze_sentiment(t) for t in texts]
+    t_single = time.perf_counter() - t0
+
+    metrics.reset()
+    t0 = time.perf_counter()
+    batched = sentiment_analysis.analyze_sentiment_batch(texts, args.batch_size)
+    t_batch = time.perf_counter() - t0
+    windows = metrics.total(metrics.snapshot(), "inference_windows")
+
+    agree = sum(a == b for a, (b, _) in zip(single, batched))
+    print(f"per-article : {t_single:8.2f}s  {_rate(len(texts), t_single):8.1f} articles/s")
+    print(f"batched     : {t_batch:8.2f}s  {_rate(len(texts), t_batch):8.1f} articles/s")
+    print(f"speedup     : {t_single / t_batch:8.2f}x  (label agreement {agree}/{len(texts)})")
+    if windows:
+        print(f"windows     : {windows} for {len(texts)} texts ({args.pooling} pooling)")
+
+
+if __name__ == "__main__":
+    main()
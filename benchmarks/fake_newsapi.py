@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Local fake of the NewsAPI /v2/everything and /v2/top-headlines endpoints,
+for exercising the fetchers without a network or API key.
+
+Responses are deterministic per (query, page). Optional per-request latency
+and a fraction of 429 responses simulate a real, rate-limited server, and
+from dates earlier than --earliest-days ago are rejected with NewsAPI's
+"too far back" error.
+
+    python benchmarks/fake_newsapi.py --port 8765 --latency 0.2
+    NEWS_API_BASE_URL=http://127.0.0.1:8765/v2 python phase1_data_extraction/extract_news.py --async
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from aiohttp import web
+
+DOMAINS = ["reuters.com", "bloomberg.com", "cnbc.com", "marketwatch.com", "wsj.com",
+           "ft.com", "forbes.com", "example.com"]
+TOPICS = ["Fed holds interest rates", "CPI inflation cools", "GDP growth slows",
+          "unemployment rate rises", "VIX spikes as volatility returns", "earnings season beats",
+          "merger talks advance", "S&P 500 hits record"]
+
+
+class FakeNewsAPI:
+    def __init__(self, articles_per_query=1000, latency=0.0, error_rate=0.0,
+                 earliest_days=30, headlines_per_query=20, seed=0):
+        self.articles_per_query = articles_per_query
+        self.headlines_per_query = headlines_per_query
+        self.latency = latency
+        self.error_rate = error_rate
+        self.earliest = date.today() - timedelta(days=earliest_days)
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self._results = {}
+
+    def article(self, query, endpoint, i):
+        h = int(hashlib.md5(f"{endpoint}:{query}:{i}".encode()).hexdigest(), 16)
+        domain = DOMAINS[h % len(DOMAINS)]
+        topic = TOPICS[(h >> 8) % len(TOPICS)]
+        published = datetime.now(timezone.utc) - timedelta(days=1, minutes=(h >> 16) % (60 * 24 * 28))
+        return {
+            "source": {"id": None, "name": domain.split(".")[0].title()},
+            "title": f"{topic} ({i})",
+            "description": f"Markets react as {topic.lower()}.",
+            "content": f"{topic}. Investors weighed the S&P 500 outlook… [+{h % 3000} chars]",
+            "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "url": f"https://www.{domain}/markets/{h % 10**12}?utm_source=newsapi",
+        }
+
+    def results(self, query, endpoint, total, from_date=None):
+        """All results for a query, newest first, optionally limited to publishedAt >= from_date."""
+        key = (query, endpoint)
+        if key not in self._results:
+            arts = [self.article(query, endpoint, i) for i in range(total)]
+            self._results[key] = sorted(arts, key=lambda a: a["publishedAt"], reverse=True)
+        arts = self._results[key]
+        if from_date:
+            arts = [a for a in arts if a["publishedAt"][:10] >= from_date[:10]]
+        return arts
+
+    async def _page(self, request, endpoint, total):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return web.json_response({"status": "error", "code": "rateLimited", "message": "slow down"},
+                                     status=429, headers={"Retry-After": "0.05"})
+
+        q = request.query.get("q", "")
+        page = int(request.query.get("page", 1))
+        size = int(request.query.get("pageSize", 100))
+        results = self.results(q, endpoint, total, request.query.get("from"))
+        start = (page - 1) * size
+        return web.json_response({
+            "status": "ok", "totalResults": len(results), "articles": results[start:start + size]
+        })
+
+    async def everything(self, request):
+        from_param = request.query.get("from")
+        if from_param and date.fromisoformat(from_param[:10]) < self.earliest:
+            self.requests += 1
+            return web.json_response({
+                "status": "error", "code": "parameterInvalid",
+                "message": ("You are trying to request results too far in the past. Your plan permits you "
+                            f"to request articles as far back as {self.earliest.isoformat()}, but you have "
+                            f"requested {from_param}."),
+            }, status=426)
+        return await self._page(request, "everything", self.articles_per_query)
+
+    async def top_headlines(self, request):
+        return await self._page(request, "top-headlines", self.headlines_per_query)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/v2/everything", self.everything)
+        app.router.add_get("/v2/top-headlines", self.top_headlines)
+        return app
+
+
+def serve_in_thread(fake, host="127.0.0.1", port=0):
+    """Start `fake` on a background event loop; returns its /v2 base URL."""
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(fake.app())
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        holder["port"] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://{host}:{holder['port']}/v2"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake NewsAPI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--articles", type=int, default=1000, help="/everything results per query")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--earliest-days", type=int, default=30)
+    args = parser.parse_args()
+
+    fake = FakeNewsAPI(args.articles, args.latency, args.error_rate, args.earliest_days)
+    web.run_app(fake.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
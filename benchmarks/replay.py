@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the services phases 1-3 talk to, so every stage (and
+run_pipeline) can run without NewsAPI, yfinance or Atlas:
+
+  SyntheticNewsAPI  newsapi-python-compatible client paging through N
+                    generated articles (some of them republished copies)
+  ReplayNewsAPI     the same interface, serving responses saved by --record
+  synthetic_prices  yfinance-shaped downloader: a seeded random walk
+  StubBackend       keyword classifier with the inference backends' interface
+  use_database      point database.db, and every module's `db` alias, at a
+                    mongomock database or at a scratch database of a local mongod
+
+Importing this module (before any pipeline module) pins MONGODB_URI,
+MONGO_DB_NAME and NEWS_API_KEY to offline values, so the .env credentials
+are never used.
+
+Record real NewsAPI responses once (this is the only networked mode):
+
+    python benchmarks/replay.py --record newsapi_recording.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+for phase in ("phase1_data_extraction", "phase2_sentiment_analysis", "phase3_correlation_index"):
+    sys.path.append(os.path.join(ROOT, phase))
+
+if __name__ != "__main__":
+    # Set before config reads the environment; load_dotenv doesn't override these
+    os.environ["MONGODB_URI"] = "mongodb://127.0.0.1:27017"
+    os.environ["MONGO_DB_NAME"] = "bench_replay"
+    os.environ["NEWS_API_KEY"] = "replay"
+    os.environ.setdefault("SENTIMENT_CACHE_ENABLED", "0")
+    os.environ.setdefault("PRICE_CACHE_DIR", tempfile.mkdtemp(prefix="bench_prices_"))
+
+import numpy as np
+import pandas as pd
+
+import config
+import database
+import metrics
+from synthetic import PHRASES
+
+DOMAINS = ["reuters.com", "bloomberg.com", "cnbc.com", "marketwatch.com", "wsj.com",
+           "ft.com", "forbes.com", "example.com", "news.example.org"]  # the last two are filtered out
+SUFFIXES = [" - Reuters", " | CNBC", " (Bloomberg)", " - MarketWatch"]
+WORDS = [f"{a}{b}" for a in ("al", "be", "co", "da", "er", "fi", "go", "hu", "io", "ja")
+         for b in range(2000)]
+
+
+# ─── NewsAPI ──────────────────────────────────────────────────────────────────
+
+class SyntheticNewsAPI:
+    """
+    Stand-in for newsapi.NewsApiClient. `n` articles are spread over
+    `queries` and over the last `days` days; /everything pages through them
+    newest first (honouring from_param / to), /top-headlines returns nothing.
+    A `duplicate_rate` share are copies of a recent story from another
+    outlet, with a suffixed headline, published up to 12 hours later.
+    """
+
+    def __init__(self, n, queries, days=30, duplicate_rate=0.15, max_phrases=6, seed=0):
+        rng = random.Random(seed)
+        end = datetime.now(timezone.utc) - timedelta(hours=max(config.DEFAULT_DELAY_HOURS, 24))
+        self._by_query = {q: [] for q in queries}
+        self._windows = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        stories = []
+        for i in range(n):
+            query = queries[i % len(queries)]
+            domain = rng.choice(DOMAINS)
+            if stories and rng.random() < duplicate_rate:
+                title, description, content, original = rng.choice(stories[-500:])
+                title += rng.choice(SUFFIXES)
+                published = min(end, original + timedelta(minutes=rng.randrange(12 * 60)))
+            else:
+                published = end - timedelta(seconds=rng.randrange(days * 86400))
+                title = f"{rng.choice(PHRASES)} as {' '.join(rng.sample(WORDS, 5))}"
+                description = f"{rng.choice(PHRASES)}, {' '.join(rng.sample(WORDS, 12))}."
+                content = " ".join(f"{rng.choice(PHRASES)}." for _ in range(rng.randint(1, max_phrases)))
+                stories.append((title, description, content, published))
+            self._by_query[query].append({
+                "source": {"id": None, "name": domain.split(".")[-2].title()},
+                "author": None,
+                "title": title,
+                "description": description,
+                "content": content,
+                "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "url": f"https://www.{domain}/markets/{i}?utm_source=newsapi",
+            })
+        for articles in self._by_query.values():
+            articles.sort(key=lambda a: a["publishedAt"], reverse=True)
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    def get_everything(self, q=None, from_param=None, to=None, page=1, page_size=100, **_):
+        self._count()
+        key = (q, (from_param or "")[:10], (to or "")[:10])
+        articles = self._windows.get(key)
+        if articles is None:
+            articles = self._windows[key] = [
+                a for a in self._by_query.get(q, [])
+                if a["publishedAt"][:10] >= key[1] and (not key[2] or a["publishedAt"][:10] <= key[2])
+            ]
+        start = (page - 1) * page_size
+        return {"status": "ok", "totalResults": len(articles), "articles": articles[start:start + page_size]}
+
+    def get_top_headlines(self, **_):
+        self._count()
+        return {"status": "ok", "totalResults": 0, "articles": []}
+
+    @property
+    def total(self):
+        return sum(len(a) for a in self._by_query.values())
+
+
+class ReplayNewsAPI:
+    """Stand-in for newsapi.NewsApiClient serving the responses in a --record file."""
+
+    def __init__(self, path):
+        self.requests = 0
+        self._responses = {}
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                self._responses[(entry["endpoint"], entry["q"], entry["page"])] = entry["response"]
+
+    def _get(self, endpoint, q, page):
+        self.requests += 1
+        return self._responses.get((endpoint, q, page), {"status": "ok", "totalResults": 0, "articles": []})
+
+    def get_everything(self, q=None, page=1, **_):
+        return self._get("everything", q, page)
+
+    def get_top_headlines(self, q=None, page=1, **_):
+        return self._get("top-headlines", q, page)
+
+    @property
+    def total(self):
+        return sum(len(r.get("articles", [])) for r in self._responses.values())
+
+
+class RecordingNewsAPI:
+    """Wraps a real NewsApiClient and appends every response to `path` (JSON lines)."""
+
+    def __init__(self, client, path):
+        self.client = client
+        self.file = open(path, "a")
+
+    def _record(self, endpoint, kwargs, response):
+        self.file.write(json.dumps({"endpoint": endpoint, "q": kwargs.get("q"), "page": kwargs.get("page", 1),
+                                    "response": response}) + "\n")
+        self.file.flush()
+        return response
+
+    def get_everything(self, **kwargs):
+        return self._record("everything", kwargs, self.client.get_everything(**kwargs))
+
+    def get_top_headlines(self, **kwargs):
+        return self._record("top-headlines", kwargs, self.client.get_top_headlines(**kwargs))
+
+
+def use_newsapi(api):
+    """Make extract_news build `api` wherever it would create a NewsApiClient."""
+    import extract_news
+    extract_news.NewsApiClient = lambda *args, **kwargs: api
+    # One fetch takes the whole replay, as a first full-backfill run would
+    config.MAX_PAGES = max(getattr(config, "MAX_PAGES", 30), api.total // 100 + 2)
+    return api
+
+
+# ─── Prices ───────────────────────────────────────────────────────────────────
+
+PRICE_ORIGIN = "2015-01-02"
+
+
+def synthetic_prices(ticker, start, end, seed=0):
+    """
+    Daily bars for business days in [start, end), shaped like
+    yf.download(..., auto_adjust=False). Each day's values depend only on
+    the ticker and the date, so incremental downloads agree with earlier ones.
+    """
+    days = pd.bdate_range(PRICE_ORIGIN, end, inclusive="left")
+    rng = np.random.default_rng([seed, zlib.crc32(ticker.encode())])
+    returns = rng.normal(0.0003, 0.011, len(days))
+    close = 4000.0 * np.exp(np.cumsum(returns))
+    opening = close * (1 + rng.normal(0, 0.002, len(days)))
+    bars = pd.DataFrame({
+        "Open": opening,
+        "High": np.maximum(opening, close) * (1 + np.abs(rng.normal(0, 0.004, len(days)))),
+        "Low": np.minimum(opening, close) * (1 - np.abs(rng.normal(0, 0.004, len(days)))),
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(2_000_000_000, 5_000_000_000, len(days)),
+    }, index=pd.DatetimeIndex(days, name="Date"))
+    return bars[bars.index >= pd.Timestamp(start)]
+
+
+def use_synthetic_prices(cache_dir=None):
+    """Route sp500_daily_returns' default downloader (and its parquet cache) offline."""
+    import sp500_daily_returns
+    from pathlib import Path
+    sp500_daily_returns.yfinance_download = synthetic_prices
+    sp500_daily_returns.CACHE_DIR = Path(cache_dir or tempfile.mkdtemp(prefix="bench_prices_"))
+
+
+# ─── Sentiment ────────────────────────────────────────────────────────────────
+
+POSITIVE = {"strong", "beat", "beats", "record", "rally", "gains", "growth", "cools", "steady", "close"}
+NEGATIVE = {"slipped", "fears", "cut", "rose", "jumped", "hotter", "recession", "volatility", "slows"}
+_WORD = re.compile(r"[a-z0-9&]+")
+
+
+class StubTokenizer:
+    """Whitespace-level stand-in for BertTokenizer: words hash to ids, 512-token truncation."""
+
+    cls_token_id = 101
+    sep_token_id = 102
+    vocab_size = 30522
+
+    def _ids(self, text):
+        return [1000 + zlib.crc32(w.encode()) % (self.vocab_size - 1000) for w in _WORD.findall(text.lower())]
+
+    def __call__(self, texts, truncation=False, padding=False, add_special_tokens=True, **_):
+        input_ids = []
+        for text in texts:
+            ids = self._ids(text)
+            if add_special_tokens:
+                ids = [self.cls_token_id] + (ids[:510] if truncation else ids) + [self.sep_token_id]
+            input_ids.append(ids)
+        return {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+
+class StubBackend:
+    """
+    Inference backend with FinBERT's interface and label order that scores
+    by counting POSITIVE / NEGATIVE words, so the stages around inference
+    can be measured without loading a model. `seconds_per_text` adds a
+    simulated model cost.
+    """
+
+    name = "stub"
+
+    def __init__(self, seconds_per_text=0.0):
+        self.tokenizer = StubTokenizer()
+        self.seconds_per_text = seconds_per_text
+        self._positive = {self.tokenizer._ids(w)[0] for w in POSITIVE}
+        self._negative = {self.tokenizer._ids(w)[0] for w in NEGATIVE}
+
+    def predict_proba(self, features):
+        rows = []
+        for ids in features["input_ids"]:
+            pos = sum(i in self._positive for i in ids)
+            neg = sum(i in self._negative for i in ids)
+            rows.append([pos, neg, 1.0])  # positive, negative, neutral logits
+        if self.seconds_per_text:
+            import time
+            time.sleep(self.seconds_per_text * len(rows))
+        logits = np.asarray(rows, dtype=float)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def use_stub_backend(seconds_per_text=0.0):
+    import sentiment_analysis
+    sentiment_analysis._backend = StubBackend(seconds_per_text)
+    sentiment_analysis.BACKEND = StubBackend.name
+
+
+# ─── Database ─────────────────────────────────────────────────────────────────
+
+# mongomock method → the command a real server would have logged
+_MONGOMOCK_COMMANDS = {
+    "find": "find", "find_one": "find", "count_documents": "aggregate", "aggregate": "aggregate",
+    "distinct": "distinct", "insert_one": "insert", "insert_many": "insert", "update_one": "update",
+    "update_many": "update", "replace_one": "update", "bulk_write": "update", "delete_one": "delete",
+    "delete_many": "delete", "create_index": "createIndexes", "find_one_and_update": "findAndModify",
+}
+_in_command = threading.local()
+
+
+def _count_mongomock_commands(collection_class):
+    """Observe mongo_command_seconds for mongomock calls, as metrics' listener does for pymongo."""
+    for method_name, command in _MONGOMOCK_COMMANDS.items():
+        method = getattr(collection_class, method_name, None)
+        if method is None or getattr(method, "_counted", False):
+            continue
+
+        def counted(self, *args, _method=method, _command=command, **kwargs):
+            if getattr(_in_command, "active", False):  # mongomock calling itself
+                return _method(self, *args, **kwargs)
+            _in_command.active = True
+            try:
+                with metrics.timer("mongo_command_seconds", command=_command):
+                    return _method(self, *args, **kwargs)
+            finally:
+                _in_command.active = False
+
+        counted._counted = True
+        setattr(collection_class, method_name, counted)
+
+
+def use_database(uri=None, name="bench_replay"):
+    """
+    Point the pipeline at a fresh database: `name` on the mongod at `uri`
+    (dropped first), or an in-process mongomock database when uri is None.
+    Rebinds database.client / database.db and the `db = database.db` alias
+    of every module imported so far. Returns the database.
+    """
+    previous = database.db
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri, event_listeners=metrics.mongo_listeners())
+        client.drop_database(name)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("The in-process database needs mongomock (pip install mongomock); "
+                             "or pass --uri of a local mongod")
+        _count_mongomock_commands(mongomock.collection.Collection)
+        client = mongomock.MongoClient()
+    db = client[name]
+
+    database.client, database.db = client, db
+    database._url_indexed.clear()
+    for module in list(sys.modules.values()):
+        if module is not None and vars(module).get("db", None) is previous:
+            module.db = db
+    return db
+
+
+def offline(uri=None, db_name="bench_replay", stub=True, seconds_per_text=0.0):
+    """use_database + use_synthetic_prices (+ use_stub_backend); NewsAPI is set with use_newsapi."""
+    db = use_database(uri, db_name)
+    use_synthetic_prices()
+    if stub:
+        use_stub_backend(seconds_per_text)
+    return db
+
+
+def record(path, queries=None):
+    """Fetch every query once from the real NewsAPI, saving the responses to `path`."""
+    from newsapi import NewsApiClient
+    import extract_news
+    api = RecordingNewsAPI(NewsApiClient(api_key=config.NEWS_API_KEY), path)
+    for query in queries or extract_news.MACRO_QUERIES:
+        extract_news.fetch_raw_articles(query, newsapi=api)
+    print(f"Recorded NewsAPI responses to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline stand-ins for NewsAPI, yfinance, MongoDB and FinBERT")
+    parser.add_argument("--record", metavar="PATH", required=True,
+                        help="save live NewsAPI responses for every macro query (JSON lines)")
+    args = parser.parse_args()
+    record(args.record)
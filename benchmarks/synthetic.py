@@ -0,0 +1,46 @@
+"""Synthetic inputs shared by the benchmark scripts."""
+import random
+from datetime import datetime, timedelta
+
+PHRASES = [
+    "The Federal Reserve held interest rates steady",
+    "S&P 500 futures slipped after hotter-than-expected CPI data",
+    "Earnings season kicked off with strong bank results",
+    "Unemployment claims rose for a third straight week",
+    "Investors weighed the outlook for GDP growth",
+    "The VIX jumped as market volatility returned",
+    "The merger is expected to close next quarter",
+    "Analysts cut their targets amid recession fears",
+]
+
+
+def synthetic_texts(n, seed=0, max_phrases=12):
+    """Texts of varied length, roughly like NewsAPI content/description (or full text, with a large max_phrases)."""
+    rng = random.Random(seed)
+    return [
+        ". ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, max_phrases))) + "."
+        for _ in range(n)
+    ]
+
+
+def load_synthetic(collection, n, days=730, seed=0):
+    """N scored (or unscored) articles spread over `days` days from 2023-01-01."""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    labels = ["positive", "neutral", "negative", None]
+    batch = []
+    for i in range(n):
+        ts = start + timedelta(seconds=rng.randrange(days * 86400))
+        batch.append({
+            "title": f"Synthetic article {i}",
+            "content": "S&P 500 futures moved after the Fed decision. " * rng.randint(1, 6),
+            "publishedAt": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "source": rng.choice(["Reuters", "Bloomberg", "CNBC", "MarketWatch"]),
+            "url": f"https://www.reuters.com/markets/{i}",
+            "sentiment": rng.choice(labels),
+        })
+        if len(batch) == 10000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
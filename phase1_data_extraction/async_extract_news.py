@@ -0,0 +1,263 @@
+# async_extract_news.py
+#
+# Concurrent variant of extract_news: every query and every result page is
+# requested through one pooled aiohttp session, paced by a token bucket so the
+# plan's request rate and per-run quota are respected.
+
+import asyncio
+import logging
+import math
+import random
+import time
+
+import aiohttp
+from newsapi.newsapi_exception import NewsAPIException
+
+import config
+import metrics
+from extract_news import (
+    FINANCIAL_SOURCE_IDS, fetch_window, load_checkpoint, normalize_url, page_reaches_checkpoint,
+    save_checkpoint, shifted_from_date, store_articles
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class QuotaExhausted(Exception):
+    """Raised when the per-run NewsAPI request budget is used up."""
+
+
+class TokenBucket:
+    """Allows `rate` requests/sec with bursts up to `capacity`, and at most `quota` in total."""
+
+    def __init__(self, rate, capacity, quota=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.quota = quota
+        self.used = 0
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            if self.quota is not None and self.used >= self.quota:
+                raise QuotaExhausted(f"NewsAPI request quota of {self.quota} reached")
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.used += 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class NewsAPIFetcher:
+    """Thin async NewsAPI client with rate limiting and retry/backoff."""
+
+    def __init__(self, session, bucket, base_url=None, api_key=None):
+        self.session = session
+        self.bucket = bucket
+        self.base_url = (base_url or config.NEWS_API_BASE_URL).rstrip("/")
+        self.api_key = api_key or config.NEWS_API_KEY
+
+    async def get(self, endpoint, params):
+        """GET one endpoint; retries 429/5xx with exponential backoff, raises NewsAPIException on API errors."""
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(config.NEWS_API_MAX_RETRIES + 1):
+            await self.bucket.acquire()
+            try:
+                with metrics.timer("newsapi_request_seconds", endpoint=endpoint):
+                    async with self.session.get(url, params=params, headers={"X-Api-Key": self.api_key or ""}) as resp:
+                        retry = resp.status in RETRY_STATUSES and attempt < config.NEWS_API_MAX_RETRIES
+                        if not retry:
+                            body = await resp.json(content_type=None)
+                if retry:
+                    delay = _retry_delay(resp.headers.get("Retry-After"), attempt)
+                    logger.warning(f"{endpoint} returned {resp.status}; retrying in {delay:.1f}s")
+                    metrics.inc("newsapi_retries", endpoint=endpoint)
+                    await asyncio.sleep(delay)
+                    continue
+            except aiohttp.ClientConnectionError as e:
+                if attempt >= config.NEWS_API_MAX_RETRIES:
+                    raise
+                delay = _retry_delay(None, attempt)
+                logger.warning(f"{endpoint} connection error ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if body.get("status") != "ok":
+                raise NewsAPIException(body)
+            return body
+        raise NewsAPIException({"status": "error", "code": "retriesExhausted", "message": url})
+
+    async def everything(self, query, from_date, to_date, page):
+        return await self.get("everything", {
+            "q": query, "from": from_date, "to": to_date, "language": "en",
+            "sortBy": "publishedAt", "page": page, "pageSize": PAGE_SIZE,
+        })
+
+    async def top_headlines(self, query, page):
+        return await self.get("top-headlines", {
+            "q": query, "sources": ",".join(FINANCIAL_SOURCE_IDS), "language": "en",
+            "page": page, "pageSize": PAGE_SIZE,
+        })
+
+
+def _retry_delay(retry_after, attempt):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(2 ** attempt, 30) + random.uniform(0, 0.5)
+
+
+async def _everything_pages(fetcher, query, from_date, to_date, since=None):
+    """
+    First page alone (to learn totalResults and fix from_date), then the rest
+    concurrently - unless the first page already reaches the checkpoint.
+    """
+    while True:
+        try:
+            first = await fetcher.everything(query, from_date, to_date, 1)
+            break
+        except NewsAPIException as err:
+            new_from = shifted_from_date(err.args[0])
+            if not new_from:
+                raise
+            from_date = new_from
+            logger.warning(f"Too-far-back: shifting from_date → {from_date} and retrying page 1")
+
+    max_pages = getattr(config, "MAX_PAGES", 30)
+    pages = min(max_pages, math.ceil(first.get("totalResults", 0) / PAGE_SIZE))
+    if len(first.get("articles", [])) < PAGE_SIZE:
+        pages = 1
+    elif page_reaches_checkpoint(first["articles"], since):
+        logger.info(f"  /everything page 1 for '{query}' reaches the checkpoint; skipping later pages")
+        pages = 1
+    rest, complete = await _gather_pages(
+        [fetcher.everything(query, from_date, to_date, p) for p in range(2, pages + 1)], query, "everything"
+    )
+    return [first] + rest, complete
+
+
+async def _headline_pages(fetcher, query):
+    first = await fetcher.top_headlines(query, 1)
+    pages = math.ceil(first.get("totalResults", 0) / PAGE_SIZE)
+    if len(first.get("articles", [])) < PAGE_SIZE:
+        pages = 1
+    rest, complete = await _gather_pages(
+        [fetcher.top_headlines(query, p) for p in range(2, pages + 1)], query, "top-headlines"
+    )
+    return [first] + rest, complete
+
+
+async def _gather_pages(coros, query, endpoint):
+    """
+    Later pages are best-effort: a failed page (or one the quota ran out
+    before) is logged and skipped. Returns the pages and whether all arrived.
+    """
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    pages = []
+    for r in results:
+        if isinstance(r, Exception):
+            logger.warning(f"  {endpoint} page for '{query}' failed: {r}")
+        else:
+            pages.append(r)
+    return pages, len(pages) == len(results)
+
+
+async def fetch_query_async(fetcher, query, seen_urls, since=None):
+    """
+    All raw articles for one query, deduped against URLs already taken in
+    this run, and whether every result page was fetched.
+    """
+    from_date, to_date, delay_h = fetch_window(since)
+    logger.info(f"Fetching '{query}' from {from_date} to {to_date} (delay={delay_h}h)…")
+
+    (everything, everything_complete), (headlines, headlines_complete) = await asyncio.gather(
+        _everything_pages(fetcher, query, from_date, to_date, since),
+        _headline_pages(fetcher, query),
+    )
+
+    raw_articles = []
+    for resp in everything + headlines:
+        for art in resp.get("articles", []):
+            url = normalize_url(art.get("url", "") or "")
+            if url and url not in seen_urls:
+                seen_urls.add(url)
+                art["_normalized_url"] = url
+                raw_articles.append(art)
+
+    logger.info(f"'{query}': {len(everything)} /everything + {len(headlines)} top-headlines pages, "
+                f"{len(raw_articles)} unique raw articles")
+    return raw_articles, everything_complete and headlines_complete
+
+
+async def fetch_all_async(queries, base_url=None, checkpoints=None):
+    """
+    Fetch every query concurrently; returns {query: raw_articles or None on
+    failure}, the set of queries with result pages missing (failed, or cut
+    off by the request quota) and the request count. `checkpoints` maps
+    query -> latest publishedAt already stored.
+    """
+    checkpoints = checkpoints or {}
+    bucket = TokenBucket(config.NEWS_API_MAX_RPS, config.NEWS_API_BURST, config.NEWS_API_REQUEST_QUOTA)
+    connector = aiohttp.TCPConnector(limit=config.NEWS_API_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=60)
+    seen_urls = set()
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        fetcher = NewsAPIFetcher(session, bucket, base_url)
+        results = await asyncio.gather(
+            *(fetch_query_async(fetcher, q, seen_urls, checkpoints.get(q)) for q in queries),
+            return_exceptions=True
+        )
+
+    by_query = {}
+    incomplete = set()
+    for q, r in zip(queries, results):
+        if isinstance(r, Exception):
+            logger.error(f"Query '{q}' failed: {r}")
+            by_query[q] = None
+        else:
+            by_query[q], complete = r
+            if not complete:
+                incomplete.add(q)
+    logger.info(f"Used {bucket.used} NewsAPI requests")
+    return by_query, incomplete, bucket.used
+
+
+def collect_all(queries, collection_name, base_url=None, full_backfill=False):
+    """Async counterpart of running collect_financial_news for each query."""
+    checkpoints = {}
+    if not full_backfill:
+        for q in queries:
+            cp = load_checkpoint(q)
+            if cp and cp.get("latestPublishedAt"):
+                checkpoints[q] = cp["latestPublishedAt"]
+
+    by_query, incomplete, _ = asyncio.run(fetch_all_async(queries, base_url, checkpoints))
+    inserted = 0
+    for query, raw_articles in by_query.items():
+        if raw_articles is None:
+            continue  # failed query: keep its checkpoint where it was
+        logger.info(f"===== Storing results for macro query: {query} =====")
+        try:
+            inserted += store_articles(raw_articles, collection_name)
+        except Exception as e:
+            logger.error(f"Storing '{query}' failed, keeping its checkpoint: {e}")
+            continue
+        # Pages older than the ones fetched are still missing: advancing the
+        # checkpoint past them would keep them out of every later window
+        if query in incomplete:
+            logger.warning(f"Result pages missing for '{query}'; keeping its checkpoint")
+        else:
+            save_checkpoint(query, raw_articles)
+    return inserted
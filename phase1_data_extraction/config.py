@@ -10,4 +10,86 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 DEFAULT_DELAY_HOURS = int(os.getenv("DEFAULT_DELAY_HOURS", "12"))
 
+# NewsAPI async fetching (async_extract_news)
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2")
+NEWS_API_MAX_RPS = float(os.getenv("NEWS_API_MAX_RPS", "5"))        # token-bucket refill rate
+NEWS_API_BURST = int(os.getenv("NEWS_API_BURST", "10"))              # token-bucket capacity
+NEWS_API_REQUEST_QUOTA = int(os.getenv("NEWS_API_REQUEST_QUOTA", "100"))  # requests allowed per run
+NEWS_API_CONCURRENCY = int(os.getenv("NEWS_API_CONCURRENCY", "8"))  # pooled HTTP connections
+NEWS_API_MAX_RETRIES = int(os.getenv("NEWS_API_MAX_RETRIES", "5"))
+
+# Incremental ingest: re-request this much before each query's checkpoint
+CHECKPOINT_OVERLAP_HOURS = int(os.getenv("CHECKPOINT_OVERLAP_HOURS", "24"))
+
+# Near-duplicate clustering at ingest (near_duplicates.py). Signatures and LSH
+# bands are stored on the articles, so NUM_PERM / BANDS only change with a re-backfill.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))  # estimated Jaccard of title+description shingles
+DEDUP_WINDOW_HOURS = int(os.getenv("DEDUP_WINDOW_HOURS", "72"))  # only stories published this close together merge
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "32"))
+
+# Sentiment inference (phase 2)
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_NUM_THREADS = int(os.getenv("SENTIMENT_NUM_THREADS", "0"))  # 0 = torch default
+SENTIMENT_CLAIM_SIZE = int(os.getenv("SENTIMENT_CLAIM_SIZE", "256"))  # articles leased per claim
+SENTIMENT_LEASE_SECONDS = int(os.getenv("SENTIMENT_LEASE_SECONDS", "600"))
+SENTIMENT_MODEL_REVISION = os.getenv("SENTIMENT_MODEL_REVISION", "main")
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")  # torch | quantized | onnx
+SENTIMENT_ONNX_PATH = os.getenv("SENTIMENT_ONNX_PATH") or None  # default: phase2_sentiment_analysis/onnx/
+SENTIMENT_CACHE_ENABLED = os.getenv("SENTIMENT_CACHE_ENABLED", "1") == "1"
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "")  # default: phase2_sentiment_analysis/sentiment_cache.sqlite
+# Texts longer than the model's 512 tokens: "truncate" scores the first 512; "mean" / "attention"
+# score overlapping token windows in shared batches and pool the window probabilities
+SENTIMENT_POOLING = os.getenv("SENTIMENT_POOLING", "truncate")
+SENTIMENT_WINDOW_TOKENS = int(os.getenv("SENTIMENT_WINDOW_TOKENS", "510"))  # per window, excluding [CLS]/[SEP]
+SENTIMENT_WINDOW_OVERLAP = int(os.getenv("SENTIMENT_WINDOW_OVERLAP", "128"))
+SENTIMENT_MAX_WINDOWS = int(os.getenv("SENTIMENT_MAX_WINDOWS", "32"))  # per text; evenly spaced beyond this
+
+# Bulk write-back (database.BulkWriter)
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "500"))
+BULK_WRITE_MAX_INTERVAL = float(os.getenv("BULK_WRITE_MAX_INTERVAL", "5"))  # seconds
+BULK_WRITE_MAX_RETRIES = int(os.getenv("BULK_WRITE_MAX_RETRIES", "3"))
+
+# Correlation index (phase 3): rolling windows in trading days, and return
+# lags k (sentiment on day t against the return k trading days later)
+CORRELATION_WINDOWS = [int(w) for w in os.getenv("CORRELATION_WINDOWS", "20,60").split(",")]
+CORRELATION_LAGS = [int(k) for k in os.getenv("CORRELATION_LAGS", "0,1,5").split(",")]
+
+# Index price loader (phase 3 sp500_daily_returns)
+PRICE_LOOKBACK_DAYS = int(os.getenv("PRICE_LOOKBACK_DAYS", "365"))   # history fetched on the first run
+PRICE_CACHE_DIR = os.getenv("PRICE_CACHE_DIR", "")  # default: phase3_correlation_index/price_cache/
+# Extra tickers to load next to ^GSPC, as "TICKER=collection,..." e.g. "^NDX=nasdaq100_daily_returns"
+EXTRA_PRICE_TICKERS = dict(
+    item.split("=", 1) for item in os.getenv("EXTRA_PRICE_TICKERS", "").split(",") if "=" in item
+)
+
+# Fear index (phase 3 fear_index.py): article weight halves every FEAR_INDEX_HALF_LIFE_HOURS
+FEAR_INDEX_HALF_LIFE_HOURS = float(os.getenv("FEAR_INDEX_HALF_LIFE_HOURS", "24"))
+# Per-source article weights as "Source name=weight,..." (names as NewsAPI stores them
+# in source.name); unlisted sources weigh 1
+FEAR_INDEX_SOURCE_WEIGHTS = {
+    name.strip(): float(weight) for name, weight in (
+        item.split("=", 1) for item in os.getenv(
+            "FEAR_INDEX_SOURCE_WEIGHTS",
+            "Reuters=1.5,Bloomberg=1.5,The Wall Street Journal=1.25,Financial Times=1.25"
+        ).split(",") if "=" in item
+    )
+}
+
+# run_pipeline.py: batches of inserted article ids buffered between ingest and scoring
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Dashboard API (phase5_dashboard/api_server.py)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "5000"))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "30"))  # seconds; 0 disables the response cache
+API_STATE_POLL_SECONDS = float(os.getenv("API_STATE_POLL_SECONDS", "5"))  # pipeline completion check
+API_CHANGE_STREAMS = os.getenv("API_CHANGE_STREAMS", "1") == "1"  # live deltas from a change stream when available
+API_EVENT_BATCH_SECONDS = float(os.getenv("API_EVENT_BATCH_SECONDS", "1"))  # delta batching for /api/events
+API_EVENT_HEARTBEAT_SECONDS = float(os.getenv("API_EVENT_HEARTBEAT_SECONDS", "25"))
+
+# Pipeline instrumentation (metrics.py): per-run counters / latency histograms in `pipeline_runs`
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
 #Config
\ No newline at end of file
@@ -1,36 +1,191 @@
-from pymongo import MongoClient
+import time
+
+from pymongo import MongoClient, UpdateMany, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, OperationFailure
 import certifi  
 import config
+import metrics
 
-client = MongoClient(config.MONGODB_URI, tlsCAFile=certifi.where())  # ← use certifi bundle
+client = MongoClient(config.MONGODB_URI, tlsCAFile=certifi.where(),  # ← use certifi bundle
+                     event_listeners=metrics.mongo_listeners())
 db = client[config.MONGO_DB_NAME]
 
-def insert_articles(collection_name, articles):
+DUPLICATE_KEY = 11000
+
+# Update operators that leave the same document when applied twice
+IDEMPOTENT_OPERATORS = frozenset({"$set", "$setOnInsert", "$unset", "$min", "$max", "$addToSet"})
+
+# Collections whose unique url index has been checked in this process
+_url_indexed = {}
+
+
+def ensure_url_index(collection_name):
+    """
+    Make sure `url` is uniquely indexed so inserts can rely on the database for
+    dedup. Returns False if the index can't be built (existing duplicates;
+    run migrate_unique_urls.py).
+    """
+    if collection_name not in _url_indexed:
+        try:
+            db[collection_name].create_index("url", unique=True, name="url_unique")
+            _url_indexed[collection_name] = True
+        except OperationFailure as e:
+            print(f"Could not build unique url index on '{collection_name}' "
+                  f"(run migrate_unique_urls.py): {e}")
+            _url_indexed[collection_name] = False
+    return _url_indexed[collection_name]
+
+
+def insert_articles(collection_name, articles, return_ids=False):
+    """
+    Insert articles whose url is not stored yet; returns how many were new,
+    or their _ids with `return_ids`.
+    Duplicates are rejected by the unique url index, so the cost is
+    proportional to the batch rather than to the collection. Any other
+    failure is raised, so callers don't record the batch as stored.
+    """
+    nothing = [] if return_ids else 0
     if not articles:
-        return 0
+        return nothing
 
     collection = db[collection_name]
 
-    # Get URLs already in the DB to prevent duplicates
-    try:
-        existing_urls = set(doc["url"] for doc in collection.find({}, {"url": 1}) if "url" in doc)
-    except Exception as e:
-        print(f"Failed to fetch existing URLs: {e}")
-        return 0
-
-    new_articles = []
+    # Drop repeats inside the batch itself
+    by_url = {}
     for article in articles:
         url = article.get("url")
-        if url and url not in existing_urls:
-            new_articles.append(article)
+        if url and url not in by_url:
+            by_url[url] = article
+    new_articles = list(by_url.values())
 
-    if new_articles:
+    if not ensure_url_index(collection_name):
+        # No unique index yet: only look up the URLs in this batch
         try:
-            collection.insert_many(new_articles)
+            existing = set(doc["url"] for doc in collection.find({"url": {"$in": list(by_url)}}, {"url": 1}))
         except Exception as e:
-            print(f"Failed to insert articles: {e}")
+            print(f"Failed to fetch existing URLs: {e}")
+            raise
+        new_articles = [a for a in new_articles if a["url"] not in existing]
+
+    if not new_articles:
+        return nothing
+
+    try:
+        result = collection.insert_many(new_articles, ordered=False)
+        return list(result.inserted_ids) if return_ids else len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        others = [err for err in errors if err.get("code") != DUPLICATE_KEY]
+        if others:
+            print(f"Failed to insert {len(others)} articles: {others[0].get('errmsg')}")
+            raise
+        if return_ids:
+            # insert_many assigned every _id client-side; drop the rejected ones
+            rejected = {err["index"] for err in errors}
+            return [a["_id"] for i, a in enumerate(new_articles) if i not in rejected]
+        return e.details.get("nInserted", 0)
+    except Exception as e:
+        print(f"Failed to insert articles: {e}")
+        raise
+
+
+class BulkWriter:
+    """
+    Buffer write operations for one collection and send them with unordered
+    bulk_write, flushing every `batch_size` operations or once `max_interval`
+    seconds have passed since the last flush (checked on add).
+
+    Operations that fail inside a flush (other than duplicate keys) are
+    retried up to `max_retries` times. After a dropped connection the whole
+    batch is resent only if every operation in it is idempotent: a $inc or
+    running-total pipeline update may already have been applied, so the
+    error is raised instead and the caller's dirty dates / consistency check
+    repair the totals. `flush_counts` records how many documents each flush
+    wrote; `written` and `failed` are running totals.
+    Use as a context manager so the tail is flushed on exit.
+    """
+
+    def __init__(self, collection, batch_size=None, max_interval=None, max_retries=None):
+        self.collection = collection
+        self.batch_size = batch_size or config.BULK_WRITE_BATCH_SIZE
+        self.max_interval = config.BULK_WRITE_MAX_INTERVAL if max_interval is None else max_interval
+        self.max_retries = config.BULK_WRITE_MAX_RETRIES if max_retries is None else max_retries
+        self.flush_counts = []
+        self.written = 0
+        self.failed = 0
+        self._ops = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def add(self, op):
+        self._ops.append(op)
+        if (len(self._ops) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.max_interval):
+            self.flush()
+
+    def update_one(self, filter, update, upsert=False):
+        self.add(UpdateOne(filter, update, upsert=upsert))
+
+    def update_many(self, filter, update):
+        self.add(UpdateMany(filter, update))
+
+    def flush(self):
+        """Send buffered operations; returns the number of documents written."""
+        ops, self._ops = self._ops, []
+        self._last_flush = time.monotonic()
+        if not ops:
             return 0
 
-    return len(new_articles)
+        written = 0
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self.collection.bulk_write(ops, ordered=False)
+                written += _written_count(result.bulk_api_result)
+                ops = []
+                break
+            except BulkWriteError as e:
+                written += _written_count(e.details)
+                retry = [ops[err["index"]] for err in e.details.get("writeErrors", [])
+                         if err.get("code") != DUPLICATE_KEY]
+                self.failed += len(e.details.get("writeErrors", [])) - len(retry)
+                ops = retry
+            except (AutoReconnect, ConnectionFailure) as e:
+                if not all(_idempotent(op) for op in ops):
+                    print(f"Bulk write to '{self.collection.name}' failed ({e}); "
+                          f"not resending {len(ops)} writes that may have been applied")
+                    self.failed += len(ops)
+                    self.written += written
+                    raise
+                print(f"Bulk write to '{self.collection.name}' failed ({e}), retrying")
+            if not ops:
+                break
+            time.sleep(min(2 ** attempt * 0.5, 10))
+
+        if ops:
+            print(f"Giving up on {len(ops)} writes to '{self.collection.name}' after {self.max_retries} retries")
+            self.failed += len(ops)
+
+        self.flush_counts.append(written)
+        self.written += written
+        return written
+
+
+def _idempotent(op):
+    """True if sending `op` a second time can't change the result (inserts hit the unique _id)."""
+    if isinstance(op, (UpdateOne, UpdateMany)):
+        update = op._doc
+        return isinstance(update, dict) and set(update) <= IDEMPOTENT_OPERATORS
+    return True
+
+
+def _written_count(result):
+    return (result.get("nInserted", 0) + result.get("nUpserted", 0)
+            + result.get("nMatched", 0) + result.get("nRemoved", 0))
 
 #Database.py
\ No newline at end of file
@@ -1,8 +1,10 @@
 # extract_news.py
 
+import argparse
 import logging
 import re
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from urllib.parse import urlparse, urlunparse
 
 from newsapi import NewsApiClient
@@ -10,6 +12,8 @@ from newsapi.newsapi_exception import NewsAPIException
 
 import config
 import database
+import metrics
+import near_duplicates
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,16 +61,46 @@ def normalize_url(url: str) -> str:
         return url
 
 
+@lru_cache(maxsize=4096)
+def _whitelisted_domain(netloc: str):
+    """Whitelist entry that netloc equals or is a subdomain of, else None."""
+    host = netloc.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        candidate = ".".join(labels[i:])
+        if candidate in FINANCIAL_SOURCES:
+            return candidate
+    return None
+
+
 def is_financial_source(url: str) -> bool:
-    """Check that the domain is in our whitelist."""
-    netloc = urlparse(url).netloc.lower()
-    return any(domain in netloc for domain in FINANCIAL_SOURCES)
+    """Check that the domain (or a parent domain) is in our whitelist."""
+    # Normalized URLs are scheme://netloc/path, so skip the full urlparse for them
+    parts = url.split("/", 3)
+    netloc = parts[2] if len(parts) > 2 and parts[0].endswith(":") and parts[1] == "" else urlparse(url).netloc
+    return _whitelisted_domain(netloc) is not None
+
+
+# Keywords are matched as whole words (so "fed" no longer matches "fedex"),
+# with an optional plural "s". Each keyword is located with str.find, which
+# runs in C, and only candidate positions are checked for word boundaries.
+_KEYWORDS = tuple(kw.lower() for kw in MACRO_KEYWORDS)
+# One pass over the text for every keyword: whole words, optionally plural.
+# Longer keywords go first so an alternative is never cut short by a prefix.
+_KEYWORD_RE = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(kw) for kw in sorted(_KEYWORDS, key=len, reverse=True)) + r")s?(?!\w)"
+)
+
+
+def macro_keyword_hits(text: str) -> list:
+    """MACRO_KEYWORDS mentioned in the text as whole words, in MACRO_KEYWORDS order."""
+    found = {m.group(1) for m in _KEYWORD_RE.finditer(text.lower())}
+    return [kw for kw in _KEYWORDS if kw in found]
 
 
 def article_matches_macro(text: str) -> bool:
     """Ensure the article mentions at least one macro keyword."""
-    lower = text.lower()
-    return any(kw in lower for kw in MACRO_KEYWORDS)
+    return bool(macro_keyword_hits(text))
 
 
 def process_articles(raw: list) -> list:
@@ -74,13 +108,15 @@ def process_articles(raw: list) -> list:
     out = []
     now = datetime.now(timezone.utc).isoformat()
     for a in raw:
+        # Reuse the URL normalized during pagination when available
+        url = a.get("_normalized_url") or normalize_url(a.get("url", "") or "")
+        if not url or not is_financial_source(url):
+            continue
         title = a.get("title", "") or ""
         desc = a.get("description", "") or ""
         # Light macro check
-        if not article_matches_macro(title + " " + desc):
-            continue
-        url = normalize_url(a.get("url", "") or "")
-        if not url or not is_financial_source(url):
+        keywords = macro_keyword_hits(title + " " + desc)
+        if not keywords:
             continue
         out.append({
             "title":       title,
@@ -90,32 +126,92 @@ def process_articles(raw: list) -> list:
             "source":      a.get("source", {}).get("name", ""),
             "url":         url,
             "fetchedAt":   now,
+            "macroKeywords": keywords,
             "sentiment":   None
         })
     return out
 
 
-def collect_financial_news(query: str, collection_name: str):
+CHECKPOINT_COLLECTION = "ingest_checkpoints"
+
+
+def load_checkpoint(query: str):
+    """Per-query high-water mark: {latestPublishedAt, lastSuccessAt} or None."""
+    return database.db[CHECKPOINT_COLLECTION].find_one({"_id": query})
+
+
+def save_checkpoint(query: str, raw_articles: list):
+    """Advance the query's high-water mark after a successful fetch + insert."""
+    latest = max((a.get("publishedAt") or "" for a in raw_articles), default="")
+    update = {"$set": {"lastSuccessAt": datetime.now(timezone.utc).isoformat()}}
+    if latest:
+        update["$max"] = {"latestPublishedAt": latest}
+    database.db[CHECKPOINT_COLLECTION].update_one({"_id": query}, update, upsert=True)
+
+
+def _parse_published(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+
+
+def fetch_window(since: str = None):
     """
-    Fetch and insert S&P 500–related macroeconomic news.
-    Only new URLs are added; existing documents remain intact.
+    Enforce free-plan delay & lookback; returns (from_date, to_date, delay_h).
+    With a checkpoint (`since` = latest publishedAt already stored) the window
+    starts there instead, minus CHECKPOINT_OVERLAP_HOURS for late-indexed articles.
     """
-    newsapi = NewsApiClient(api_key=config.NEWS_API_KEY)
-
-    # Enforce free-plan delay & lookback
     delay_h = max(config.DEFAULT_DELAY_HOURS, 24)
     end_dt  = datetime.now(timezone.utc) - timedelta(hours=delay_h)
     lookback = getattr(config, "LOOKBACK_DAYS", 30)
     start_dt = end_dt - timedelta(days=lookback)
+    if since:
+        start_dt = min(end_dt, max(start_dt, checkpoint_floor(since)))
+    return start_dt.date().isoformat(), end_dt.date().isoformat(), delay_h
+
+
+def checkpoint_floor(since: str) -> datetime:
+    """Oldest publishedAt re-requested after a checkpoint: `since` minus CHECKPOINT_OVERLAP_HOURS."""
+    return _parse_published(since) - timedelta(hours=config.CHECKPOINT_OVERLAP_HOURS)
+
+
+def page_reaches_checkpoint(batch: list, since: str = None) -> bool:
+    """
+    True if a newest-first result page goes back to the checkpoint's overlap,
+    so every later page holds articles an earlier, complete fetch already took.
+    """
+    published = [a["publishedAt"] for a in batch if a.get("publishedAt")]
+    if not since or not published:
+        return False
+    return min(_parse_published(p) for p in published) <= checkpoint_floor(since)
 
-    from_date = start_dt.date().isoformat()
-    to_date   = end_dt.date().isoformat()
+
+def shifted_from_date(info: dict):
+    """
+    If NewsAPI rejected from_date as too far back for the plan, return the
+    earliest allowed date (+1 day) to retry with; otherwise None.
+    """
+    if info.get("code") == "parameterInvalid":
+        m = re.search(r"as far back as (\d{4}-\d{2}-\d{2})", info.get("message",""))
+        if m:
+            allowed = m.group(1)
+            new_start = datetime.fromisoformat(allowed) + timedelta(days=1)
+            return new_start.date().isoformat()
+    return None
+
+
+@metrics.timed("stage_seconds", stage="fetch")
+def fetch_raw_articles(query: str, newsapi=None, seen_urls=None, since: str = None) -> list:
+    """
+    Page through /everything and /top-headlines for one query, sequentially.
+    `since` narrows the window to a checkpoint, and /everything pagination
+    stops at the first page that reaches back past the checkpoint's overlap.
+    """
+    newsapi = newsapi or NewsApiClient(api_key=config.NEWS_API_KEY)
+
+    from_date, to_date, delay_h = fetch_window(since)
     logger.info(f"Fetching '{query}' from {from_date} to {to_date} (delay={delay_h}h)…")
 
     raw_articles = []
-    seen_urls   = set(
-        doc["url"] for doc in database.db[collection_name].find({}, {"url":1})
-    )
+    seen_urls   = set() if seen_urls is None else seen_urls  # URLs already taken in this run
 
     # 1) Paginate /everything
     page_size = 100
@@ -124,25 +220,22 @@ def collect_financial_news(query: str, collection_name: str):
 
     while True:
         try:
-            resp = newsapi.get_everything(
-                q=query,
-                from_param=from_date,
-                to=to_date,
-                language='en',
-                sort_by='publishedAt',
-                page=page,
-                page_size=page_size
-            )
+            with metrics.timer("newsapi_request_seconds", endpoint="everything"):
+                resp = newsapi.get_everything(
+                    q=query,
+                    from_param=from_date,
+                    to=to_date,
+                    language='en',
+                    sort_by='publishedAt',
+                    page=page,
+                    page_size=page_size
+                )
         except NewsAPIException as err:
-            info = err.args[0]
-            if info.get("code") == "parameterInvalid":
-                m = re.search(r"as far back as (\d{4}-\d{2}-\d{2})", info.get("message",""))
-                if m:
-                    allowed = m.group(1)
-                    new_start = datetime.fromisoformat(allowed) + timedelta(days=1)
-                    from_date = new_start.date().isoformat()
-                    logger.warning(f"Too-far-back: shifting from_date → {from_date} and retrying page {page}")
-                    continue
+            new_from = shifted_from_date(err.args[0])
+            if new_from:
+                from_date = new_from
+                logger.warning(f"Too-far-back: shifting from_date → {from_date} and retrying page {page}")
+                continue
             raise
 
         batch = resp.get("articles", [])
@@ -153,24 +246,30 @@ def collect_financial_news(query: str, collection_name: str):
             url = normalize_url(art.get("url", "") or "")
             if url and url not in seen_urls:
                 seen_urls.add(url)
+                art["_normalized_url"] = url
                 raw_articles.append(art)
 
         logger.info(f"  /everything page {page}: fetched {len(batch)} articles, unique so far={len(raw_articles)}")
         if len(batch) < page_size or page >= max_pages:
             break
+        # Results are newest-first, so the pages after this one are older than the checkpoint
+        if page_reaches_checkpoint(batch, since):
+            logger.info(f"  /everything page {page} reaches the checkpoint; stopping pagination")
+            break
         page += 1
 
     # 2) Fetch top-headlines matching macro query
     sources_param = ",".join(FINANCIAL_SOURCE_IDS)
     page = 1
     while True:
-        top = newsapi.get_top_headlines(
-            q=query,
-            sources=sources_param,
-            language='en',
-            page=page,
-            page_size=page_size
-        ).get("articles", [])
+        with metrics.timer("newsapi_request_seconds", endpoint="top-headlines"):
+            top = newsapi.get_top_headlines(
+                q=query,
+                sources=sources_param,
+                language='en',
+                page=page,
+                page_size=page_size
+            ).get("articles", [])
         if not top:
             break
 
@@ -178,6 +277,7 @@ def collect_financial_news(query: str, collection_name: str):
             url = normalize_url(art.get("url", "") or "")
             if url and url not in seen_urls:
                 seen_urls.add(url)
+                art["_normalized_url"] = url
                 raw_articles.append(art)
 
         logger.info(f"  top-headlines page {page}: +{len(top)} articles (unique total={len(raw_articles)})")
@@ -185,16 +285,58 @@ def collect_financial_news(query: str, collection_name: str):
             break
         page += 1
 
-    logger.info(f"Total new unique raw articles: {len(raw_articles)}")
+    logger.info(f"Total unique raw articles: {len(raw_articles)}")
+    return raw_articles
+
 
-    # 3) Filter & insert only new ones
+@metrics.timed("stage_seconds", stage="store")
+def store_articles(raw_articles: list, collection_name: str, return_ids: bool = False):
+    """
+    Filter raw articles for relevance, insert the new ones and cluster them
+    with near-duplicates of stories already stored (count, or _ids with `return_ids`).
+    """
     filtered = process_articles(raw_articles)
     logger.info(f"After filtering to financial & macro relevance: {len(filtered)} articles")
 
-    inserted = database.insert_articles(collection_name, filtered)
-    logger.info(f"Inserted {inserted} new docs into '{collection_name}'")
+    inserted = database.insert_articles(collection_name, filtered, return_ids=True)
+    logger.info(f"Inserted {len(inserted)} new docs into '{collection_name}'")
+    # insert_many set _id on the documents it sent
+    ids = set(inserted)
+    near_duplicates.cluster_new_articles(collection_name, [a for a in filtered if a.get("_id") in ids])
+    metrics.inc("articles_fetched", len(raw_articles))
+    metrics.inc("articles_relevant", len(filtered))
+    metrics.inc("articles_inserted", len(inserted))
+    return inserted if return_ids else len(inserted)
+
+
+def collect_financial_news(query: str, collection_name: str, full_backfill: bool = False):
+    """
+    Fetch and insert S&P 500–related macroeconomic news.
+    Only new URLs are added; existing documents remain intact
+    (dedup against stored articles happens in database.insert_articles).
+    Unless `full_backfill` is set, only the window since the query's
+    checkpoint is requested.
+    """
+    checkpoint = None if full_backfill else load_checkpoint(query)
+    since = checkpoint.get("latestPublishedAt") if checkpoint else None
+    raw_articles = fetch_raw_articles(query, since=since)
+    inserted = store_articles(raw_articles, collection_name)
+    save_checkpoint(query, raw_articles)
+    return inserted
 
 if __name__ == "__main__":
-    for q in MACRO_QUERIES:
-        logger.info(f"\n===== Running macro query: {q} =====")
-        collect_financial_news(q, "financial_news")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch S&P 500 macro news from NewsAPI")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="fetch all queries and pages concurrently")
+    parser.add_argument("--full-backfill", action="store_true",
+                        help="ignore per-query checkpoints and request the whole lookback window")
+    args = parser.parse_args()
+
+    with metrics.recorded_run("extract_news"):
+        if args.use_async:
+            import async_extract_news
+            async_extract_news.collect_all(MACRO_QUERIES, "financial_news", full_backfill=args.full_backfill)
+        else:
+            for q in MACRO_QUERIES:
+                logger.info(f"\n===== Running macro query: {q} =====")
+                collect_financial_news(q, "financial_news", full_backfill=args.full_backfill)
\ No newline at end of file
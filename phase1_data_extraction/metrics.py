@@ -0,0 +1,283 @@
+"""
+Lightweight pipeline instrumentation.
+
+Counters, gauges and latency histograms are kept in process memory and are
+persisted once per run (recorded_run) to the `pipeline_runs` collection,
+which the dashboard API reads for /api/metrics/performance and exports in
+Prometheus text format at /metrics.
+
+    with metrics.timer("inference_batch_seconds", backend="onnx"):
+        ...
+    metrics.inc("articles_scored", len(batch))
+
+    @metrics.timed("stage_seconds", stage="correlation")
+    def compute_correlation_index(...): ...
+
+MongoDB round trips are counted by a pymongo CommandListener that
+database.py installs on its client. With METRICS_ENABLED=0 every call
+returns immediately and no listener is installed.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+import config
+
+ENABLED = config.METRICS_ENABLED
+PREFIX = "sentiment_pipeline"
+RUNS_COLLECTION = "pipeline_runs"
+
+# Histogram bucket upper bounds in seconds, shared by every histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) → value
+_gauges = {}      # (name, labels) → value
+_histograms = {}  # (name, labels) → Histogram
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (per-bucket counts, not cumulative)."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket, like Prometheus' histogram_quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name, value, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.add(seconds)
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def timer(name, **labels):
+    """Context manager observing its duration in histogram `name`."""
+    return _Timer(name, labels) if ENABLED else _NOOP
+
+
+def timed(name, **labels):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Timer(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def mongo_listeners():
+    """event_listeners for MongoClient: one histogram observation per database command."""
+    if not ENABLED:
+        return []
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            observe("mongo_command_seconds", event.duration_micros / 1e6, command=event.command_name)
+
+        def failed(self, event):
+            observe("mongo_command_seconds", event.duration_micros / 1e6, command=event.command_name)
+            inc("mongo_command_failures", command=event.command_name)
+
+    return [MongoCommandListener()]
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """Current values as plain dicts (the form stored in pipeline_runs)."""
+    with _lock:
+        return {
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())],
+            "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_gauges.items())],
+            "histograms": [{
+                "name": n, "labels": dict(l), "count": h.count, "sum": h.sum, "max": h.max,
+                "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                "buckets": list(h.buckets),
+            } for (n, l), h in sorted(_histograms.items())],
+        }
+
+
+def merge(snap):
+    """Add another process' snapshot (e.g. a worker's) to this process' metrics."""
+    if not ENABLED:
+        return
+    with _lock:
+        for s in snap.get("counters", []):
+            key = _key(s["name"], s["labels"])
+            _counters[key] = _counters.get(key, 0) + s["value"]
+        for s in snap.get("gauges", []):
+            _gauges[_key(s["name"], s["labels"])] = s["value"]
+        for s in snap.get("histograms", []):
+            key = _key(s["name"], s["labels"])
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = _histograms[key] = Histogram()
+            histogram.buckets = [a + b for a, b in zip(histogram.buckets, s["buckets"])]
+            histogram.count += s["count"]
+            histogram.sum += s["sum"]
+            histogram.max = max(histogram.max, s["max"])
+
+
+def total(snap, name, field="value", **labels):
+    """Sum of `field` over a snapshot's series called `name` whose labels include `labels`."""
+    series = snap.get("histograms" if field in ("count", "sum") else "counters", [])
+    return sum(s[field] for s in series
+               if s["name"] == name and all(s["labels"].get(k) == v for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items.items()) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def to_prometheus(snap=None):
+    """Prometheus text exposition format (0.0.4) of a snapshot (default: the current one)."""
+    snap = snapshot() if snap is None else snap
+    lines, typed = [], set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for s in snap.get("counters", []):
+        name = f"{PREFIX}_{s['name']}_total"
+        header(name, "counter")
+        lines.append(f"{name}{_labels(s['labels'])} {_number(s['value'])}")
+    for s in snap.get("gauges", []):
+        name = f"{PREFIX}_{s['name']}"
+        header(name, "gauge")
+        lines.append(f"{name}{_labels(s['labels'])} {_number(s['value'])}")
+    for s in snap.get("histograms", []):
+        name = f"{PREFIX}_{s['name']}"
+        header(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], s["buckets"]):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(s['labels'], {'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(s['labels'])} {_number(s['sum'])}")
+        lines.append(f"{name}_count{_labels(s['labels'])} {s['count']}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def recorded_run(name):
+    """
+    Reset the metrics, run the block, then store one `pipeline_runs` document
+    {name, startedAt, finishedAt, error, metrics, **fields the block added to
+    the yielded dict}. Does nothing when metrics are disabled.
+    """
+    run = {}
+    if not ENABLED:
+        yield run
+        return
+    import database  # imports this module
+
+    reset()
+    started = datetime.now(timezone.utc)
+    error = None
+    try:
+        yield run
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        database.db[RUNS_COLLECTION].insert_one({
+            **run,
+            "name": name,
+            "startedAt": started.isoformat(),
+            "finishedAt": datetime.now(timezone.utc).isoformat(),
+            "error": error,
+            "metrics": snapshot(),
+        })
@@ -0,0 +1,74 @@
+# migrate_unique_urls.py
+#
+# One-off migration for URL dedup in the database:
+#   1) re-normalize any stored url that still has query params / fragments
+#   2) remove duplicate articles per url (keeping a scored one, else the oldest)
+#   3) build the unique url index that database.insert_articles relies on
+#
+#   python migrate_unique_urls.py [--collection financial_news] [--dry-run]
+
+import argparse
+
+from pymongo import UpdateOne
+
+import database
+from extract_news import normalize_url
+
+
+def renormalize_urls(collection, dry_run=False):
+    changed = 0
+    with database.BulkWriter(collection) as writer:
+        for doc in collection.find({"url": {"$regex": r"[?#]"}}, {"url": 1}):
+            url = normalize_url(doc["url"])
+            if url != doc["url"]:
+                changed += 1
+                if not dry_run:
+                    writer.add(UpdateOne({"_id": doc["_id"]}, {"$set": {"url": url}}))
+    return changed
+
+
+def remove_duplicates(collection, dry_run=False):
+    pipeline = [
+        {"$group": {
+            "_id": "$url",
+            "docs": {"$push": {"_id": "$_id", "scored": {"$ne": [{"$ifNull": ["$sentiment", None]}, None]}}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    to_delete = []
+    groups = 0
+    for group in collection.aggregate(pipeline, allowDiskUse=True):
+        groups += 1
+        # Keep a document that already has sentiment, otherwise the oldest one
+        docs = sorted(group["docs"], key=lambda d: (not d["scored"], d["_id"]))
+        to_delete.extend(d["_id"] for d in docs[1:])
+
+    if not dry_run:
+        for start in range(0, len(to_delete), 1000):
+            collection.delete_many({"_id": {"$in": to_delete[start:start + 1000]}})
+    return groups, len(to_delete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dedupe articles by url and build the unique url index")
+    parser.add_argument("--collection", default="financial_news")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    collection = database.db[args.collection]
+
+    changed = renormalize_urls(collection, args.dry_run)
+    print(f"Re-normalized {changed} urls")
+
+    groups, removed = remove_duplicates(collection, args.dry_run)
+    print(f"Found {groups} duplicated urls, removed {removed} documents")
+
+    if args.dry_run:
+        print("Dry run: no changes written, index not built")
+    elif database.ensure_url_index(args.collection):
+        print(f"Unique url index ready on '{args.collection}'")
+
+
+if __name__ == "__main__":
+    main()
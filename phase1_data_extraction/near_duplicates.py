@@ -0,0 +1,280 @@
+"""
+Near-duplicate clustering of ingested articles (MinHash + LSH).
+
+The same story is often republished under several URLs with a lightly
+edited headline. Each new article gets a MinHash signature of its
+title + description word shingles and is compared, through LSH band keys,
+with the cluster representatives published within DEDUP_WINDOW_HOURS:
+
+  representative: clusterId = own _id, isDuplicate False, clusterSize,
+                  minhash (signature bytes), lshBands (band keys, indexed)
+  duplicate:      clusterId = representative's _id, isDuplicate True
+
+Only representatives carry lshBands, and the lookup is one indexed
+`lshBands $in` query per ingest batch, so the cost per new article depends
+on the number of matching buckets, not on the size of the collection.
+The sentiment stage scores representatives only and copies the label (with
+its score and probabilities, SENTIMENT_FIELDS) to their duplicates; a
+duplicate clustered after its representative was scored copies them here.
+The daily summary counts each cluster once.
+
+    python near_duplicates.py --backfill [--collection financial_news]
+"""
+import argparse
+import hashlib
+import logging
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = config.DEDUP_NUM_PERM
+BANDS = config.DEDUP_BANDS
+ROWS = NUM_PERM // BANDS
+THRESHOLD = config.DEDUP_THRESHOLD
+WINDOW = timedelta(hours=config.DEDUP_WINDOW_HOURS)
+SHINGLE_WORDS = 3
+BACKFILL_BATCH = 1000
+LOOKUP_BATCH = 1000  # articles per lshBands $in lookup, which keeps each query small
+
+# What a duplicate shares with its scored representative
+SENTIMENT_FIELDS = ("sentiment", "sentimentScore", "sentimentProbs", "sentimentAnalyzedAt")
+
+_PRIME = 4294967291  # largest prime below 2**32, so a * hash + b fits in uint64
+# Fixed seed: signatures are stored, and must stay comparable across runs
+_rng = np.random.default_rng(20240501)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def article_text(article):
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+
+def shingles(text):
+    words = _TOKEN.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values), or None for an empty text."""
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sig):
+    """One signed 64-bit key per LSH band (storable as a Mongo long)."""
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([band]) + sig[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                       digest_size=8).digest(), "little", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _published(article):
+    """publishedAt as naive UTC (offsets converted; naive values taken as UTC), or None."""
+    try:
+        published = datetime.fromisoformat((article.get("publishedAt") or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return published
+
+
+class MemoryIndex:
+    """LSH buckets of cluster representatives: band key → [representative]."""
+
+    def __init__(self):
+        self._buckets = defaultdict(list)
+        self._ids = set()
+
+    def __contains__(self, cluster_id):
+        return cluster_id in self._ids
+
+    def add(self, rep):
+        """rep: {clusterId, signature, bands, published, scored: {SENTIMENT_FIELDS} or {}}"""
+        self._ids.add(rep["clusterId"])
+        for key in rep["bands"]:
+            self._buckets[key].append(rep)
+
+    def evict_before(self, published):
+        """Drop representatives published before `published` (outside every later window)."""
+        for key in list(self._buckets):
+            kept = [rep for rep in self._buckets[key] if rep["published"] >= published]
+            if kept:
+                self._buckets[key] = kept
+            else:
+                del self._buckets[key]
+        self._ids = {rep["clusterId"] for reps in self._buckets.values() for rep in reps}
+
+    def best_match(self, sig, bands, published):
+        """The most similar representative within the window, if similar enough."""
+        best, best_sim, seen = None, THRESHOLD, set()
+        for key in bands:
+            for rep in self._buckets.get(key, ()):
+                if rep["clusterId"] in seen or abs(rep["published"] - published) > WINDOW:
+                    continue
+                seen.add(rep["clusterId"])
+                sim = similarity(sig, rep["signature"])
+                if sim >= best_sim:
+                    best, best_sim = rep, sim
+        return best, best_sim
+
+
+def prepare(articles):
+    """[(article, signature, band keys, published)]; signature and bands are None when unusable."""
+    prepared = []
+    for article in articles:
+        sig = signature(article_text(article))
+        published = _published(article)
+        usable = sig is not None and published is not None
+        prepared.append((article, sig if usable else None, band_keys(sig) if usable else None, published))
+    return prepared
+
+
+def cluster_batch(prepared, index):
+    """
+    Assign prepared articles (dicts with _id, title, description,
+    publishedAt) to clusters in order, against `index` and against each
+    other; new representatives are added to `index`.
+    Returns {_id: fields to $set}.
+    """
+    assigned = {}
+    for article, sig, bands, published in prepared:
+        if sig is None:
+            assigned[article["_id"]] = {"clusterId": article["_id"], "isDuplicate": False, "clusterSize": 1}
+            continue
+        rep, sim = index.best_match(sig, bands, published)
+        if rep is None:
+            index.add({"clusterId": article["_id"], "signature": sig, "bands": bands,
+                       "published": published, "scored": {}})
+            assigned[article["_id"]] = {
+                "clusterId": article["_id"], "isDuplicate": False, "clusterSize": 1,
+                "minhash": sig.tobytes(), "lshBands": bands,
+            }
+        else:
+            fields = {"clusterId": rep["clusterId"], "isDuplicate": True, "duplicateSimilarity": round(sim, 3)}
+            fields.update(rep["scored"])
+            assigned[article["_id"]] = fields
+    return assigned
+
+
+def ensure_indexes(collection):
+    collection.create_index([("lshBands", 1), ("publishedAt", 1)], sparse=True)
+    collection.create_index("clusterId", sparse=True)
+
+
+def load_index(collection, prepared, index=None):
+    """
+    Add the stored representatives sharing a band with `prepared`, in their
+    windows, to `index` (default: a new MemoryIndex) and return it.
+    """
+    keys, times = set(), []
+    for _, sig, bands, published in prepared:
+        if sig is not None:
+            keys.update(bands)
+            times.append(published)
+    index = MemoryIndex() if index is None else index
+    if not keys:
+        return index
+    for doc in collection.find(
+        {"lshBands": {"$in": list(keys)},
+         "publishedAt": {"$gte": (min(times) - WINDOW).strftime(_TIME_FORMAT),
+                         "$lte": (max(times) + WINDOW).strftime(_TIME_FORMAT)}},
+        {"minhash": 1, "lshBands": 1, "publishedAt": 1, **{field: 1 for field in SENTIMENT_FIELDS}}
+    ):
+        if doc["_id"] in index:
+            continue
+        scored = {field: doc[field] for field in SENTIMENT_FIELDS if field in doc} if doc.get("sentiment") else {}
+        index.add({"clusterId": doc["_id"], "signature": np.frombuffer(doc["minhash"], dtype=np.uint32),
+                   "bands": doc["lshBands"], "published": _published(doc), "scored": scored})
+    return index
+
+
+@metrics.timed("stage_seconds", stage="dedup")
+def cluster_new_articles(collection_name, articles):
+    """
+    Cluster just-inserted articles against the stored representatives and
+    each other, and write the cluster fields. Returns how many were duplicates.
+    """
+    if not config.DEDUP_ENABLED or not articles:
+        return 0
+    import database  # imports extract_news → this module
+
+    collection = database.db[collection_name]
+    ensure_indexes(collection)
+    prepared = prepare(articles)
+    # Representatives found or created in earlier chunks stay in the index
+    index = MemoryIndex()
+    assigned = {}
+    for start in range(0, len(prepared), LOOKUP_BATCH):
+        chunk = prepared[start:start + LOOKUP_BATCH]
+        assigned.update(cluster_batch(chunk, load_index(collection, chunk, index)))
+
+    cluster_growth = defaultdict(int)
+    with database.BulkWriter(collection) as writer:
+        for _id, fields in assigned.items():
+            writer.update_one({"_id": _id}, {"$set": fields})
+            if fields["isDuplicate"]:
+                cluster_growth[fields["clusterId"]] += 1
+        for rep_id, added in cluster_growth.items():
+            writer.update_one({"_id": rep_id}, {"$inc": {"clusterSize": added}})
+
+    duplicates = sum(cluster_growth.values())
+    metrics.inc("near_duplicates", duplicates)
+    if duplicates:
+        logger.info(f"{duplicates} of {len(articles)} new articles are near-duplicates of {len(cluster_growth)} stories")
+    return duplicates
+
+
+def backfill(collection_name="financial_news"):
+    """Cluster stored articles that predate clustering, oldest first."""
+    import database
+
+    if not config.DEDUP_ENABLED:
+        logger.info("DEDUP_ENABLED is off; nothing to do")
+        return 0
+    collection = database.db[collection_name]
+    total = duplicates = 0
+    while True:
+        batch = list(collection.find(
+            {"clusterId": {"$exists": False}}, {"title": 1, "description": 1, "publishedAt": 1}
+        ).sort("publishedAt", 1).limit(BACKFILL_BATCH))
+        if not batch:
+            break
+        duplicates += cluster_new_articles(collection_name, batch)
+        total += len(batch)
+    logger.info(f"Clustered {total} articles; {duplicates} near-duplicates. "
+                f"Run daily_summary.py --full-rebuild so the summaries count each story once.")
+    return duplicates
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Near-duplicate clustering of stored articles")
+    parser.add_argument("--backfill", action="store_true", help="cluster articles that have no clusterId yet")
+    parser.add_argument("--collection", default="financial_news")
+    args = parser.parse_args()
+    if args.backfill:
+        backfill(args.collection)
@@ -0,0 +1,113 @@
+# inference_backends.py
+
+import os
+import logging
+
+import numpy as np
+import torch
+from torch.nn.functional import softmax
+from transformers import BertTokenizer, BertForSequenceClassification
+
+logger = logging.getLogger(__name__)
+
+
+class TorchBackend:
+    """Stock fp32 BertForSequenceClassification."""
+
+    name = "torch"
+
+    def __init__(self, model_name, revision="main"):
+        self.tokenizer = BertTokenizer.from_pretrained(model_name, revision=revision)
+        self.model = BertForSequenceClassification.from_pretrained(model_name, revision=revision)
+        self.model.eval()
+
+    def predict_proba(self, features):
+        """Pad a dict of unpadded token lists and return an (n, labels) numpy array."""
+        inputs = self.tokenizer.pad(features, return_tensors="pt")
+        with torch.inference_mode():
+            return softmax(self.model(**inputs).logits, dim=1).numpy()
+
+
+class QuantizedBackend(TorchBackend):
+    """Same model with Linear layers dynamically quantized to int8."""
+
+    name = "quantized"
+
+    def __init__(self, model_name, revision="main"):
+        super().__init__(model_name, revision)
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime session over an exported copy of the model. The export is
+    done once and reused from `onnx_path` on later runs.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, revision="main", onnx_path=None, num_threads=0):
+        import onnxruntime as ort
+
+        self.tokenizer = BertTokenizer.from_pretrained(model_name, revision=revision)
+        onnx_path = onnx_path or _default_onnx_path(model_name, revision)
+        if not os.path.exists(onnx_path):
+            _export_onnx(model_name, revision, onnx_path)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict_proba(self, features):
+        inputs = self.tokenizer.pad(features, return_tensors="np")
+        feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedBackend.name: QuantizedBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name, model_name, revision="main", **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}', expected one of {sorted(BACKENDS)}")
+    logger.info(f"Loading {model_name}@{revision} with '{name}' backend")
+    if name == OnnxBackend.name:
+        return OnnxBackend(model_name, revision, **kwargs)
+    return BACKENDS[name](model_name, revision)
+
+
+def _default_onnx_path(model_name, revision):
+    safe = f"{model_name}@{revision}".replace("/", "__")
+    return os.path.join(os.path.dirname(__file__), "onnx", f"{safe}.onnx")
+
+
+def _export_onnx(model_name, revision, onnx_path):
+    logger.info(f"Exporting {model_name}@{revision} to ONNX at {onnx_path}")
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    tokenizer = BertTokenizer.from_pretrained(model_name, revision=revision)
+    model = BertForSequenceClassification.from_pretrained(model_name, revision=revision)
+    model.eval()
+
+    sample = tokenizer(["S&P 500 futures rose after the Fed decision."], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    torch.onnx.export(
+        model,
+        tuple(sample[n] for n in names),
+        onnx_path,
+        input_names=names,
+        output_names=["logits"],
+        dynamic_axes={**{n: {0: "batch", 1: "sequence"} for n in names}, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
@@ -1,63 +1,440 @@
 import sys
 import os
+import argparse
 import logging
-import torch
-from transformers import BertTokenizer, BertForSequenceClassification
-from torch.nn.functional import softmax
-from datetime import datetime, timezone
+import math
+import multiprocessing
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 
 # --- Fix the import path so Python can find database.py ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')))
 
-import database  
+# database (pymongo) and inference_backends (torch/transformers) are imported
+# lazily, so importing this module for its helpers stays cheap.
+import config
+import metrics
+from sentiment_cache import SentimentCache, normalize_text
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO) 
 logger = logging.getLogger(__name__)
 
-# --- Load FinBERT model and tokenizer ---
+# --- FinBERT model and tokenizer (loaded on first inference) ---
 MODEL_NAME = "yiyanghkust/finbert-tone"
-tokenizer = BertTokenizer.from_pretrained(MODEL_NAME)
-model = BertForSequenceClassification.from_pretrained(MODEL_NAME)
+MODEL_REVISION = config.SENTIMENT_MODEL_REVISION
+BACKEND = config.SENTIMENT_BACKEND
+
+LABELS = ["positive", "negative", "neutral"]
+
+POOLING = config.SENTIMENT_POOLING
+POOLINGS = ("truncate", "mean", "attention")
+ATTENTION_TEMPERATURE = 0.5  # lower: attention pooling leans harder on the most confident windows
+
+_backend = None
+_backend_lock = threading.Lock()
+_num_threads = config.SENTIMENT_NUM_THREADS
+
+def get_backend():
+    """Process-wide inference backend, loaded the first time it is needed."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                import torch
+                from inference_backends import load_backend
+
+                # Cap intra-op threads so several scorers can share a box without oversubscribing
+                if _num_threads > 0:
+                    torch.set_num_threads(_num_threads)
+                _backend = load_backend(
+                    BACKEND, MODEL_NAME, MODEL_REVISION,
+                    **({"onnx_path": config.SENTIMENT_ONNX_PATH, "num_threads": _num_threads}
+                       if BACKEND == "onnx" else {})
+                )
+    return _backend
+
+def is_model_loaded():
+    return _backend is not None
+
+def sentiment_score(probs):
+    """Continuous sentiment in [-1, 1]: P(positive) - P(negative)."""
+    return float(probs[LABELS.index("positive")] - probs[LABELS.index("negative")])
 
 # --- Analyze sentiment from given text ---
 def analyze_sentiment(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    probs = softmax(outputs.logits, dim=1).squeeze()
-    labels = ["positive", "negative", "neutral"]
-    sentiment = labels[torch.argmax(probs).item()]
-    return sentiment
+    return analyze_sentiment_batch([text])[0][0]
+
+# --- Analyze sentiment for many texts in padded batches ---
+def analyze_sentiment_batch(texts, batch_size=None):
+    """
+    Score a list of texts with the configured backend and return
+    [(label, probs), ...] in input order, where probs is the softmax
+    vector aligned with LABELS.
+    Texts are sorted by token length before batching so each batch is
+    padded only up to its own longest member. Texts are truncated to 512
+    tokens unless SENTIMENT_POOLING selects windowed scoring.
+    """
+    if not texts:
+        return []
+    if POOLING not in POOLINGS:
+        raise ValueError(f"Unknown SENTIMENT_POOLING '{POOLING}', expected one of {POOLINGS}")
+    if POOLING != "truncate":
+        return analyze_sentiment_windows(texts, batch_size, POOLING)
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    backend = get_backend()
+
+    # Tokenize once without padding; padding happens per length bucket below
+    encoded = backend.tokenizer(list(texts), truncation=True, padding=False)
+    order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+    results = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        features = {key: [encoded[key][i] for i in idx] for key in encoded.keys()}
+        with metrics.timer("inference_batch_seconds", backend=BACKEND):
+            probs = backend.predict_proba(features)
+        metrics.inc("texts_inferred", len(idx))
+        for i, p in zip(idx, probs):
+            results[i] = (LABELS[int(p.argmax())], [float(x) for x in p])
+    return results
+
+# --- Long texts: overlapping token windows with pooled probabilities ---
+def window_spans(n_tokens, size=None, overlap=None, max_windows=None):
+    """(start, end) token spans of overlapping windows covering n_tokens."""
+    size = size or config.SENTIMENT_WINDOW_TOKENS
+    overlap = config.SENTIMENT_WINDOW_OVERLAP if overlap is None else overlap
+    max_windows = max_windows or config.SENTIMENT_MAX_WINDOWS
+    if n_tokens <= size:
+        return [(0, n_tokens)]
+    step = max(1, size - overlap)
+    starts = list(range(0, n_tokens - size, step)) + [n_tokens - size]
+    if len(starts) > max_windows:
+        # Evenly spaced subset that still includes the first and the last window
+        starts = [starts[round(i * (len(starts) - 1) / max(1, max_windows - 1))] for i in range(max_windows)]
+    return [(s, s + size) for s in starts]
+
+def analyze_sentiment_windows(texts, batch_size=None, pooling="mean"):
+    """
+    Same contract as analyze_sentiment_batch, for texts of any length: each
+    text is split into overlapping windows of SENTIMENT_WINDOW_TOKENS, the
+    windows are scored in length-sorted batches, and each text's window
+    probabilities are pooled into one vector:
+
+      mean       windows weighted by their token count
+      attention  softmax over windows of log(tokens) - entropy / ATTENTION_TEMPERATURE,
+                 so confident windows dominate
+
+    Texts are tokenized and windowed `batch_size` texts at a time, and
+    pooling keeps one running sum per text (an online softmax for
+    attention), so memory holds one chunk of texts' token ids and one batch
+    of windows rather than the whole input's.
+    Texts that fit in one window get the same result as truncation.
+    """
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    backend = get_backend()
+    tokenizer = backend.tokenizer
+
+    sums = np.zeros((len(texts), len(LABELS)))
+    weights = np.zeros(len(texts))
+    top = np.full(len(texts), -np.inf)  # running max attention logit per text
+    cls, sep = tokenizer.cls_token_id, tokenizer.sep_token_id  # FinBERT is a BERT: [CLS] window [SEP]
+    for first in range(0, len(texts), batch_size):
+        chunk_texts = list(texts[first:first + batch_size])
+        token_ids = tokenizer(chunk_texts, add_special_tokens=False, truncation=False, padding=False)["input_ids"]
+        windows = [(first + j, s, e) for j, ids in enumerate(token_ids) for s, e in window_spans(len(ids))]
+        windows.sort(key=lambda w: w[2] - w[1])
+
+        for start in range(0, len(windows), batch_size):
+            chunk = windows[start:start + batch_size]
+            input_ids = [[cls, *token_ids[i - first][s:e], sep] for i, s, e in chunk]
+            features = {
+                "input_ids": input_ids,
+                "token_type_ids": [[0] * len(ids) for ids in input_ids],
+                "attention_mask": [[1] * len(ids) for ids in input_ids],
+            }
+            with metrics.timer("inference_batch_seconds", backend=BACKEND):
+                probs = backend.predict_proba(features)
+            metrics.inc("inference_windows", len(chunk))
+
+            for (i, s, e), p in zip(chunk, probs):
+                tokens = max(1, e - s)
+                if pooling == "attention":
+                    entropy = -float(np.sum(p * np.log(np.clip(p, 1e-12, 1.0))))
+                    logit = math.log(tokens) - entropy / ATTENTION_TEMPERATURE
+                    if logit > top[i]:
+                        rescale = math.exp(top[i] - logit)
+                        sums[i] *= rescale
+                        weights[i] *= rescale
+                        top[i] = logit
+                    w = math.exp(logit - top[i])
+                else:
+                    w = tokens
+                sums[i] += w * p
+                weights[i] += w
+
+    metrics.inc("texts_inferred", len(texts))
+    pooled = sums / weights[:, None]
+    return [(LABELS[int(p.argmax())], [float(x) for x in p]) for p in pooled]
+
+# --- Content-hash cache in front of batched inference ---
+_cache = None
+
+def get_cache():
+    """Per-process SentimentCache for the current model, or None when disabled."""
+    global _cache
+    if _cache is None and config.SENTIMENT_CACHE_ENABLED:
+        path = config.SENTIMENT_CACHE_PATH or os.path.join(os.path.dirname(__file__), "sentiment_cache.sqlite")
+        # Backends differ numerically, so each keys its own entries
+        variant = BACKEND
+        if POOLING != "truncate":
+            # Window settings change long-text results too
+            variant += (f"+{POOLING}:{config.SENTIMENT_WINDOW_TOKENS}/{config.SENTIMENT_WINDOW_OVERLAP}"
+                        f"/{config.SENTIMENT_MAX_WINDOWS}")
+        _cache = SentimentCache(path, MODEL_NAME, MODEL_REVISION, variant)
+    return _cache
+
+def analyze_sentiment_cached(texts, batch_size=None):
+    """
+    Same contract as analyze_sentiment_batch, but texts are normalized first,
+    identical texts are scored once, and previously scored texts come from
+    the cache instead of the model.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    cache = get_cache()
+    if cache is None:
+        unique = list(dict.fromkeys(normalized))
+        scored = dict(zip(unique, analyze_sentiment_batch(unique, batch_size)))
+        return [scored[t] for t in normalized]
+
+    keys = [cache.key(t) for t in normalized]
+    unique = dict(zip(keys, normalized))
+    cache.record_duplicates(len(keys) - len(unique))
+    found = cache.get_many(list(unique))
+    metrics.inc("sentiment_cache_hits", len(found))
+
+    todo = [k for k in unique if k not in found]
+    fresh = dict(zip(todo, analyze_sentiment_batch([unique[k] for k in todo], batch_size)))
+    cache.put_many(fresh)
+    found.update(fresh)
+    return [found[k] for k in keys]
+
+def _article_text(article):
+    return article.get("content") or article.get("description") or article.get("title")
+
+# --- Lease-based work claiming ---
+# Unscored articles are leased in chunks (sentimentLeaseOwner / sentimentLeaseExpiresAt)
+# so several processes or machines can drain the backlog without double-scoring.
+# A lease that is never released (crashed worker) simply expires and is reclaimed.
+def claim_articles(collection, owner, size=None, lease_seconds=None, article_ids=None):
+    size = size or config.SENTIMENT_CLAIM_SIZE
+    lease_seconds = lease_seconds or config.SENTIMENT_LEASE_SECONDS
+    now = datetime.now(timezone.utc)
+    claimable = _claimable_query(now)
+    if article_ids is not None:
+        # Only these articles (e.g. the ones an ingest run just inserted)
+        claimable["_id"] = {"$in": list(article_ids)}
+
+    ids = [doc["_id"] for doc in collection.find(claimable, {"_id": 1}).limit(size)]
+    if not ids:
+        return []
+
+    # The filter is re-checked per document, so a concurrent claimer can't take the same ones
+    collection.update_many(
+        {"_id": {"$in": ids}, **claimable},
+        {"$set": {
+            "sentimentLeaseOwner": owner,
+            "sentimentLeaseExpiresAt": now + timedelta(seconds=lease_seconds)
+        }}
+    )
+    return list(collection.find(
+        {"_id": {"$in": ids}, "sentimentLeaseOwner": owner, "sentiment": None},
+        {"content": 1, "description": 1, "title": 1}
+    ))
+
+def _claimable_query(now):
+    # Near-duplicates (near_duplicates.py) get their representative's label instead
+    return {"sentiment": None, "sentimentLeaseExpiresAt": {"$not": {"$gt": now}}, "isDuplicate": {"$ne": True}}
+
+def _lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def label_unscored_duplicates(collection):
+    """
+    Copy the sentiment fields of scored representatives to their unscored
+    duplicates: ones clustered at ingest after the representative was scored,
+    concurrently with the scorer. Returns how many clusters were updated.
+    """
+    from near_duplicates import SENTIMENT_FIELDS
+
+    cluster_ids = collection.distinct("clusterId", {"sentiment": None, "isDuplicate": True})
+    if not cluster_ids:
+        return 0
+    import database
+
+    updated = 0
+    with database.BulkWriter(collection) as writer:
+        for rep in collection.find({"_id": {"$in": cluster_ids}, "sentiment": {"$ne": None}},
+                                   {field: 1 for field in SENTIMENT_FIELDS}):
+            writer.update_many(
+                {"clusterId": rep["_id"], "isDuplicate": True, "sentiment": None},
+                {"$set": {field: rep[field] for field in SENTIMENT_FIELDS if field in rep}}
+            )
+            updated += 1
+    if updated:
+        logger.info(f"Labelled the unscored duplicates of {updated} scored stories")
+    return updated
 
 # --- Analyze and update all articles missing sentiment ---
-def analyze_and_update_articles(collection_name):
+@metrics.timed("stage_seconds", stage="sentiment")
+def analyze_and_update_articles(collection_name, batch_size=None, workers=1):
+    import database
+
     collection = database.db[collection_name]
-    articles = collection.find({"sentiment": None})
-
-    for article in articles:
-        _id = article["_id"]
-        content = article.get("content") or article.get("description") or article.get("title")
-        if not content:
-            continue
-
-        try:
-            sentiment = analyze_sentiment(content)
-            collection.update_one(
-                {"_id": _id},
-                {
-                    "$set": {
-                        "sentiment": sentiment,
-                        "sentimentAnalyzedAt": datetime.now(timezone.utc).isoformat()
-                    }
-                }
-            )
-            logger.info(f"Updated article {_id} with sentiment: {sentiment}")
-        except Exception as e:
-            logger.error(f"Failed to analyze sentiment for article {_id}: {e}")
+    collection.create_index([("sentiment", 1), ("sentimentLeaseExpiresAt", 1)])
+    label_unscored_duplicates(collection)
+
+    # Nothing to score: return before any model (or worker process) is started
+    if collection.find_one(_claimable_query(datetime.now(timezone.utc)), {"_id": 1}) is None:
+        logger.info(f"No unscored articles in '{collection_name}'")
+        return 0
+
+    if workers > 1:
+        return _run_worker_pool(collection_name, batch_size, workers)
+
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    owner = _lease_owner()
+
+    # Results are written back through unordered bulk_write batches
+    scored = 0
+    with database.BulkWriter(collection) as writer:
+        while True:
+            claimed = claim_articles(collection, owner)
+            if not claimed:
+                break
+            scored += _score_claimed(writer, claimed, batch_size, owner)
+
+    logger.info(
+        f"[{owner}] Scored {scored} articles; {writer.written} documents written (duplicates included) "
+        f"in {len(writer.flush_counts)} flushes {writer.flush_counts} ({writer.failed} failed)"
+    )
+    if get_cache() is not None:
+        logger.info(f"[{owner}] Sentiment {get_cache().stats()}")
+    return scored
+
+@metrics.timed("stage_seconds", stage="sentiment")
+def score_articles(collection_name, ids, batch_size=None):
+    """
+    Score the given articles instead of searching the collection for unscored
+    ones; used by run_pipeline to score what ingest just inserted. Articles
+    already scored or leased elsewhere are skipped. Returns how many were scored.
+    """
+    import database
+
+    if not ids:
+        return 0
+    collection = database.db[collection_name]
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    claim_size = config.SENTIMENT_CLAIM_SIZE
+    owner = _lease_owner()
+
+    scored = 0
+    with database.BulkWriter(collection) as writer:
+        for start in range(0, len(ids), claim_size):
+            claimed = claim_articles(collection, owner, size=claim_size, article_ids=ids[start:start + claim_size])
+            scored += _score_claimed(writer, claimed, batch_size, owner)
+    return scored
+
+def _score_claimed(writer, claimed, batch_size, owner):
+    """Score claimed articles and queue their writes; returns how many were written."""
+    pending = []
+    for article in claimed:
+        content = _article_text(article)
+        if content:
+            pending.append((article["_id"], content))
+    if not pending:
+        return 0
+    return _score_and_queue(writer, pending, batch_size, owner)
+
+def _score_and_queue(writer, pending, batch_size, owner):
+    try:
+        results = analyze_sentiment_cached([text for _, text in pending], batch_size)
+    except Exception as e:
+        logger.error(f"Failed to analyze sentiment for {len(pending)} articles: {e}")
+        return 0
+
+    analyzed_at = datetime.now(timezone.utc).isoformat()
+    fields = {}
+    for (_id, _), (sentiment, probs) in zip(pending, results):
+        fields[_id] = {
+            "sentiment": sentiment,
+            "sentimentScore": round(sentiment_score(probs), 6),
+            "sentimentProbs": {label: round(float(p), 6) for label, p in zip(LABELS, probs)},
+            "sentimentAnalyzedAt": analyzed_at,
+        }
+        writer.update_one(
+            {"_id": _id, "sentimentLeaseOwner": owner},
+            {
+                # summaryPending is picked up by daily_summary's incremental fold
+                "$set": {**fields[_id], "summaryPending": True},
+                "$unset": {"sentimentLeaseOwner": "", "sentimentLeaseExpiresAt": ""}
+            }
+        )
+
+    # Only articles whose lease was still ours took the write above; their
+    # duplicates share the label but are left out of the daily summary.
+    # Duplicates clustered after this read get it from label_unscored_duplicates.
+    writer.flush()
+    written = list(writer.collection.find(
+        {"_id": {"$in": list(fields)}, "sentimentAnalyzedAt": analyzed_at}, {"clusterSize": 1}
+    ))
+    clusters = 0
+    for doc in written:
+        if doc.get("clusterSize", 1) > 1:
+            writer.update_many({"clusterId": doc["_id"], "isDuplicate": True}, {"$set": fields[doc["_id"]]})
+            clusters += 1
+    metrics.inc("articles_scored", len(written))
+    logger.info(f"Scored {len(written)} articles ({clusters} with near-duplicates)"
+                + (f"; {len(pending) - len(written)} leases lost" if len(written) < len(pending) else ""))
+    return len(written)
+
+# --- Multi-process mode ---
+def _worker_main(collection_name, batch_size, threads):
+    # Runs in a spawned process, so each worker loads the model once on first use
+    global _num_threads
+    _num_threads = threads
+    return analyze_and_update_articles(collection_name, batch_size), metrics.snapshot()
+
+def _run_worker_pool(collection_name, batch_size, workers):
+    threads = config.SENTIMENT_NUM_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Starting {workers} sentiment workers ({threads} threads each)")
+    # spawn rather than fork: each worker gets its own Mongo client and model
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) as pool:
+        results = pool.starmap(_worker_main, [(collection_name, batch_size, threads)] * workers)
+    scored = [n for n, _ in results]
+    for _, worker_metrics in results:
+        # This process' own stage_seconds already spans the workers' runs:
+        # keep theirs under a separate stage so the time isn't counted twice
+        for series in worker_metrics.get("histograms", []):
+            if series["name"] == "stage_seconds":
+                series["labels"]["stage"] += "_worker"
+        metrics.merge(worker_metrics)
+    logger.info(f"Workers scored {sum(scored)} articles {scored}")
+    return sum(scored)
 
 # --- Entry point ---
 if __name__ == "__main__":
-    analyze_and_update_articles("financial_news")
+    parser = argparse.ArgumentParser(description="Score unscored articles with FinBERT")
+    parser.add_argument("--collection", default="financial_news")
+    parser.add_argument("--workers", type=int, default=1, help="number of scoring processes")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    with metrics.recorded_run("sentiment_analysis"):
+        analyze_and_update_articles(args.collection, args.batch_size, args.workers)
 
 #Sentiment 
\ No newline at end of file
@@ -0,0 +1,123 @@
+# sentiment_cache.py
+
+import hashlib
+import json
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# NewsAPI appends e.g. "… [+2345 chars]" to truncated content; the count differs
+# between outlets carrying the same wire story, so it is dropped before hashing.
+_TRUNCATION_MARKER = re.compile(r"\s*(?:…|\.\.\.)?\s*\[\+\d+ chars\]\s*$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of an input text: NFKC, no truncation marker, single spaces."""
+    text = unicodedata.normalize("NFKC", text)
+    text = _TRUNCATION_MARKER.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class SentimentCache:
+    """
+    Persistent sentiment cache keyed by a hash of (model name, revision,
+    variant, normalized text), stored in SQLite with an in-memory LRU in front.
+
+    Because the model identity is part of every key, changing MODEL_NAME or
+    the revision never returns stale scores; rows written by other models
+    are pruned when the cache is opened. The variant (inference backend,
+    long-text pooling) is only part of the key, so switching between
+    variants of the same model keeps every variant's rows.
+    """
+
+    def __init__(self, path, model_name, revision="main", variant="", lru_size=10000):
+        self.model_id = f"{model_name}@{revision}"
+        self.variant = variant
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL,"
+            " label TEXT NOT NULL, probs TEXT NOT NULL, created_at TEXT NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM sentiment_cache WHERE model != ?", (self.model_id,))
+        self._conn.commit()
+
+    def key(self, normalized_text: str) -> str:
+        payload = f"{self.model_id}\0{self.variant}\0{normalized_text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: (label, probs)} for the keys that are cached."""
+        found = {}
+        missing = []
+        for k in keys:
+            if k in self._lru:
+                self._lru.move_to_end(k)
+                found[k] = self._lru[k]
+                self.memory_hits += 1
+            else:
+                missing.append(k)
+
+        # SQLite caps bound parameters per statement, so look up in slices
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, label, probs FROM sentiment_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for k, label, probs in rows:
+                found[k] = (label, json.loads(probs))
+                self._remember(k, found[k])
+            self.disk_hits += len(rows)
+            self.misses += len(chunk) - len(rows)
+        return found
+
+    def record_duplicates(self, n):
+        """Count texts that repeated within one lookup batch as memory hits."""
+        self.memory_hits += n
+
+    def put_many(self, items):
+        """Store {key: (label, probs)} in both tiers."""
+        if not items:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO sentiment_cache (key, model, label, probs, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(k, self.model_id, label, json.dumps(probs), now) for k, (label, probs) in items.items()]
+        )
+        self._conn.commit()
+        for k, value in items.items():
+            self._remember(k, value)
+
+    def _remember(self, k, value):
+        self._lru[k] = value
+        self._lru.move_to_end(k)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return (
+            f"cache hits={self.hits} (memory={self.memory_hits}, disk={self.disk_hits}) "
+            f"misses={self.misses} hit-rate={self.hit_rate():.1%}"
+        )
+
+    def close(self):
+        self._conn.close()
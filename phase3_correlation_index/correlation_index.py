@@ -2,8 +2,12 @@
 
 import sys
 import os
+import argparse
 from datetime import datetime, timezone
-from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 # --- Fix the import path so Python can find database.py ---
 sys.path.append(
@@ -11,11 +15,16 @@ sys.path.append(
         os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')
     )
 )
+import config
 import database  
+import dirty_dates
+import metrics
 
 # alias the db handle you already configured there
 db = database.db
 
+LAG_SUMMARY_COLLECTION = "correlation_lag_summary"
+
 
 def _date_from_iso(iso_ts: str) -> str:
     """
@@ -34,46 +43,212 @@ def _classify_overall(avg_score: float) -> str:
     return "overall_positive" if avg_score >= 0 else "overall_negative"
 
 
+# ─── Vectorized metrics ──────────────────────────────────────────────────────
+# All inputs are aligned on trading days: `x` is the daily sentiment score and
+# `y` the return k trading days later. A window containing a missing return
+# (the last k days of the series) yields NaN.
+
+def align_series(sentiment: pd.Series, returns: pd.Series, lags) -> pd.DataFrame:
+    """
+    Trading-day frame with a `sentiment` column and one `lag<k>` column per
+    lag holding the return k trading days after each row's date.
+    Days without a return (weekends, holidays) are dropped.
+    """
+    returns = returns.dropna().astype(float).sort_index()
+    leads = pd.DataFrame({f"lag{k}": returns.shift(-k) for k in lags}, index=returns.index)
+    return leads.join(sentiment.astype(float).rename("sentiment"), how="inner").sort_index()
+
+
+def rolling_pearson(x: pd.Series, y: pd.Series, window: int) -> np.ndarray:
+    """Pearson correlation over trailing windows, from running sums (O(n))."""
+    return x.rolling(window).corr(y).to_numpy()
+
+
+def _centered_window_ranks(values: np.ndarray, window: int) -> np.ndarray:
+    """Average ranks within every trailing window (one row per window), mean-centered."""
+    ranks = pd.DataFrame(sliding_window_view(values, window)).rank(axis=1).to_numpy()
+    return ranks - ranks.mean(axis=1, keepdims=True)
+
+
+def _spearman_from_ranks(rx: np.ndarray, ry: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(n, np.nan)
+    if len(rx):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[n - len(rx):] = (rx * ry).sum(axis=1) / np.sqrt((rx * rx).sum(axis=1) * (ry * ry).sum(axis=1))
+    return out
+
+
+def rolling_spearman(x: pd.Series, y: pd.Series, window: int) -> np.ndarray:
+    """
+    Spearman correlation over trailing windows: every window is ranked at once
+    (average ranks for ties) on a strided view, then correlated row-wise.
+    This is O(n·w log w) rather than O(n), since ranks can't be updated
+    incrementally, but stays vectorized.
+    """
+    if len(x) < window:
+        return np.full(len(x), np.nan)
+    return _spearman_from_ranks(
+        _centered_window_ranks(x.to_numpy(), window),
+        _centered_window_ranks(y.to_numpy(), window),
+        len(x)
+    )
+
+
+def rolling_hit_rate(x: pd.Series, y: pd.Series, window: int) -> np.ndarray:
+    """
+    Share of days in the window where the sentiment sign matched the return
+    sign (days where either is exactly zero are not counted).
+    """
+    valid = (x != 0) & (y != 0) & y.notna()
+    hits = (valid & (np.sign(x) == np.sign(y))).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = hits.rolling(window).sum() / valid.astype(float).rolling(window).sum()
+    rate[y.rolling(window).count() < window] = np.nan
+    return rate.to_numpy()
+
+
+def compute_rolling_metrics(frame: pd.DataFrame, windows, lags) -> dict:
+    """{(metric, window, lag): array aligned with frame.index} for every combination."""
+    x = frame["sentiment"]
+    n = len(frame)
+    rolling = {}
+    for w in windows:
+        # Sentiment ranks are shared by every lag at this window
+        rx = _centered_window_ranks(x.to_numpy(), w) if n >= w else None
+        for k in lags:
+            y = frame[f"lag{k}"]
+            rolling[("pearson", w, k)] = rolling_pearson(x, y, w)
+            rolling[("spearman", w, k)] = (
+                _spearman_from_ranks(rx, _centered_window_ranks(y.to_numpy(), w), n)
+                if rx is not None else np.full(n, np.nan)
+            )
+            rolling[("hit_rate", w, k)] = rolling_hit_rate(x, y, w)
+    return rolling
+
+
+def lag_summary(frame: pd.DataFrame, lags) -> list:
+    """Full-sample cross-correlation of sentiment with the return k days later, per lag."""
+    rows = []
+    for k in lags:
+        pair = frame[["sentiment", f"lag{k}"]].dropna()
+        x, y = pair["sentiment"], pair[f"lag{k}"]
+        valid = (x != 0) & (y != 0)
+        with np.errstate(invalid="ignore", divide="ignore"):  # constant series → NaN
+            rows.append({
+                "lag": k,
+                "observations": len(pair),
+                "pearson": _clean(x.corr(y)) if len(pair) > 1 else None,
+                "spearman": _clean(x.rank().corr(y.rank())) if len(pair) > 1 else None,
+                "hit_rate": _clean((np.sign(x[valid]) == np.sign(y[valid])).mean()) if valid.any() else None,
+            })
+    return rows
+
+
+def _clean(value):
+    """
+    NaN/inf → None, numpy scalars → float, for storing in Mongo. Values are
+    rounded so that rolling-sum drift doesn't make unchanged days look changed.
+    """
+    value = float(value)
+    return round(value, 12) if np.isfinite(value) else None
+
+
+# ─── Stage ───────────────────────────────────────────────────────────────────
+
+@metrics.timed("stage_seconds", stage="correlation")
 def compute_correlation_index(
     source_collection: str = "daily_sentiment_summary",
-    output_collection: str = "correlation_index"
+    output_collection: str = "correlation_index",
+    returns_collection: str = "sp500_daily_returns",
+    full_rebuild: bool = False,
+    windows=None,
+    lags=None
 ):
     """
-    Reads daily summaries, computes correlation index placeholder,
-    classifies overall sentiment, and upserts results.
+    Joins daily sentiment with S&P 500 daily returns and computes, per day,
+    rolling Pearson/Spearman correlations and sign hit rates for every
+    (window, lag) pair, plus the overall sentiment classification.
+    `correlation_with_market` is the Pearson value at the first window and
+    lag 0 (or the first lag if 0 is not configured).
+
+    The whole series is recomputed in memory, since a changed day shifts
+    every window that contains it, but only days whose values changed are
+    written, in one bulk operation. The stage runs only when some daily
+    summary changed since the last run, unless `full_rebuild` is set.
     """
-    src = db[source_collection]
+    windows = list(windows or config.CORRELATION_WINDOWS)
+    lags = list(lags if lags is not None else config.CORRELATION_LAGS)
+    main_lag = 0 if 0 in lags else lags[0]
+
     out = db[output_collection]
 
-    # Load all summaries with date & average_score
-    daily_docs = list(src.find({}, {"date": 1, "average_score": 1}))
-    if not daily_docs:
-        print("No daily summaries found in the source collection.")
+    consumed = dirty_dates.all_dates("correlation") if full_rebuild else dirty_dates.pending("correlation")
+    if not full_rebuild and not consumed:
+        print("No changed daily summaries to process.")
         return
 
-    # Build a map: { "2025-05-04": 0.3333, ... }
-    scores_by_date = {
+    # Load the summaries with date & average_score, and the returns
+    sentiment = pd.Series({
         doc["date"]: doc["average_score"]
-        for doc in daily_docs
-        if "average_score" in doc
-    }
-
-    # Upsert each day's correlation and overall sentiment
-    for day, avg in sorted(scores_by_date.items()):
-        overall = _classify_overall(avg)
-        out.update_one(
-            {"date": day},
-            {"$set": {
-                "date": day,
-                "correlation_with_market": avg,       # placeholder
-                "overall_sentiment": overall,
-                "computedAt": datetime.now(timezone.utc).isoformat()
-            }},
-            upsert=True
-        )
-
-    print(f"Correlation index computed for {len(scores_by_date)} days.")
+        for doc in db[source_collection].find({"average_score": {"$ne": None}}, {"date": 1, "average_score": 1})
+    }, dtype=float).sort_index()
+    if sentiment.empty:
+        print("No daily summaries found in the source collection.")
+        dirty_dates.mark_done("correlation", consumed)
+        return
+    returns = pd.Series({
+        doc["Date"]: doc.get("Return")
+        for doc in db[returns_collection].find({}, {"Date": 1, "Return": 1})
+    }, dtype=float)
+
+    frame = align_series(sentiment, returns, lags)
+    rolling = compute_rolling_metrics(frame, windows, lags)
+    position = {day: i for i, day in enumerate(frame.index)}
+
+    # One document per sentiment day; days without a return keep null metrics
+    docs = {}
+    for day, avg in sentiment.items():
+        i = position.get(day)
+        correlations = {
+            f"w{w}": {
+                f"lag{k}": {
+                    metric: (_clean(rolling[(metric, w, k)][i]) if i is not None else None)
+                    for metric in ("pearson", "spearman", "hit_rate")
+                }
+                for k in lags
+            }
+            for w in windows
+        }
+        docs[day] = {
+            "date": day,
+            "overall_sentiment": _classify_overall(avg),
+            "correlation_with_market": correlations[f"w{windows[0]}"][f"lag{main_lag}"]["pearson"],
+            "correlations": correlations,
+        }
+
+    # Skip days whose stored values are already current
+    if not full_rebuild:
+        for stored in out.find({}, {"_id": 0, "computedAt": 0}):
+            if docs.get(stored.get("date")) == stored:
+                del docs[stored["date"]]
+
+    computed_at = datetime.now(timezone.utc).isoformat()
+    with database.BulkWriter(out, batch_size=max(len(docs), 1)) as writer:
+        for day, doc in docs.items():
+            writer.update_one({"date": day}, {"$set": {**doc, "computedAt": computed_at}}, upsert=True)
+
+    with database.BulkWriter(db[LAG_SUMMARY_COLLECTION]) as writer:
+        for row in lag_summary(frame, lags):
+            writer.update_one({"_id": f"lag{row['lag']}"}, {"$set": {**row, "computedAt": computed_at}}, upsert=True)
+
+    dirty_dates.mark_done("correlation", consumed)
+    print(f"Correlation index computed over {len(frame)} trading days "
+          f"(windows {windows}, lags {lags}); {len(docs)} days updated.")
 
 
 if __name__ == "__main__":
-    compute_correlation_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compute the daily correlation index")
+    parser.add_argument("--full-rebuild", action="store_true", help="recompute every day")
+    args = parser.parse_args()
+    with metrics.recorded_run("correlation_index"):
+        compute_correlation_index(full_rebuild=args.full_rebuild)
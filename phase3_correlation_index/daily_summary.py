@@ -1,12 +1,14 @@
 import sys
 import os
-from datetime import datetime
+import argparse
 from collections import defaultdict
-from statistics import mean
+from datetime import datetime
 
 # Add phase1_data_extraction to path for importing database module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')))
 import database  # Your MongoDB setup from phase1
+import dirty_dates
+import metrics
 
 db = database.db
 
@@ -17,49 +19,227 @@ SENTIMENT_SCORES = {
     "negative": -1
 }
 
-def summarize_sentiment(input_collection="financial_news", output_collection="daily_sentiment_summary"):
-    # Fetch only articles with analyzed sentiment
-    articles = db[input_collection].find({
-        "sentiment": {"$in": list(SENTIMENT_SCORES.keys())}
-    })
 
-    grouped = defaultdict(list)
+# How many newly scored articles are folded into the summaries per round
+FOLD_BATCH = 5000
 
-    # Group scores by date
-    for article in articles:
-        published_at = article.get("publishedAt")
-        sentiment = article.get("sentiment")
 
-        if not published_at or sentiment not in SENTIMENT_SCORES:
-            continue
+def ensure_indexes(input_collection="financial_news", output_collection="daily_sentiment_summary"):
+    # Lets the $match/$project below run as a covered index scan
+    db[input_collection].create_index([("sentiment", 1), ("publishedAt", 1)])
+    # Sparse: only articles scored since the last summary run are in it
+    db[input_collection].create_index("summaryPending", sparse=True)
+    # $merge matches output documents on "date", which must be uniquely indexed
+    db[output_collection].create_index("date", unique=True)
 
-        try:
-            date = published_at.split("T")[0]  # Extract "YYYY-MM-DD"
-            score = SENTIMENT_SCORES[sentiment]
-            grouped[date].append(score)
-        except Exception as e:
-            print(f"Skipping article due to error: {e}")
 
-    if not grouped:
-        print("No valid sentiment data found.")
-        return
+def daily_summary_pipeline(output_collection=None, match=None, by_source=False):
+    """
+    Aggregation that groups scored articles by publishedAt day (YYYY-MM-DD) into
+    count / score_sum / average_score and per-label counts. With
+    `output_collection`, the result is $merge'd there instead of returned.
+    `by_source` groups per (day, source) instead, for rollups.rebuild.
+    """
+    labels = list(SENTIMENT_SCORES.keys())
+    score = {"$switch": {
+        "branches": [{"case": {"$eq": ["$sentiment", label]}, "then": value}
+                     for label, value in SENTIMENT_SCORES.items() if value != 0],
+        "default": 0
+    }}
+    stages = [
+        {"$match": {
+            "sentiment": {"$in": labels},
+            "publishedAt": {"$type": "string", "$gt": ""},
+            "isDuplicate": {"$ne": True},
+            **(match or {})
+        }},
+        {"$project": {"_id": 0, "sentiment": 1, "publishedAt": 1, **({"source": 1} if by_source else {})}},
+        {"$group": {
+            "_id": ({"date": {"$substrCP": ["$publishedAt", 0, 10]}, "source": {"$ifNull": ["$source", ""]}}
+                    if by_source else {"$substrCP": ["$publishedAt", 0, 10]}),
+            "count": {"$sum": 1},
+            "score_sum": {"$sum": score},
+            **{label: {"$sum": {"$cond": [{"$eq": ["$sentiment", label]}, 1, 0]}} for label in labels}
+        }},
+        {"$project": {
+            "_id": 0,
+            **({"date": "$_id.date", "source": "$_id.source"} if by_source else {"date": "$_id"}),
+            "average_score": {"$divide": ["$score_sum", "$count"]},
+            "count": 1,
+            "score_sum": 1,
+            **{label: 1 for label in labels},
+            "computedAt": {"$literal": datetime.utcnow().isoformat()}
+        }},
+    ]
+    if output_collection:
+        stages.append({"$merge": {
+            "into": output_collection,
+            "on": "date",
+            "whenMatched": "merge",
+            "whenNotMatched": "insert"
+        }})
+    return stages
 
-    # Save daily summaries to MongoDB
-    output = db[output_collection]
-    for date, scores in grouped.items():
-        avg_score = mean(scores)
-        output.update_one(
-            {"date": date},
-            {"$set": {
-                "date": date,
-                "average_score": avg_score,
-                "count": len(scores),
-                "computedAt": datetime.utcnow().isoformat()
-            }},
-            upsert=True
+
+def _running_totals_update(delta):
+    """
+    Pipeline update adding one day's delta to its running totals and
+    recomputing average_score in the same atomic operation. Summaries written
+    before score_sum existed fall back to average_score * count.
+    """
+    labels = list(SENTIMENT_SCORES.keys())
+    old_sum = {"$ifNull": ["$score_sum", {"$multiply": [
+        {"$ifNull": ["$average_score", 0]}, {"$ifNull": ["$count", 0]}
+    ]}]}
+    return [
+        {"$set": {
+            "count": {"$add": [{"$ifNull": ["$count", 0]}, delta["count"]]},
+            "score_sum": {"$add": [old_sum, delta["score_sum"]]},
+            **{label: {"$add": [{"$ifNull": [f"${label}", 0]}, delta[label]]} for label in labels},
+            "computedAt": {"$literal": datetime.utcnow().isoformat()}
+        }},
+        {"$set": {"average_score": {"$divide": ["$score_sum", "$count"]}}}
+    ]
+
+
+@metrics.timed("stage_seconds", stage="summary")
+def fold_pending_articles(input_collection="financial_news", output_collection="daily_sentiment_summary"):
+    """
+    Add articles scored since the last run (summaryPending, set by the sentiment
+    stage together with the score) to their days' running totals, then clear
+    the flag and mark those days dirty for the later phase 3 steps. The same
+    articles are added to the per-source sentiment rollups and to the hourly
+    fear index. Near-duplicates
+    are skipped, so each story counts once (see near_duplicates.py).
+    Returns the set of dates that changed.
+    """
+    import rollups  # imports this module
+    import fear_index  # likewise
+
+    articles = db[input_collection]
+    changed = set()
+    while True:
+        batch = list(articles.find(
+            {"summaryPending": True},
+            {"sentiment": 1, "sentimentScore": 1, "publishedAt": 1, "source": 1, "isDuplicate": 1}
+        ).limit(FOLD_BATCH))
+        if not batch:
+            break
+        counted = [a for a in batch if not a.get("isDuplicate")]
+
+        deltas = defaultdict(lambda: {"count": 0, "score_sum": 0, **{label: 0 for label in SENTIMENT_SCORES}})
+        for article in counted:
+            published_at = article.get("publishedAt")
+            sentiment = article.get("sentiment")
+            if not published_at or sentiment not in SENTIMENT_SCORES:
+                continue
+            delta = deltas[published_at.split("T")[0]]
+            delta["count"] += 1
+            delta["score_sum"] += SENTIMENT_SCORES[sentiment]
+            delta[sentiment] += 1
+
+        with database.BulkWriter(db[output_collection]) as writer:
+            for date, delta in deltas.items():
+                writer.update_one({"date": date}, _running_totals_update(delta), upsert=True)
+        rollups.apply_deltas(rollups.article_totals(counted))
+        fear_index.apply_articles(counted)
+
+        # A crash between the two writes double-counts this batch on the next run;
+        # check_consistency / --full-rebuild repair that.
+        articles.update_many(
+            {"_id": {"$in": [a["_id"] for a in batch]}}, {"$unset": {"summaryPending": ""}}
         )
+        dirty_dates.mark_dirty(list(deltas))
+        changed.update(deltas)
+    return changed
+
+
+def check_consistency(input_collection="financial_news", output_collection="daily_sentiment_summary"):
+    """Compare stored summaries with a fresh full aggregation; returns the mismatching dates."""
+    fields = ["count", "score_sum"] + list(SENTIMENT_SCORES.keys())
+    expected = {d["date"]: d for d in db[input_collection].aggregate(daily_summary_pipeline(), allowDiskUse=True)}
+    stored = {d["date"]: d for d in db[output_collection].find({}, {"_id": 0, "date": 1, **{f: 1 for f in fields}})}
 
-    print(f"Saved sentiment summaries for {len(grouped)} days to '{output_collection}'.")
+    mismatched = []
+    for date in sorted(set(expected) | set(stored)):
+        exp, got = expected.get(date, {}), stored.get(date, {})
+        if any(abs(exp.get(f, 0) - got.get(f, 0)) > 1e-6 for f in fields):
+            mismatched.append(date)
+    print(f"Consistency check: {len(expected)} days expected, {len(mismatched)} mismatched"
+          + (f" ({', '.join(mismatched[:10])}{'…' if len(mismatched) > 10 else ''})" if mismatched else ""))
+    return mismatched
+
+
+def rebuild(input_collection="financial_news", output_collection="daily_sentiment_summary"):
+    """
+    Regroup every article already folded in (summaryPending unset) into a
+    scratch collection and swap it in, so days with no articles left drop
+    out and readers never see a partial summary. The rollups and the fear
+    index are rebuilt over the same articles; articles still pending are
+    folded into all three afterwards as usual, including any scored while
+    the rebuild ran. Returns the dates whose summary may have changed.
+    """
+    import rollups
+    import fear_index
+
+    output = db[output_collection]
+    scratch = db[output_collection + "_rebuild"]
+    scratch.drop()
+    # $merge matches on "date", which must be uniquely indexed on the target
+    scratch.create_index("date", unique=True)
+    previous_days = set(output.distinct("date"))
+
+    # Grouping happens inside MongoDB; no article documents are sent to Python
+    list(db[input_collection].aggregate(
+        daily_summary_pipeline(scratch.name, match={"summaryPending": {"$ne": True}}), allowDiskUse=True
+    ))
+    days = set(scratch.distinct("date"))
+    if days:
+        scratch.rename(output_collection, dropTarget=True)
+    else:
+        scratch.drop()
+        output.drop()
+    ensure_indexes(input_collection, output_collection)
+
+    rollups.rebuild(input_collection)
+    fear_index.rebuild(input_collection)
+    changed = days | previous_days
+    dirty_dates.mark_dirty(sorted(changed))
+    return changed | fold_pending_articles(input_collection, output_collection)
+
+
+@metrics.timed("stage_seconds", stage="summary_run")
+def summarize_sentiment(input_collection="financial_news", output_collection="daily_sentiment_summary",
+                        full_rebuild=False):
+    """
+    By default only articles scored since the last run are folded into the
+    daily totals. `full_rebuild` regroups every scored article server-side.
+    """
+    ensure_indexes(input_collection, output_collection)
+
+    if not full_rebuild:
+        changed = fold_pending_articles(input_collection, output_collection)
+        if not changed:
+            print("No newly scored articles to summarize.")
+            return
+        print(f"Updated sentiment summaries for {len(changed)} days in '{output_collection}'.")
+        return
+
+    rebuild(input_collection, output_collection)
+    days = db[output_collection].count_documents({})
+    if not days:
+        print("No valid sentiment data found.")
+        return
+    print(f"Saved sentiment summaries for {days} days to '{output_collection}'.")
 
 if __name__ == "__main__":
-    summarize_sentiment()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Summarize article sentiment per day")
+    parser.add_argument("--full-rebuild", action="store_true", help="regroup every scored article")
+    parser.add_argument("--check", action="store_true",
+                        help="verify stored summaries against a full recomputation")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check_consistency() else 0)
+    with metrics.recorded_run("daily_summary"):
+        summarize_sentiment(full_rebuild=args.full_rebuild)
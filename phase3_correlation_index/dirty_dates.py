@@ -0,0 +1,59 @@
+# phase3_correlation_index/dirty_dates.py
+#
+# Tracks which days need recomputing by the phase 3 steps.
+#
+# Each day has one document in `dirty_dates`:
+#   {_id: "2025-05-04", version: 7, correlationDone: 7, matchDone: 6}
+# daily_summary bumps `version` whenever the day's summary changes. A stage
+# is dirty for a day while its "<stage>Done" is behind its upstream counter
+# (correlation follows `version`, matching follows `correlationDone`), and
+# records the upstream value it consumed when done. A day re-dirtied while a
+# stage is running therefore stays dirty for the next run.
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')))
+import database
+
+COLLECTION = "dirty_dates"
+
+# stage -> upstream counter it follows
+STAGES = {
+    "correlation": "version",
+    "match": "correlationDone",
+}
+
+
+def mark_dirty(dates):
+    """Record that the daily summaries of `dates` changed."""
+    if not dates:
+        return
+    with database.BulkWriter(database.db[COLLECTION]) as writer:
+        for date in dates:
+            writer.update_one({"_id": date}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def pending(stage):
+    """{date: upstream counter} for the days `stage` still has to recompute."""
+    upstream = STAGES[stage]
+    cursor = database.db[COLLECTION].find(
+        {"$expr": {"$gt": [{"$ifNull": [f"${upstream}", 0]}, {"$ifNull": [f"${stage}Done", 0]}]}},
+        {upstream: 1}
+    )
+    return {doc["_id"]: doc.get(upstream, 0) for doc in cursor}
+
+
+def all_dates(stage):
+    """{date: upstream counter} for every tracked day (used by full rebuilds)."""
+    upstream = STAGES[stage]
+    return {doc["_id"]: doc.get(upstream, 0) for doc in database.db[COLLECTION].find({}, {upstream: 1})}
+
+
+def mark_done(stage, consumed):
+    """Record that `stage` has processed each date up to the counter it read."""
+    if not consumed:
+        return
+    with database.BulkWriter(database.db[COLLECTION]) as writer:
+        for date, counter in consumed.items():
+            writer.update_one({"_id": date}, {"$max": {f"{stage}Done": counter}})
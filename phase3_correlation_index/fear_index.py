@@ -0,0 +1,177 @@
+# phase3_correlation_index/fear_index.py
+#
+# Hourly fear index (0 = greed, 100 = fear), exponentially time-decayed and
+# source-weighted, maintained incrementally as articles are scored.
+#
+# Each scored article i contributes its fear f_i = (1 - sentimentScore) / 2,
+# where sentimentScore = P(positive) - P(negative) from the sentiment stage
+# (articles scored before it was stored fall back to their label's
+# SENTIMENT_SCORES value), with the weight w_i of its source. At the end of
+# hour H the index is
+#
+#   100 * sum(w_i f_i d(H - t_i)) / sum(w_i d(H - t_i)),   d(x) = 0.5 ** (x / half-life)
+#
+# over the articles published up to H. `fear_index_hourly` has one document
+# per hour with articles, holding only that hour's raw sums:
+#   {_id: "2025-05-01T13", articles, fear_sum, weight_sum}   decayed to the hour's end
+# A new article is one $inc on its hour, however late it arrives. The decay
+# is applied when reading: `series` runs the totals forward with one
+# multiply-add per hour, seeded from the hours up to HORIZON before the first
+# one asked for (older hours weigh less than 2**-HORIZON_HALF_LIVES). Decay
+# scales both totals alike, so the index holds its value between hours.
+
+import sys
+import os
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')))
+import config
+import database
+import metrics
+from daily_summary import SENTIMENT_SCORES
+
+db = database.db
+
+COLLECTION = "fear_index_hourly"
+HALF_LIFE_HOURS = config.FEAR_INDEX_HALF_LIFE_HOURS
+SOURCE_WEIGHTS = config.FEAR_INDEX_SOURCE_WEIGHTS
+HOUR_FORMAT = "%Y-%m-%dT%H"
+REBUILD_BATCH = 10000
+HORIZON_HALF_LIVES = 40
+HORIZON = timedelta(hours=HALF_LIFE_HOURS * HORIZON_HALF_LIVES)
+
+
+def _decay(hours):
+    return 0.5 ** (hours / HALF_LIFE_HOURS)
+
+
+def _hour_start(hour: str) -> datetime:
+    return datetime.strptime(hour, HOUR_FORMAT)
+
+
+def article_fear(article):
+    """(published, fear in [0, 1], weight) of a scored article, or None if it can't be placed."""
+    score = article.get("sentimentScore")
+    if score is None:
+        score = SENTIMENT_SCORES.get(article.get("sentiment"))
+    try:
+        published = datetime.fromisoformat((article.get("publishedAt") or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if score is None:
+        return None
+    return published.replace(tzinfo=None), (1 - score) / 2, SOURCE_WEIGHTS.get(article.get("source") or "", 1.0)
+
+
+def hour_deltas(articles):
+    """Scored articles → {hour: {articles, fear_sum, weight_sum}}, decayed to the end of each hour."""
+    deltas = defaultdict(lambda: {"articles": 0, "fear_sum": 0.0, "weight_sum": 0.0})
+    for article in articles:
+        placed = article_fear(article)
+        if placed is None:
+            continue
+        published, fear, weight = placed
+        hour_end = published.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        w = weight * _decay((hour_end - published).total_seconds() / 3600)
+        delta = deltas[published.strftime(HOUR_FORMAT)]
+        delta["articles"] += 1
+        delta["fear_sum"] += w * fear
+        delta["weight_sum"] += w
+    return deltas
+
+
+@metrics.timed("stage_seconds", stage="fear_index")
+def apply_articles(articles):
+    """Add newly scored articles to their hours (one $inc each). Returns the hours changed."""
+    deltas = hour_deltas(articles)
+    if not deltas:
+        return []
+    with database.BulkWriter(db[COLLECTION]) as writer:
+        for hour, delta in deltas.items():
+            writer.update_one({"_id": hour}, {"$inc": delta}, upsert=True)
+    return sorted(deltas)
+
+
+def series(start: datetime, end: datetime = None, collection=None):
+    """
+    [{hour, fearIndex, articles, weight}] for the stored hours from `start`
+    to `end` (inclusive), decaying the raw sums as they are read.
+    """
+    collection = db[COLLECTION] if collection is None else collection
+    hours = {"$gte": (start - HORIZON).strftime(HOUR_FORMAT)}
+    if end is not None:
+        hours["$lte"] = end.strftime(HOUR_FORMAT)
+    first = start.strftime(HOUR_FORMAT)
+
+    level = weight = 0.0
+    last = None
+    out = []
+    for doc in collection.find({"_id": hours}, {"articles": 1, "fear_sum": 1, "weight_sum": 1}).sort("_id", 1):
+        hour = _hour_start(doc["_id"])
+        decay = _decay((hour - last).total_seconds() / 3600) if last else 0.0
+        level = level * decay + doc.get("fear_sum", 0.0)
+        weight = weight * decay + doc.get("weight_sum", 0.0)
+        last = hour
+        if doc["_id"] >= first:
+            out.append({"hour": doc["_id"], "fearIndex": round(100 * level / weight, 2) if weight else None,
+                        "articles": doc.get("articles", 0), "weight": weight})
+    return out
+
+
+@metrics.timed("stage_seconds", stage="fear_index_rebuild")
+def rebuild(input_collection="financial_news"):
+    """
+    Recompute the whole index from the scored articles (each story once, like
+    the daily summary) into a scratch collection, then swap it in, so readers
+    never see a partial index.
+    """
+    scratch = db[COLLECTION + "_rebuild"]
+    scratch.drop()
+    totals = defaultdict(lambda: {"articles": 0, "fear_sum": 0.0, "weight_sum": 0.0})
+    batch = []
+
+    def fold():
+        for hour, delta in hour_deltas(batch).items():
+            for field, value in delta.items():
+                totals[hour][field] += value
+        batch.clear()
+
+    for article in db[input_collection].find(
+        # Articles still pending are added by the next daily_summary fold
+        {"sentiment": {"$in": list(SENTIMENT_SCORES)}, "isDuplicate": {"$ne": True},
+         "summaryPending": {"$ne": True}},
+        {"sentiment": 1, "sentimentScore": 1, "publishedAt": 1, "source": 1}
+    ):
+        batch.append(article)
+        if len(batch) == REBUILD_BATCH:
+            fold()
+    fold()
+
+    with database.BulkWriter(scratch) as writer:
+        for hour, delta in totals.items():
+            writer.update_one({"_id": hour}, {"$set": delta}, upsert=True)
+    if totals:
+        scratch.rename(COLLECTION, dropTarget=True)
+    else:
+        db[COLLECTION].drop()
+    print(f"Rebuilt the fear index over {len(totals)} hours.")
+    return len(totals)
+
+
+def current(collection=None):
+    """The latest hour: {hour, fearIndex, articles, weight}, or None."""
+    collection = db[COLLECTION] if collection is None else collection
+    latest = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return series(_hour_start(latest["_id"]), collection=collection)[-1] if latest else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hourly time-decayed, source-weighted fear index")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every hour from financial_news")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild()
+    print(current())
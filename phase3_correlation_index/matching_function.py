@@ -1,34 +1,31 @@
 #!/usr/bin/env python3
-import os
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime, timezone
 
-from dotenv import load_dotenv
-from pymongo import MongoClient
-import certifi
+# Reuse the pooled client configured in phase1_data_extraction/database.py
+sys.path.append(str(Path(__file__).parent.parent / "phase1_data_extraction"))
+import database
+import dirty_dates
+import metrics
 
-# ─── Load ENV vars from phase1_data_extraction/.env ───────────────────────────
-root     = Path(__file__).parent.parent
-env_path = root / "phase1_data_extraction" / ".env"
-if not env_path.exists():
-    raise FileNotFoundError(f"Could not find .env at {env_path}")
-load_dotenv(env_path)
+db = database.db
 
-# ─── Read Mongo connection info ────────────────────────────────────────────────
-MONGODB_URI   = os.getenv("MONGODB_URI")
-MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "fear_index_db")
-if not MONGODB_URI:
-    raise RuntimeError("Please set MONGODB_URI in your .env")
 
-# ─── Connect to MongoDB Atlas ──────────────────────────────────────────────────
-client = MongoClient(MONGODB_URI, tlsCAFile=certifi.where())
-db     = client[MONGO_DB_NAME]
+def ensure_indexes(corr_coll, ret_coll, out_coll):
+    """Indexes behind the date lookups and the upserts below."""
+    corr_coll.create_index("date")
+    ret_coll.create_index("Date")
+    out_coll.create_index("date")
 
 
+@metrics.timed("stage_seconds", stage="matching")
 def compute_return_sentiment_match(
     corr_coll_name: str = "correlation_index",
     ret_coll_name:  str = "sp500_daily_returns",
-    out_coll_name:  str = "return_sentiment_match"
+    out_coll_name:  str = "return_sentiment_match",
+    full_rebuild:   bool = False
 ):
     """
     For each date in `corr_coll_name`, fetch overall_sentiment and
@@ -36,31 +33,69 @@ def compute_return_sentiment_match(
     Writes 1 for agreement (positive/positive or negative/negative),
     0 for disagreement. Skips dates with zero return or missing data.
     Finally, computes and prints the percentage of matches.
+
+    Only dates whose correlation entry changed since the last run are
+    re-evaluated unless `full_rebuild` is set; dates after the latest stored
+    S&P 500 return stay pending until it arrives. Earlier dates without a
+    return (weekends, holidays) never get one and are marked done.
+    A full rebuild writes into a scratch collection that then replaces
+    `out_coll_name`, so results for dates no longer evaluable are dropped.
     """
     corr_coll = db[corr_coll_name]
     ret_coll  = db[ret_coll_name]
     out_coll  = db[out_coll_name]
+    ensure_indexes(corr_coll, ret_coll, out_coll)
+
+    consumed = dirty_dates.all_dates("match") if full_rebuild else dirty_dates.pending("match")
+    if not full_rebuild and not consumed:
+        print("No changed correlation entries to match.")
+        _print_overall(out_coll)
+        return
 
     hits = 0
     total = 0
     skipped = 0
-
-    cursor = corr_coll.find({}, {"date": 1, "overall_sentiment": 1})
-    for doc in cursor:
+    awaiting_return = set()
+    unevaluable = []
+
+    # One query per collection, joined in memory on the date
+    query = {} if full_rebuild else {"date": {"$in": list(consumed)}}
+    corr_docs = list(corr_coll.find(query, {"date": 1, "overall_sentiment": 1}))
+    returns_by_date = {}
+    dates = [doc.get("date") for doc in corr_docs if doc.get("date")]
+    for ret_doc in ret_coll.find({"Date": {"$in": dates}}, {"Date": 1, "Return": 1}):
+        # first document per date, as find_one would return
+        returns_by_date.setdefault(ret_doc["Date"], ret_doc)
+    latest = ret_coll.find_one({}, {"Date": 1}, sort=[("Date", -1)])
+    latest_return = latest["Date"] if latest else ""
+
+    target = out_coll
+    if full_rebuild:
+        target = db[out_coll_name + "_rebuild"]
+        target.drop()
+        target.create_index("date")
+    writer = database.BulkWriter(target)
+    computed_at = datetime.now(timezone.utc).isoformat()
+    for doc in corr_docs:
         date = doc.get("date")
         overall = doc.get("overall_sentiment")
         if not date or overall not in ("overall_positive", "overall_negative"):
             skipped += 1
+            unevaluable.append(date)
             continue
 
-        ret_doc = ret_coll.find_one({"Date": date}, {"Return": 1})
+        ret_doc = returns_by_date.get(date)
         if not ret_doc or "Return" not in ret_doc:
             skipped += 1
+            if date > latest_return:
+                awaiting_return.add(date)
+            unevaluable.append(date)
             continue
 
         ret_val = ret_doc["Return"]
         if ret_val is None or ret_val == 0:
             skipped += 1
+            unevaluable.append(date)
             continue
 
         # Determine labels
@@ -71,14 +106,14 @@ def compute_return_sentiment_match(
         match = 1 if ret_label == sent_label else 0
 
         # Upsert result
-        out_coll.update_one(
+        writer.update_one(
             {"date": date},
             {"$set": {
                 "date":              date,
                 "overall_sentiment": overall,
                 "return":            ret_val,
                 "match":             match,
-                "computedAt":        datetime.now(timezone.utc).isoformat()
+                "computedAt":        computed_at
             }},
             upsert=True
         )
@@ -86,15 +121,48 @@ def compute_return_sentiment_match(
         total += 1
         hits += match
 
+    writer.flush()
+    if full_rebuild:
+        if total:
+            target.rename(out_coll_name, dropTarget=True)
+        else:
+            out_coll.drop()
+    dirty_dates.mark_done("match", {d: v for d, v in consumed.items() if d not in awaiting_return})
+
+    if not full_rebuild:
+        # A re-evaluated date that can no longer be matched must not keep an old result
+        if unevaluable:
+            out_coll.delete_many({"date": {"$in": unevaluable}})
+        print(f"Processed {total + skipped} changed dates ({total} evaluated, {skipped} skipped).")
+        _print_overall(out_coll)
+        return
+
     # Compute percentage
     percent = (hits / total * 100) if total > 0 else 0
 
     print(f"Processed {total + skipped} dates ({total} evaluated, {skipped} skipped).")
+    _print_percent(percent)
+
+
+def _print_percent(percent):
     print(
         f"According to our program, {percent:.2f}% of times the overall sentiment "
         f"analysis has matched the daily return of the S&P500"
     )
 
 
+def _print_overall(out_coll):
+    """Match percentage over every stored result (equal to a full run's figure)."""
+    totals = list(out_coll.aggregate([
+        {"$group": {"_id": None, "hits": {"$sum": "$match"}, "total": {"$sum": 1}}}
+    ]))
+    hits, total = (totals[0]["hits"], totals[0]["total"]) if totals else (0, 0)
+    _print_percent((hits / total * 100) if total > 0 else 0)
+
+
 if __name__ == "__main__":
-    compute_return_sentiment_match()
+    parser = argparse.ArgumentParser(description="Match overall sentiment against S&P 500 returns")
+    parser.add_argument("--full-rebuild", action="store_true", help="re-evaluate every date")
+    args = parser.parse_args()
+    with metrics.recorded_run("matching_function"):
+        compute_return_sentiment_match(full_rebuild=args.full_rebuild)
@@ -0,0 +1,212 @@
+# phase3_correlation_index/rollups.py
+#
+# Pre-aggregated sentiment counts for the dashboard's range / source filters.
+#
+# `sentiment_rollups` holds one small document per (granularity, period, source):
+#   {_id: "week|2025-04-28|Reuters", granularity: "week", period: "2025-04-28",
+#    source: "Reuters", count, score_sum, positive, neutral, negative, average_score}
+# for granularity day / week (starting Monday) / month, where `period` is the
+# first day of the period and source "all" covers every source. The totals are
+# kept up to date incrementally by daily_summary's fold, so any date range and
+# source is answered by reading a handful of these documents (see query_range)
+# instead of aggregating financial_news.
+
+import sys
+import os
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'phase1_data_extraction')))
+import database
+import metrics
+from daily_summary import SENTIMENT_SCORES, daily_summary_pipeline, _running_totals_update
+
+db = database.db
+
+COLLECTION = "sentiment_rollups"
+ALL_SOURCES = "all"
+GRANULARITIES = ("day", "week", "month")
+FIELDS = ["count", "score_sum"] + list(SENTIMENT_SCORES)
+
+
+def ensure_indexes():
+    db[COLLECTION].create_index([("source", 1), ("granularity", 1), ("period", 1)])
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def rollup_id(granularity, period, source):
+    return f"{granularity}|{period}|{source}"
+
+
+def _empty():
+    return {field: 0 for field in FIELDS}
+
+
+def fan_out(day_source_totals):
+    """
+    {(date str, source): totals} → {rollup _id: totals} for every granularity,
+    for the source itself and for ALL_SOURCES.
+    """
+    out = defaultdict(_empty)
+    for (day_str, source), totals in day_source_totals.items():
+        day = date.fromisoformat(day_str)
+        for granularity in GRANULARITIES:
+            period = period_start(day, granularity).isoformat()
+            for src in {source or "", ALL_SOURCES}:
+                target = out[rollup_id(granularity, period, src)]
+                for field in FIELDS:
+                    target[field] += totals.get(field, 0)
+    return out
+
+
+def article_totals(articles):
+    """Scored articles → {(date, source): totals}, as the fold sees them."""
+    totals = defaultdict(_empty)
+    for article in articles:
+        published_at = article.get("publishedAt")
+        sentiment = article.get("sentiment")
+        if not published_at or sentiment not in SENTIMENT_SCORES:
+            continue
+        delta = totals[(published_at.split("T")[0], article.get("source") or "")]
+        delta["count"] += 1
+        delta["score_sum"] += SENTIMENT_SCORES[sentiment]
+        delta[sentiment] += 1
+    return totals
+
+
+def _fields_from_id(rid):
+    granularity, period, source = rid.split("|", 2)
+    return {"granularity": granularity, "period": period, "source": source}
+
+
+@metrics.timed("stage_seconds", stage="rollups")
+def apply_deltas(day_source_deltas):
+    """Add per-(day, source) deltas to every rollup they fall into."""
+    with database.BulkWriter(db[COLLECTION]) as writer:
+        for rid, delta in fan_out(day_source_deltas).items():
+            update = _running_totals_update(delta)
+            update[0]["$set"].update({k: {"$literal": v} for k, v in _fields_from_id(rid).items()})
+            writer.update_one({"_id": rid}, update, upsert=True)
+
+
+@metrics.timed("stage_seconds", stage="rollups_rebuild")
+def rebuild(input_collection="financial_news"):
+    """
+    Recompute every rollup: articles are grouped per (day, source) inside
+    MongoDB, and only those groups are fanned out here. Rollups no longer
+    backed by any article are removed afterwards (the collection is never empty).
+    """
+    ensure_indexes()
+    # Articles still pending are added by the next daily_summary fold
+    groups = db[input_collection].aggregate(
+        daily_summary_pipeline(match={"summaryPending": {"$ne": True}}, by_source=True), allowDiskUse=True
+    )
+    rollups = fan_out({(g["date"], g.get("source") or ""): g for g in groups})
+
+    computed_at = datetime.utcnow().isoformat()
+    with database.BulkWriter(db[COLLECTION]) as writer:
+        for rid, totals in rollups.items():
+            writer.update_one({"_id": rid}, {"$set": {
+                **_fields_from_id(rid), **totals,
+                "average_score": totals["score_sum"] / totals["count"] if totals["count"] else None,
+                "computedAt": computed_at
+            }}, upsert=True)
+    db[COLLECTION].delete_many({"_id": {"$nin": list(rollups)}})
+    print(f"Rebuilt {len(rollups)} sentiment rollups.")
+    return len(rollups)
+
+
+def cover(start: date, end: date):
+    """
+    Fewest (granularity, period start) pieces that exactly tile [start, end]:
+    whole months and weeks where they fit, days elsewhere. O(days) DP.
+    """
+    n = (end - start).days + 1
+    if n <= 0:
+        return []
+    best = [0] * (n + 1)   # best[i]: pieces needed for days i..n-1
+    choice = [None] * n
+    for i in range(n - 1, -1, -1):
+        day = start + timedelta(days=i)
+        options = [("day", 1)]
+        if day.weekday() == 0:
+            options.append(("week", 7))
+        if day.day == 1:
+            next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            options.append(("month", (next_month - day).days))
+        best[i], choice[i] = min(
+            (1 + best[i + length], (granularity, length))
+            for granularity, length in options if i + length <= n
+        )
+    pieces, i = [], 0
+    while i < n:
+        granularity, length = choice[i]
+        pieces.append((granularity, (start + timedelta(days=i)).isoformat()))
+        i += length
+    return pieces
+
+
+def _source_query(source):
+    return {"source": ALL_SOURCES if source is None else source}
+
+
+def query_range(start: date, end: date, source=ALL_SOURCES):
+    """
+    Totals for [start, end] from the rollups. `source` is a source name,
+    "all", or a Mongo condition matching several source names.
+    Returns the totals plus average_score and how many documents were read.
+    """
+    pieces = cover(start, end)
+    by_granularity = defaultdict(list)
+    for granularity, period in pieces:
+        by_granularity[granularity].append(period)
+
+    totals = _empty()
+    read = 0
+    query = {"$or": [{"granularity": g, "period": {"$in": periods}} for g, periods in by_granularity.items()],
+             **_source_query(source)}
+    for doc in db[COLLECTION].find(query, {field: 1 for field in FIELDS}) if pieces else []:
+        read += 1
+        for field in FIELDS:
+            totals[field] += doc.get(field, 0)
+    totals["average_score"] = totals["score_sum"] / totals["count"] if totals["count"] else None
+    totals["documents_read"] = read
+    return totals
+
+
+def daily_series(start: date, end: date, source=ALL_SOURCES):
+    """Per-day totals in [start, end] (sources summed), sorted by date."""
+    days = defaultdict(_empty)
+    for doc in db[COLLECTION].find({
+        "granularity": "day", "period": {"$gte": start.isoformat(), "$lte": end.isoformat()},
+        **_source_query(source)
+    }, {"period": 1, **{field: 1 for field in FIELDS}}):
+        for field in FIELDS:
+            days[doc["period"]][field] += doc.get(field, 0)
+    return [
+        {"date": day, **totals, "average_score": totals["score_sum"] / totals["count"] if totals["count"] else None}
+        for day, totals in sorted(days.items())
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment rollups (day / week / month x source)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every rollup from financial_news")
+    parser.add_argument("--from", dest="start", help="YYYY-MM-DD: print totals for a range")
+    parser.add_argument("--to", dest="end", help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--source", default=ALL_SOURCES)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild()
+    if args.start:
+        end = date.fromisoformat(args.end) if args.end else date.today()
+        print(query_range(date.fromisoformat(args.start), end, args.source))
@@ -1,68 +1,172 @@
 #!/usr/bin/env python3
-import os
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime, timedelta
-from urllib.parse import quote_plus
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
-import certifi
-from dotenv import load_dotenv
-
-# ─── 0) Load ENV vars from your phase1_data_extraction/.env ────────────────────
-# Assumes this script sits in phase3_correlation_index or similar
-root = Path(__file__).parent.parent
-env_path = root / "phase1_data_extraction" / ".env"
-if not env_path.exists():
-    raise FileNotFoundError(f"No .env found at {env_path}")
-load_dotenv(env_path)
-
-# Now these come from .env:
-#   MONGODB_URI=mongodb+srv://… 
-#   MONGO_DB_NAME=fear_index_db
-#   (and NEWS_API_KEY if you care)
-MONGODB_URI   = os.getenv("MONGODB_URI")
-MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "fear_index_db")
-if not MONGODB_URI:
-    raise RuntimeError("Please set MONGODB_URI in your .env")
-
-# ─── 1) Compute date range ─────────────────────────────────────────────────────
-end_date   = datetime.today()
-start_date = end_date - timedelta(days=365)
-
-# ─── 2) Download S&P 500 data ──────────────────────────────────────────────────
-ticker = "^GSPC"
-raw = yf.download(
-    ticker,
-    start=start_date.strftime("%Y-%m-%d"),
-    end=end_date.strftime("%Y-%m-%d"),
-    progress=False,
-    auto_adjust=False
-)
-
-# ─── 3) Compute daily returns ─────────────────────────────────────────────────
-df = raw[["Close"]].copy()
-df["Return"] = df["Close"].pct_change()
-df = df.reset_index()
-
-# ─── 4) Flatten MultiIndex columns if needed ─────────────────────────────────
-if isinstance(df.columns, pd.MultiIndex):
-    df.columns = [
-        col[0] if col[1] in ("", None, ticker) else col[1]
-        for col in df.columns
-    ]
-
-# ─── 5) Format Date & prepare records ─────────────────────────────────────────
-df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-records = df.to_dict("records")
-
-# ─── 6) Connect to MongoDB Atlas ──────────────────────────────────────────────
-client = MongoClient(MONGODB_URI, tlsCAFile=certifi.where())
-db     = client[MONGO_DB_NAME]
-coll   = db["sp500_daily_returns"]
-
-# ─── 7) Clear & Insert ───────────────────────────────────────────────────────
-coll.delete_many({})
-res = coll.insert_many(records)
-print(f"Inserted {len(res.inserted_ids)} docs into '{MONGO_DB_NAME}.sp500_daily_returns'")
+
+# Reuse the pooled client configured in phase1_data_extraction/database.py
+sys.path.append(str(Path(__file__).parent.parent / "phase1_data_extraction"))
+import config
+import database
+import dirty_dates
+import metrics
+
+# ─── Tickers to load: {ticker: collection} ────────────────────────────────────
+# ^GSPC feeds the correlation & matching steps; others are stored alongside.
+SP500_TICKER = "^GSPC"
+TICKERS = {SP500_TICKER: "sp500_daily_returns", **config.EXTRA_PRICE_TICKERS}
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+CACHE_DIR = Path(config.PRICE_CACHE_DIR or Path(__file__).parent / "price_cache")
+
+
+def yfinance_download(ticker: str, start: str, end: str) -> pd.DataFrame:
+    """Default downloader: daily OHLC bars for [start, end) from yfinance."""
+    import yfinance as yf
+    return yf.download(ticker, start=start, end=end, progress=False, auto_adjust=False)
+
+
+def _normalize_bars(raw: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """yfinance-shaped bars → one row per "YYYY-MM-DD" Date with PRICE_COLUMNS."""
+    df = raw.copy()
+    # Flatten MultiIndex columns if needed
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [
+            col[0] if col[1] in ("", None, ticker) else col[1]
+            for col in df.columns
+        ]
+    df = df.reset_index()
+    df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d")
+    for col in PRICE_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    return df[["Date"] + PRICE_COLUMNS]
+
+
+def _cache_path(ticker: str) -> Path:
+    return CACHE_DIR / (ticker.replace("^", "").replace("/", "_") + ".parquet")
+
+
+def load_cache(ticker: str) -> pd.DataFrame:
+    """Cached bars and returns for `ticker` (empty frame when not cached yet)."""
+    path = _cache_path(ticker)
+    if not path.exists():
+        return pd.DataFrame(columns=["Date"] + PRICE_COLUMNS + ["Return"])
+    return pd.read_parquet(path)
+
+
+def save_cache(ticker: str, df: pd.DataFrame):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _cache_path(ticker).with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(_cache_path(ticker))
+
+
+def merge_tail(cached: pd.DataFrame, fresh: pd.DataFrame):
+    """
+    Append freshly downloaded bars to the cached history (fresh bars win on
+    overlapping dates) and compute returns for the new tail only.
+    Returns (history, changed) where `changed` holds the new or revised rows.
+    """
+    if fresh.empty:
+        return cached, cached.iloc[0:0]
+    start = fresh["Date"].min()
+    head = cached[cached["Date"] < start]
+    tail = fresh.sort_values("Date").drop_duplicates("Date", keep="last").reset_index(drop=True)
+
+    # The last cached close before the tail seeds its first return
+    prev_close = head["Close"].iloc[-1] if len(head) else np.nan
+    closes = pd.concat([pd.Series([prev_close]), tail["Close"]], ignore_index=True)
+    tail["Return"] = closes.pct_change().iloc[1:].to_numpy()
+
+    # Rows re-downloaded with identical values don't need writing again
+    old = cached[cached["Date"] >= start].set_index("Date")
+    new = tail.set_index("Date")
+    same = pd.Series(False, index=new.index)
+    common = new.index.intersection(old.index)
+    if len(common):
+        cols = ["Close", "Return"]
+        a, b = new.loc[common, cols], old.loc[common, cols]
+        same[common] = ((a == b) | (a.isna() & b.isna())).all(axis=1)
+    changed = tail[~same.to_numpy()]
+
+    history = pd.concat([head, tail], ignore_index=True)
+    return history, changed
+
+
+def upsert_returns(collection_name: str, changed: pd.DataFrame) -> int:
+    """Upsert the changed rows keyed on Date; the collection is never emptied."""
+    if changed.empty:
+        return 0
+    coll = database.db[collection_name]
+    coll.create_index("Date")
+    with database.BulkWriter(coll) as writer:
+        for rec in changed.to_dict("records"):
+            writer.update_one({"Date": rec["Date"]}, {"$set": rec}, upsert=True)
+    return writer.written
+
+
+@metrics.timed("stage_seconds", stage="prices")
+def load_returns(
+    ticker: str = SP500_TICKER,
+    collection_name: str = None,
+    downloader=None,
+    lookback_days: int = None,
+    today: datetime = None
+) -> list:
+    """
+    Bring `collection_name` up to date with daily bars and returns for
+    `ticker`. Only days from the last cached date onward are downloaded (the
+    last cached bar is re-fetched in case it was partial); the first run
+    fetches `lookback_days` of history. Returns the dates written.
+    """
+    collection_name = collection_name or TICKERS.get(ticker) or f"{ticker.lstrip('^').lower()}_daily_returns"
+    downloader = downloader or yfinance_download
+    lookback_days = lookback_days or config.PRICE_LOOKBACK_DAYS
+    end_date = today or datetime.today()
+
+    cached = load_cache(ticker)
+    if len(cached):
+        start = cached["Date"].max()
+    else:
+        start = (end_date - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+    end = end_date.strftime("%Y-%m-%d")
+    if start >= end:
+        print(f"{ticker}: cache is current through {start}.")
+        return []
+
+    with metrics.timer("price_download_seconds", ticker=ticker):
+        raw = downloader(ticker, start, end)
+    fresh = _normalize_bars(raw, ticker)
+    history, changed = merge_tail(cached, fresh)
+
+    # Write Mongo before the cache, so a failed write is retried next run
+    written = upsert_returns(collection_name, changed)
+    save_cache(ticker, history)
+
+    dates = list(changed["Date"])
+    if ticker == SP500_TICKER:
+        # New returns change the correlation and match results for these days
+        dirty_dates.mark_dirty(dates)
+    print(f"{ticker}: downloaded {len(fresh)} bars from {start}; upserted {written} rows into '{collection_name}'")
+    return dates
+
+
+def load_all(tickers: dict = None, downloader=None) -> dict:
+    """Run load_returns for every {ticker: collection}; returns {ticker: dates written}."""
+    tickers = tickers or TICKERS
+    return {
+        ticker: load_returns(ticker, collection_name, downloader=downloader)
+        for ticker, collection_name in tickers.items()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally load daily index prices and returns")
+    parser.add_argument("--ticker", action="append", help="load only these tickers (repeatable)")
+    args = parser.parse_args()
+    with metrics.recorded_run("sp500_daily_returns"):
+        load_all({t: TICKERS.get(t) for t in args.ticker} if args.ticker else None)
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Read API for the phase 5 dashboard (the endpoints in js/config.js).
+
+Every GET response is cached per (path, query string) for API_CACHE_TTL
+seconds, and the whole cache is dropped as soon as a pipeline run completes
+(pipeline_state.last_run.finishedAt changes, see run_pipeline.py), so open
+dashboards cost Atlas one query per endpoint per TTL, not one per tab.
+Concurrent misses for the same key share a single query. Responses carry an
+ETag (If-None-Match → 304) and are gzipped once, when cached.
+pymongo is blocking, so queries run in the default thread pool.
+/api/events streams deltas to open dashboards (see live_events.py),
+/api/fear-index serves the hourly fear index, and /metrics
+exports the last pipeline run's metrics for Prometheus.
+
+    python phase5_dashboard/api_server.py [--port 5000]
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'phase1_data_extraction'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'phase3_correlation_index'))
+import config
+import database
+import fear_index
+import metrics
+from live_events import EventHub, events_handler, pipeline_deltas, start_change_stream
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEWS_COLLECTION = "financial_news"
+SUMMARY_COLLECTION = "daily_sentiment_summary"
+CORRELATION_COLLECTION = "correlation_index"
+MATCH_COLLECTION = "return_sentiment_match"
+RETURNS_COLLECTION = "sp500_daily_returns"
+STATE_COLLECTION = "pipeline_state"
+ROLLUP_COLLECTION = "sentiment_rollups"
+FEAR_COLLECTION = "fear_index_hourly"
+
+# Dashboard source filter values → NewsAPI source names
+SOURCE_NAMES = {
+    "bloomberg": "Bloomberg",
+    "cnbc": "CNBC",
+    "reuters": "Reuters",
+    "wsj": "The Wall Street Journal",
+    "marketwatch": "MarketWatch",
+    "ft": "Financial Times",
+    "forbes": "Forbes",
+    "investopedia": "Investopedia",
+    "financialpost": "Financial Post",
+}
+
+MAX_DAYS = 3650
+MAX_NEWS = 100
+MAX_CACHE_ENTRIES = 1024
+
+
+class ResponseCache:
+    """
+    TTL cache of encoded responses: key → (expires, etag, body, gzipped body).
+    `get_or_compute` lets concurrent misses for one key await the same build;
+    if the request running the build is cancelled, a waiter takes it over.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._inflight = {}
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_compute(self, key, build):
+        if self.ttl <= 0:
+            # Caching disabled: every request queries
+            self.misses += 1
+            return self._encode(await build())
+
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            try:
+                entry = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if inflight.cancelled():
+                    continue  # the building request went away; build here or join the next build
+                raise
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = self._encode(await build())
+            if len(self._entries) >= MAX_CACHE_ENTRIES:
+                self._evict_expired()
+            self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            # Also on cancellation (client disconnected), so waiters don't hang on the future
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # retrieved here so waiter-less failures aren't logged as unhandled
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _encode(self, payload):
+        body = json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+        return (
+            time.monotonic() + self.ttl,
+            '"' + hashlib.sha1(body).hexdigest() + '"',
+            body,
+            gzip.compress(body, compresslevel=6),
+        )
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        if len(self._entries) >= MAX_CACHE_ENTRIES:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hitRate": round(self.hits / total, 3) if total else None, "entries": len(self._entries)}
+
+
+# ─── Queries (blocking; run in the executor) ──────────────────────────────────
+
+def _clean(value):
+    """Mongo values → JSON-safe values (NaN → None, drop ObjectIds)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items() if k != "_id"}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    return value
+
+
+def _since(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+
+
+def _source_filter(source):
+    if not source or source == "all":
+        return {}
+    name = SOURCE_NAMES.get(source, source)
+    return {"source": {"$regex": re.escape(name), "$options": "i"}}
+
+
+def _daily_by_source(db, since, source):
+    """
+    Daily summaries for the sources matching `source`, read from the per-source
+    day rollups (phase3_correlation_index/rollups.py) and summed per date.
+    """
+    condition = _source_filter(source)["source"]
+    daily = {}
+    for doc in db[ROLLUP_COLLECTION].find(
+        {"granularity": "day", "period": {"$gte": since}, "source": {**condition, "$ne": "all"}},
+        {"_id": 0, "period": 1, "count": 1, "positive": 1, "neutral": 1, "negative": 1}
+    ):
+        day = daily.setdefault(doc["period"], {"date": doc["period"], "count": 0,
+                                               "positive": 0, "neutral": 0, "negative": 0})
+        for field in ("count", "positive", "neutral", "negative"):
+            day[field] += doc.get(field, 0)
+    for day in daily.values():
+        day["average_score"] = (day["positive"] - day["negative"]) / day["count"] if day["count"] else None
+    return [daily[d] for d in sorted(daily)]
+
+
+def sentiment_summary(db, days, source):
+    since = _since(days)
+    if source and source != "all":
+        daily = _daily_by_source(db, since, source)
+    else:
+        daily = list(db[SUMMARY_COLLECTION].find(
+            {"date": {"$gte": since}},
+            {"_id": 0, "date": 1, "count": 1, "average_score": 1, "positive": 1, "neutral": 1, "negative": 1}
+        ).sort("date", 1))
+    counts = {label: sum(d.get(label, 0) for d in daily) for label in ("positive", "neutral", "negative")}
+    return {
+        "days": days,
+        "source": source,
+        "currentSentiment": daily[-1].get("average_score") if daily else None,
+        "sentimentCounts": counts,
+        "daily": daily,
+    }
+
+
+def correlation_data(db, days):
+    since = _since(days)
+    correlation = list(db[CORRELATION_COLLECTION].find(
+        {"date": {"$gte": since}},
+        {"_id": 0, "date": 1, "overall_sentiment": 1, "correlation_with_market": 1, "correlations": 1}
+    ).sort("date", 1))
+    matches = list(db[MATCH_COLLECTION].find(
+        {"date": {"$gte": since}}, {"_id": 0, "date": 1, "match": 1, "return": 1, "overall_sentiment": 1}
+    ).sort("date", 1))
+    fear = fear_index.current(db[FEAR_COLLECTION])
+    hits = sum(m.get("match", 0) for m in matches)
+    latest = next((c["correlation_with_market"] for c in reversed(correlation)
+                   if c.get("correlation_with_market") is not None), None)
+    return {
+        "days": days,
+        "correlationPercentage": round(hits / len(matches) * 100) if matches else None,
+        "correlation": latest,
+        # Hourly sums kept by phase3_correlation_index/fear_index.py: 0 = greed, 100 = fear
+        "fearIndex": round(fear["fearIndex"]) if fear and fear["fearIndex"] is not None else None,
+        "fearIndexHour": fear["hour"] if fear else None,
+        "correlations": correlation,
+        "matches": matches,
+    }
+
+
+def fear_index_series(db, days):
+    """Hourly fear index since `days` ago, decayed from the sums the sentiment summary fold keeps."""
+    start = datetime.fromisoformat(_since(days))
+    hourly = [
+        {"hour": h["hour"], "fearIndex": h["fearIndex"], "articles": h["articles"]}
+        for h in fear_index.series(start, collection=db[FEAR_COLLECTION])
+    ]
+    return {"days": days, "current": hourly[-1]["fearIndex"] if hourly else None, "hourly": hourly}
+
+
+def recent_news(db, limit, source):
+    return list(db[NEWS_COLLECTION].find(
+        {**_source_filter(source), "sentiment": {"$ne": None}, "isDuplicate": {"$ne": True}},
+        {"_id": 0, "title": 1, "sentiment": 1, "source": 1, "publishedAt": 1, "url": 1}
+    ).sort("publishedAt", -1).limit(limit))
+
+
+def sp500_returns(db, days):
+    return list(db[RETURNS_COLLECTION].find(
+        {"Date": {"$gte": _since(days)}}, {"_id": 0, "Date": 1, "Close": 1, "Return": 1}
+    ).sort("Date", 1))
+
+
+def last_pipeline_run(db):
+    """The most recent run_pipeline.py document in pipeline_runs (see metrics.recorded_run)."""
+    return db[metrics.RUNS_COLLECTION].find_one({"name": "pipeline"}, sort=[("finishedAt", -1)]) or {}
+
+
+def run_metrics(run):
+    """Dashboard figures from a pipeline_runs document's metrics snapshot."""
+    snap = run.get("metrics")
+    if not snap:
+        return None
+    inferred = metrics.total(snap, "texts_inferred")
+    inference = metrics.total(snap, "inference_batch_seconds", "sum")
+    return {
+        "inferenceBatches": metrics.total(snap, "inference_batch_seconds", "count"),
+        "inferenceMsPerArticle": round(inference / inferred * 1000, 2) if inferred else None,
+        "articlesScored": metrics.total(snap, "articles_scored"),
+        "articlesInserted": metrics.total(snap, "articles_inserted"),
+        "newsApiRequests": metrics.total(snap, "newsapi_request_seconds", "count"),
+        "mongoRoundTrips": metrics.total(snap, "mongo_command_seconds", "count"),
+        "stageLatency": {
+            h["labels"]["stage"]: {"calls": h["count"], "p50": h["p50"], "p95": h["p95"], "max": h["max"]}
+            for h in snap.get("histograms", []) if h["name"] == "stage_seconds"
+        },
+    }
+
+
+def performance_metrics(db):
+    state = db[STATE_COLLECTION].find_one({"_id": "last_run"}) or {}
+    stages = {s["stage"]: s for s in state.get("stages", [])}
+    scoring = stages.get("sentiment") or {}
+    since = _since(30)
+    sources = db[NEWS_COLLECTION].distinct("source", {"publishedAt": {"$gte": since}})
+    return {
+        "articlesAnalyzed": db[NEWS_COLLECTION].count_documents({"sentiment": {"$ne": None}}),
+        "processingSpeed": f"{scoring['perSecond']} articles/s" if scoring.get("perSecond") else None,
+        "activeSources": f"{len(sources)}/{len(SOURCE_NAMES)}",
+        "lastUpdate": state.get("finishedAt"),
+        "pipeline": state.get("stages", []),
+        "lastRun": run_metrics(last_pipeline_run(db)),
+    }
+
+
+# ─── HTTP layer ───────────────────────────────────────────────────────────────
+
+def _int_param(request, name, default, upper):
+    try:
+        return max(1, min(upper, int(request.query.get(name, default))))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"'{name}' must be an integer")
+
+
+def cached_json(query):
+    """Handler serving query(db, request) through the response cache."""
+    async def handler(request):
+        app = request.app
+        key = (request.path, tuple(sorted(request.query.items())))
+        loop = asyncio.get_running_loop()
+
+        async def build():
+            return _clean(await loop.run_in_executor(None, query, app["db"], request))
+
+        _, etag, body, gzipped = await app["cache"].get_or_compute(key, build)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = gzipped
+        return web.Response(body=body, content_type="application/json", headers=headers)
+    return handler
+
+
+@web.middleware
+async def cors(request, handler):
+    # The dashboard is usually opened from file:// or another port
+    if request.method == "OPTIONS":
+        response = web.Response(status=204)
+    else:
+        response = await handler(request)
+    if response.prepared:
+        return response  # streamed responses set their own headers
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match"
+    response.headers["Access-Control-Expose-Headers"] = "ETag"
+    return response
+
+
+async def prometheus_metrics(request):
+    """GET /metrics: the last pipeline run's metrics in Prometheus text format."""
+    run = await asyncio.get_running_loop().run_in_executor(None, last_pipeline_run, request.app["db"])
+    return web.Response(text=metrics.to_prometheus(run.get("metrics") or {}),
+                        content_type="text/plain", headers={"X-Pipeline-Run": run.get("finishedAt") or ""})
+
+
+async def watch_pipeline_runs(app):
+    """
+    Drop the response cache whenever a pipeline run completes, and (without a
+    change stream) push that run's deltas to the open dashboards.
+    """
+    loop = asyncio.get_running_loop()
+    last = None
+
+    def read_state():
+        return app["db"][STATE_COLLECTION].find_one({"_id": "last_run"}) or {}
+
+    while True:
+        try:
+            state = await loop.run_in_executor(None, read_state)
+            current = state.get("finishedAt")
+            if current != last:
+                app["cache"].clear()
+                if last is not None:
+                    logger.info(f"Pipeline run finished at {current}; clearing response cache")
+                    hub = app["events"]
+                    stream = app["change_stream"]
+                    if stream is None or stream.is_set():
+                        deltas = await loop.run_in_executor(None, pipeline_deltas, app["db"], state)
+                        for event, docs in deltas.items():
+                            hub.publish(event, docs)
+                        hub.flush()
+                    hub.broadcast("pipeline", {"finishedAt": current})
+                last = current
+        except Exception as e:
+            logger.warning(f"Could not read pipeline state: {e}")
+        await asyncio.sleep(config.API_STATE_POLL_SECONDS)
+
+
+async def _start_background(app):
+    loop = asyncio.get_running_loop()
+    app["change_stream"] = (start_change_stream(app["db"], app["events"], loop)
+                            if config.API_CHANGE_STREAMS else None)
+    app["tasks"] = [asyncio.create_task(watch_pipeline_runs(app)),
+                    asyncio.create_task(app["events"].run())]
+
+
+async def _stop_background(app):
+    for task in app["tasks"]:
+        task.cancel()
+    if app["change_stream"] is not None:
+        app["change_stream"].set()
+
+
+def create_app(db=None, cache_ttl=None):
+    app = web.Application(middlewares=[cors])
+    app["db"] = database.db if db is None else db
+    app["cache"] = ResponseCache(config.API_CACHE_TTL if cache_ttl is None else cache_ttl)
+    # Pushed deltas mean cached responses are stale
+    app["events"] = EventHub(config.API_EVENT_BATCH_SECONDS, on_flush=app["cache"].clear)
+    app["event_heartbeat"] = config.API_EVENT_HEARTBEAT_SECONDS
+
+    app.router.add_get("/api/sentiment/summary", cached_json(lambda db, r: sentiment_summary(
+        db, _int_param(r, "days", 30, MAX_DAYS), r.query.get("source", "all"))))
+    app.router.add_get("/api/correlation/data", cached_json(lambda db, r: correlation_data(
+        db, _int_param(r, "days", 30, MAX_DAYS))))
+    app.router.add_get("/api/fear-index", cached_json(lambda db, r: fear_index_series(
+        db, _int_param(r, "days", 7, MAX_DAYS))))
+    app.router.add_get("/api/news/recent", cached_json(lambda db, r: recent_news(
+        db, _int_param(r, "limit", 10, MAX_NEWS), r.query.get("source", "all"))))
+    app.router.add_get("/api/sp500/returns", cached_json(lambda db, r: sp500_returns(
+        db, _int_param(r, "days", 30, MAX_DAYS))))
+    app.router.add_get("/api/metrics/performance", cached_json(lambda db, r: {
+        **performance_metrics(db), "cache": r.app["cache"].stats(),
+        "liveClients": r.app["events"].subscribers}))
+    app.router.add_get("/api/events", events_handler)
+    app.router.add_get("/metrics", prometheus_metrics)
+
+    app.on_startup.append(_start_background)
+    app.on_cleanup.append(_stop_background)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dashboard API")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -7,7 +7,8 @@ const DASHBOARD_CONFIG = {
         CORRELATION_DATA: '/correlation/data',
         NEWS_FEED: '/news/recent',
         SP500_DATA: '/sp500/returns',
-        PERFORMANCE_METRICS: '/metrics/performance'
+        PERFORMANCE_METRICS: '/metrics/performance',
+        EVENTS: '/events'
     },
     
     // MongoDB collection names (matching your phase1-3 setup)
@@ -28,7 +29,7 @@ const DASHBOARD_CONFIG = {
         BACKGROUND: 'rgba(59, 130, 246, 0.1)'
     },
     
-    // Update intervals (in milliseconds)
+    // Update intervals (in milliseconds); only used while the live event stream is down
     UPDATE_INTERVALS: {
         REAL_TIME: 30000,    // 30 seconds
         METRICS: 60000,      // 1 minute
@@ -38,6 +39,7 @@ const DASHBOARD_CONFIG = {
     // Data refresh settings
     REFRESH_SETTINGS: {
         AUTO_REFRESH: true,
+        LIVE_UPDATES: true,
         REFRESH_ON_FOCUS: true,
         RETRY_ATTEMPTS: 3,
         RETRY_DELAY: 5000
@@ -56,6 +58,14 @@ const DASHBOARD_CONFIG = {
         'financialpost.com': 'Financial Post'
     },
     
+    // Data source filter values -> NewsAPI source names (as in api_server.SOURCE_NAMES)
+    SOURCE_FILTERS: {
+        'bloomberg': 'Bloomberg',
+        'cnbc': 'CNBC',
+        'reuters': 'Reuters',
+        'wsj': 'Wall Street Journal'
+    },
+
     // Sentiment scoring (matching your phase2 setup)
     SENTIMENT_SCORES: {
         'positive': 1,
@@ -74,5 +84,9 @@ const DASHBOARD_STATE = {
     currentDataSource: 'all',
     isLoading: false,
     lastUpdate: null,
-    connectionStatus: 'connected'
+    connectionStatus: 'connected',
+    liveUpdates: false,
+    // Raw series behind the charts, kept so pushed deltas can be merged in
+    series: { daily: [], sp500: [] },
+    newsItems: []
 };
\ No newline at end of file
@@ -11,6 +11,10 @@ async function initializeDashboard() {
         await loadDashboardData();
         setupEventListeners();
 
+        if (DASHBOARD_CONFIG.REFRESH_SETTINGS.LIVE_UPDATES && window.EventSource) {
+            startLiveUpdates();
+        }
+
         if (DASHBOARD_CONFIG.REFRESH_SETTINGS.AUTO_REFRESH) {
             startAutoRefresh();
         }
@@ -26,6 +30,8 @@ async function initializeDashboard() {
     }
 }
 
+const NEWS_FEED_LIMIT = 10;
+
 // Data loading and updates
 async function loadDashboardData() {
     try {
@@ -34,7 +40,7 @@ async function loadDashboardData() {
         const [sentimentData, correlationData, newsData, performanceData] = await Promise.all([
             fetchSentimentSummary(DASHBOARD_STATE.currentDateRange, DASHBOARD_STATE.currentDataSource),
             fetchCorrelationData(DASHBOARD_STATE.currentDateRange),
-            fetchRecentNews(10, DASHBOARD_STATE.currentDataSource),
+            fetchRecentNews(NEWS_FEED_LIMIT, DASHBOARD_STATE.currentDataSource),
             fetchPerformanceMetrics()
         ]);
 
@@ -43,6 +49,10 @@ async function loadDashboardData() {
         updateCharts(sentimentData, correlationData);
         updateNewsFeed(newsData);
 
+        if (sentimentData) {
+            DASHBOARD_STATE.series = { daily: sentimentData.daily, sp500: sentimentData.sp500 };
+        }
+        DASHBOARD_STATE.newsItems = newsData || [];
         DASHBOARD_STATE.lastUpdate = new Date();
         updateLastUpdateDisplay();
     } catch (error) {
@@ -108,23 +118,42 @@ function createNewsItem(news) {
     const newsItem = document.createElement('div');
     newsItem.className = 'news-item';
 
-    newsItem.innerHTML = `
-        <div class="news-title">${news.title}</div>
-        <div class="news-meta">
-            <span>${news.source} • ${news.time}</span>
-            <span class="sentiment-badge ${news.sentiment}">${news.sentiment.toUpperCase()}</span>
-        </div>
-    `;
+    // Article fields come from third-party feeds: set them as text, never as markup
+    const title = document.createElement('div');
+    title.className = 'news-title';
+    title.textContent = news.title ?? '';
+
+    const meta = document.createElement('div');
+    meta.className = 'news-meta';
+    const sourceTime = document.createElement('span');
+    sourceTime.textContent = `${news.source ?? ''} • ${news.time ?? ''}`;
+    const sentiment = String(news.sentiment ?? '');
+    const badge = document.createElement('span');
+    badge.className = 'sentiment-badge';
+    if (['positive', 'neutral', 'negative'].includes(sentiment)) {
+        badge.classList.add(sentiment);
+    }
+    badge.textContent = sentiment.toUpperCase();
+    meta.append(sourceTime, badge);
+    newsItem.append(title, meta);
 
     newsItem.addEventListener('click', () => {
-        if (news.url) {
-            window.open(news.url, '_blank');
+        if (isHttpUrl(news.url)) {
+            window.open(news.url, '_blank', 'noopener');
         }
     });
 
     return newsItem;
 }
 
+function isHttpUrl(url) {
+    try {
+        return ['http:', 'https:'].includes(new URL(url).protocol);
+    } catch {
+        return false;
+    }
+}
+
 function updatePerformanceMetrics(performanceData) {
     const metrics = {
         'articlesAnalyzed': performanceData.articlesAnalyzed,
@@ -234,9 +263,111 @@ async function refreshData() {
     }
 }
 
-// Auto-refresh functionality
+// Live updates: the API pushes deltas over server-sent events (api_server.py /events),
+// which are merged into the current data and applied to the existing charts
+function startLiveUpdates() {
+    const source = new EventSource(`${DASHBOARD_CONFIG.API_BASE_URL}${DASHBOARD_CONFIG.ENDPOINTS.EVENTS}`);
+    let missedEvents = false;
+
+    source.addEventListener('open', () => {
+        DASHBOARD_STATE.liveUpdates = true;
+        // Deltas pushed while disconnected are lost, so reload once after reconnecting
+        if (missedEvents) {
+            missedEvents = false;
+            loadDashboardData();
+        }
+    });
+    source.addEventListener('error', () => {
+        // EventSource reconnects by itself; interval polling covers the gap
+        DASHBOARD_STATE.liveUpdates = false;
+        missedEvents = true;
+    });
+
+    source.addEventListener('summary', event => applySummaryDelta(JSON.parse(event.data)));
+    source.addEventListener('sp500', event => applySP500Delta(JSON.parse(event.data)));
+    source.addEventListener('news', event => applyNewsDelta(JSON.parse(event.data)));
+    source.addEventListener('correlation', () => refreshCorrelationCard());
+    source.addEventListener('pipeline', () => refreshPerformanceMetrics());
+    source.addEventListener('resync', () => loadDashboardData());
+}
+
+function mergeByKey(rows, updates, key) {
+    const byKey = new Map(rows.map(row => [row[key], row]));
+    updates.forEach(row => byKey.set(row[key], { ...byKey.get(row[key]), ...row }));
+    return [...byKey.values()].sort((a, b) => (a[key] < b[key] ? -1 : a[key] > b[key] ? 1 : 0));
+}
+
+function dateCutoff(days) {
+    return new Date(Date.now() - days * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
+}
+
+function applySummaryDelta(summaries) {
+    if (DASHBOARD_STATE.currentDataSource !== 'all') {
+        // Pushed summaries cover all sources; per-source days are regrouped by the API
+        loadDashboardData();
+        return;
+    }
+    DASHBOARD_STATE.series.daily = mergeByKey(DASHBOARD_STATE.series.daily, summaries, 'date');
+    applySeries();
+}
+
+function applySP500Delta(returns) {
+    DASHBOARD_STATE.series.sp500 = mergeByKey(DASHBOARD_STATE.series.sp500, returns, 'Date');
+    applySeries();
+}
+
+function applySeries() {
+    const cutoff = dateCutoff(DASHBOARD_STATE.currentDateRange);
+    const daily = DASHBOARD_STATE.series.daily.filter(day => day.date >= cutoff);
+    const sp500 = DASHBOARD_STATE.series.sp500.filter(day => day.Date >= cutoff);
+    DASHBOARD_STATE.series = { daily, sp500 };
+
+    const sentimentCounts = { positive: 0, neutral: 0, negative: 0 };
+    daily.forEach(day => Object.keys(sentimentCounts).forEach(label => {
+        sentimentCounts[label] += day[label] || 0;
+    }));
+    const sentimentData = {
+        currentSentiment: daily.length ? daily[daily.length - 1].average_score : 0,
+        sentimentCounts,
+        timeline: processCorrelationData(daily, sp500)
+    };
+
+    updateMetricCards(sentimentData, null, null);
+    updateSentimentDistribution(sentimentData);
+    updateCharts(sentimentData, null);
+}
+
+function applyNewsDelta(articles) {
+    const sourceName = DASHBOARD_CONFIG.SOURCE_FILTERS[DASHBOARD_STATE.currentDataSource];
+    const known = new Set(DASHBOARD_STATE.newsItems.map(news => news.url));
+    const fresh = articles.filter(news => !known.has(news.url) &&
+        (!sourceName || (news.source || '').toLowerCase().includes(sourceName.toLowerCase())));
+    if (!fresh.length) return;
+
+    DASHBOARD_STATE.newsItems = [...fresh, ...DASHBOARD_STATE.newsItems]
+        .sort((a, b) => (a.publishedAt < b.publishedAt ? 1 : -1))
+        .slice(0, NEWS_FEED_LIMIT);
+    updateNewsFeed(DASHBOARD_STATE.newsItems.map(news => ({ ...news, time: formatTimeAgo(news.publishedAt) })));
+}
+
+async function refreshCorrelationCard() {
+    const correlationData = await fetchCorrelationData(DASHBOARD_STATE.currentDateRange);
+    updateMetricCards(null, correlationData, null);
+}
+
+async function refreshPerformanceMetrics() {
+    const performanceData = await fetchPerformanceMetrics();
+    if (performanceData) {
+        updatePerformanceMetrics(performanceData);
+    }
+    DASHBOARD_STATE.lastUpdate = new Date();
+    updateLastUpdateDisplay();
+}
+
+// Auto-refresh functionality (polling fallback while the live event stream is down)
 function startAutoRefresh() {
     setInterval(async () => {
+        if (DASHBOARD_STATE.liveUpdates) return;
         if (!DASHBOARD_STATE.isLoading && document.visibilityState === 'visible') {
             try {
                 const performanceData = await fetchPerformanceMetrics();
@@ -251,6 +382,7 @@ function startAutoRefresh() {
     }, DASHBOARD_CONFIG.UPDATE_INTERVALS.REAL_TIME);
 
     setInterval(async () => {
+        if (DASHBOARD_STATE.liveUpdates) return;
         if (!DASHBOARD_STATE.isLoading && document.visibilityState === 'visible') {
             await loadDashboardData();
         }
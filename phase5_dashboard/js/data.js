@@ -1,6 +1,6 @@
 // Data management and API functions
 
-// Sample data - replace with actual API calls to your MongoDB
+// Placeholder data for the charts until the first API response arrives
 const sampleData = {
     sentimentTimeline: {
         labels: ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
@@ -66,17 +66,21 @@ async function makeAPIRequest(endpoint, options = {}) {
 }
 
 // Data fetching functions
+// The API (phase5_dashboard/api_server.py) sends ETags with Cache-Control: no-cache,
+// so the browser revalidates and unchanged responses come back as 304s.
 async function fetchSentimentSummary(dateRange = 30, source = 'all') {
     try {
-        // const data = await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.SENTIMENT_SUMMARY}?days=${dateRange}&source=${source}`);
+        const [summary, sp500] = await Promise.all([
+            makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.SENTIMENT_SUMMARY}?days=${dateRange}&source=${source}`),
+            fetchSP500Returns(dateRange)
+        ]);
         return {
-            currentSentiment: 0.23,
-            sentimentCounts: {
-                positive: 142,
-                neutral: 89,
-                negative: 76
-            },
-            timeline: sampleData.sentimentTimeline
+            currentSentiment: summary.currentSentiment ?? 0,
+            sentimentCounts: summary.sentimentCounts,
+            // Trading days only, with returns in percent (see charts.js)
+            timeline: processCorrelationData(summary.daily, sp500),
+            daily: summary.daily,
+            sp500
         };
     } catch (error) {
         console.error('Failed to fetch sentiment summary:', error);
@@ -84,13 +88,23 @@ async function fetchSentimentSummary(dateRange = 30, source = 'all') {
     }
 }
 
+async function fetchSP500Returns(dateRange = 30) {
+    try {
+        return await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.SP500_DATA}?days=${dateRange}`);
+    } catch (error) {
+        console.error('Failed to fetch S&P 500 returns:', error);
+        return [];
+    }
+}
+
 async function fetchCorrelationData(dateRange = 30) {
     try {
-        // const data = await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.CORRELATION_DATA}?days=${dateRange}`);
+        const data = await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.CORRELATION_DATA}?days=${dateRange}`);
         return {
-            correlationPercentage: 68,
-            fearIndex: 34,
-            matches: sampleData.sentimentTimeline
+            correlationPercentage: data.correlationPercentage ?? '--',
+            correlation: data.correlation,
+            fearIndex: data.fearIndex ?? '--',
+            matches: data.matches
         };
     } catch (error) {
         console.error('Failed to fetch correlation data:', error);
@@ -100,8 +114,11 @@ async function fetchCorrelationData(dateRange = 30) {
 
 async function fetchRecentNews(limit = 10, source = 'all') {
     try {
-        // const data = await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.NEWS_FEED}?limit=${limit}&source=${source}`);
-        return sampleData.recentNews;
+        const news = await makeAPIRequest(`${DASHBOARD_CONFIG.ENDPOINTS.NEWS_FEED}?limit=${limit}&source=${source}`);
+        return news.map(item => ({
+            ...item,
+            time: formatTimeAgo(item.publishedAt)
+        }));
     } catch (error) {
         console.error('Failed to fetch recent news:', error);
         return [];
@@ -110,12 +127,14 @@ async function fetchRecentNews(limit = 10, source = 'all') {
 
 async function fetchPerformanceMetrics() {
     try {
-        // const data = await makeAPIRequest(DASHBOARD_CONFIG.ENDPOINTS.PERFORMANCE_METRICS);
+        const data = await makeAPIRequest(DASHBOARD_CONFIG.ENDPOINTS.PERFORMANCE_METRICS);
+        // Measured model time per article in the last pipeline run, else its scoring throughput
+        const msPerArticle = data.lastRun?.inferenceMsPerArticle;
         return {
-            articlesAnalyzed: 234,
-            processingSpeed: '1.2s avg',
-            activeSources: '7/9',
-            lastUpdate: new Date().toLocaleTimeString()
+            articlesAnalyzed: data.articlesAnalyzed,
+            processingSpeed: msPerArticle != null ? `${msPerArticle} ms/article` : (data.processingSpeed || '--'),
+            activeSources: data.activeSources,
+            lastUpdate: data.lastUpdate ? new Date(data.lastUpdate).toLocaleTimeString() : '--'
         };
     } catch (error) {
         console.error('Failed to fetch performance metrics:', error);
@@ -124,11 +143,6 @@ async function fetchPerformanceMetrics() {
 }
 
 // Data transformation utilities
-function calculateFearIndex(sentimentData) {
-    const avgSentiment = sentimentData.reduce((sum, val) => sum + val, 0) / sentimentData.length;
-    return Math.max(0, Math.min(100, Math.round((1 - avgSentiment) * 50)));
-}
-
 function formatSentimentScore(score) {
     return score >= 0 ? `+${score.toFixed(2)}` : score.toFixed(2);
 }
@@ -0,0 +1,206 @@
+"""
+Server-sent events for the dashboard (GET /api/events).
+
+Deltas (newly scored articles, changed daily summaries, correlation values
+and S&P 500 returns) are collected in an EventHub and pushed to every open
+dashboard at most once per API_EVENT_BATCH_SECONDS, keyed so that repeated
+changes to the same day or article collapse into one item.
+
+They come from a MongoDB change stream when the deployment supports one
+(replica sets / Atlas). Otherwise api_server's pipeline-run watcher calls
+pipeline_deltas() once per completed run, so between runs nothing is
+queried or sent apart from a heartbeat comment.
+"""
+import asyncio
+import json
+import logging
+import math
+import threading
+
+from aiohttp import web
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+NEWS_FIELDS = ["title", "sentiment", "source", "publishedAt", "url"]
+SUMMARY_FIELDS = ["date", "count", "average_score", "positive", "neutral", "negative"]
+CORRELATION_FIELDS = ["date", "correlation_with_market", "overall_sentiment"]
+RETURN_FIELDS = ["Date", "Close", "Return"]
+
+# event name → (collection, key field, fields sent)
+STREAMS = {
+    "news": ("financial_news", "url", NEWS_FIELDS),
+    "summary": ("daily_sentiment_summary", "date", SUMMARY_FIELDS),
+    "correlation": ("correlation_index", "date", CORRELATION_FIELDS),
+    "sp500": ("sp500_daily_returns", "Date", RETURN_FIELDS),
+}
+
+SUBSCRIBER_QUEUE_SIZE = 64
+MAX_NEWS_ITEMS = 50
+
+
+def _clean(value):
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    return value
+
+
+def _pick(doc, fields):
+    return {f: _clean(doc.get(f)) for f in fields if f in doc}
+
+
+class EventHub:
+    """Fan-out of batched delta events to the connected dashboards."""
+
+    def __init__(self, batch_seconds, on_flush=None):
+        self.batch_seconds = batch_seconds
+        self.on_flush = on_flush
+        self.events_sent = 0
+        self._subscribers = set()
+        self._pending = {}
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event, docs):
+        """Queue changed documents for the next batch (call on the event loop)."""
+        _, key, fields = STREAMS[event]
+        pending = self._pending.setdefault(event, {})
+        for doc in docs:
+            if doc.get(key) is not None:
+                pending[doc[key]] = _pick(doc, fields)
+
+    def broadcast(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for deltas to be useful: tell it to reload instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(b"event: resync\ndata: {}\n\n")
+        self.events_sent += 1
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        if self.on_flush:
+            self.on_flush()
+        for event, items in pending.items():
+            items = sorted(items.values(), key=lambda d: d.get(STREAMS[event][1]) or "")
+            if event == "news":
+                items = items[-MAX_NEWS_ITEMS:]
+            self.broadcast(event, items)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.batch_seconds)
+            self.flush()
+
+
+def pipeline_deltas(db, state):
+    """
+    Deltas for one completed pipeline run, from its pipeline_state document:
+    articles scored since it started, and the summary / correlation / return
+    documents of the days it changed. Blocking; run in an executor.
+    """
+    dates = state.get("changedDates") or []
+    deltas = {}
+    if state.get("startedAt"):
+        deltas["news"] = list(db[STREAMS["news"][0]].find(
+            {"sentimentAnalyzedAt": {"$gte": state["startedAt"]}, "isDuplicate": {"$ne": True}},
+            {f: 1 for f in NEWS_FIELDS}
+        ).sort("publishedAt", -1).limit(MAX_NEWS_ITEMS))
+    if dates:
+        for event in ("summary", "correlation", "sp500"):
+            collection, key, fields = STREAMS[event]
+            deltas[event] = list(db[collection].find({key: {"$in": dates}}, {f: 1 for f in fields}))
+    return deltas
+
+
+def _change_stream_pipeline():
+    news = STREAMS["news"][0]
+    others = [STREAMS[e][0] for e in ("summary", "correlation", "sp500")]
+    return [
+        {"$match": {"$or": [
+            # articles: only the write that sets their sentiment, and not for near-duplicates
+            {"ns.coll": news, "operationType": "update",
+             "updateDescription.updatedFields.sentiment": {"$exists": True},
+             "fullDocument.isDuplicate": {"$ne": True}},
+            {"ns.coll": {"$in": others}, "operationType": {"$in": ["insert", "update", "replace"]}},
+        ]}},
+        {"$project": {"ns": 1, **{f"fullDocument.{f}": 1 for f in
+                                  set(NEWS_FIELDS + SUMMARY_FIELDS + CORRELATION_FIELDS + RETURN_FIELDS)}}},
+    ]
+
+
+def start_change_stream(db, hub, loop):
+    """
+    Feed the hub from a database change stream in a daemon thread.
+    Returns the thread's stop Event (also set if the stream dies), or None if
+    change streams are unavailable.
+    """
+    by_collection = {collection: event for event, (collection, _, _) in STREAMS.items()}
+    try:
+        stream = db.watch(_change_stream_pipeline(), full_document="updateLookup")
+    except (PyMongoError, NotImplementedError, TypeError) as e:  # e.g. standalone server, test doubles
+        logger.info(f"Change streams unavailable ({e}); pushing deltas on pipeline completion")
+        return None
+
+    stop = threading.Event()
+
+    def run():
+        try:
+            with stream:
+                while not stop.is_set():
+                    change = stream.try_next()
+                    if change is None:
+                        stop.wait(0.5)
+                        continue
+                    event = by_collection.get(change["ns"]["coll"])
+                    doc = change.get("fullDocument")
+                    if event and doc:
+                        loop.call_soon_threadsafe(hub.publish, event, [doc])
+        except PyMongoError as e:
+            logger.warning(f"Change stream stopped ({e}); dashboards fall back to pipeline-run updates")
+            stop.set()
+
+    threading.Thread(target=run, name="change-stream", daemon=True).start()
+    return stop
+
+
+async def events_handler(request):
+    """GET /api/events: text/event-stream of delta batches for one dashboard."""
+    hub = request.app["events"]
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Access-Control-Allow-Origin": "*",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+    queue = hub.subscribe()
+    try:
+        await response.write(b"retry: 5000\n\n")
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=request.app["event_heartbeat"])
+            except asyncio.TimeoutError:
+                message = b": ping\n\n"  # keeps proxies from closing an idle stream
+            await response.write(message)
+    except ConnectionResetError:
+        pass
+    finally:
+        hub.unsubscribe(queue)
+    return response
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline: ingest → sentiment → daily summary → correlation → matching.
+
+Ingest and S&P 500 price loading run in background threads, and each batch of
+newly inserted article _ids is handed to the sentiment scorer through a
+bounded queue, so fetching the next query overlaps with model inference.
+The days the summary fold and the price loader marked in `dirty_dates`
+decide whether the correlation and matching steps run at all.
+Per-stage wall time, throughput and queue depth are printed at the end and
+saved to the `pipeline_state` collection; the run's metrics (latency
+histograms, inference time per batch, Mongo round trips, NewsAPI calls; see
+phase1_data_extraction/metrics.py) are saved to `pipeline_runs`.
+
+Every stage is still runnable on its own (extract_news.py,
+sentiment_analysis.py, daily_summary.py, correlation_index.py, ...).
+
+    python run_pipeline.py [--collection financial_news] [--full-backfill] [--metrics-file run.prom]
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for phase in ("phase1_data_extraction", "phase2_sentiment_analysis", "phase3_correlation_index"):
+    sys.path.append(os.path.join(ROOT, phase))
+
+import config
+import database
+import extract_news
+import metrics
+import sentiment_analysis
+import daily_summary
+import dirty_dates
+import correlation_index
+import matching_function
+import sp500_daily_returns
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("pipeline")
+
+STATE_COLLECTION = "pipeline_state"
+
+_DONE = object()  # end-of-stream marker on the article queue
+
+
+class StageStats:
+    """Wall time, items processed and (for queue consumers) sampled queue depth of one stage."""
+
+    def __init__(self, name, unit="items"):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.started = None
+        self.finished = None
+        self.depth_samples = []
+        self.error = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def wall(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self):
+        depth = self.depth_samples
+        return {
+            "stage": self.name,
+            "wallSeconds": round(self.wall, 3),
+            "items": self.items,
+            "unit": self.unit,
+            "perSecond": round(self.items / self.wall, 2) if self.wall > 0 else None,
+            "maxQueueDepth": max(depth) if depth else None,
+            "meanQueueDepth": round(sum(depth) / len(depth), 2) if depth else None,
+            "error": self.error,
+        }
+
+
+def _run_stage(stats, fn, *args, **kwargs):
+    """Run fn inside stats' timing; exceptions are recorded and re-raised."""
+    stats.start()
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        stats.error = repr(e)
+        raise
+    finally:
+        stats.stop()
+
+
+def ingest(queries, collection_name, out_queue, stats, full_backfill=False):
+    """Producer: fetch each query, insert the new articles, queue their _ids."""
+    try:
+        for query in queries:
+            checkpoint = None if full_backfill else extract_news.load_checkpoint(query)
+            since = checkpoint.get("latestPublishedAt") if checkpoint else None
+            raw = extract_news.fetch_raw_articles(query, since=since)
+            ids = extract_news.store_articles(raw, collection_name, return_ids=True)
+            extract_news.save_checkpoint(query, raw)
+            stats.items += len(ids)
+            if ids:
+                out_queue.put(ids)  # blocks while the scorer is QUEUE_SIZE batches behind
+    finally:
+        out_queue.put(_DONE)
+
+
+def score(collection_name, in_queue, stats, batch_size=None):
+    """Consumer: score each batch of inserted _ids as it arrives."""
+    while True:
+        stats.depth_samples.append(in_queue.qsize())
+        ids = in_queue.get()
+        if ids is _DONE:
+            break
+        stats.items += sentiment_analysis.score_articles(collection_name, ids, batch_size)
+
+
+def _thread(stats, target, *args, **kwargs):
+    def runner():
+        try:
+            _run_stage(stats, target, *args, **kwargs)
+        except Exception:
+            logger.exception(f"Stage '{stats.name}' failed")
+    thread = threading.Thread(target=runner, name=stats.name, daemon=True)
+    thread.start()
+    return thread
+
+
+def run_pipeline(collection_name="financial_news", queries=None, full_backfill=False,
+                 batch_size=None, load_prices=True, run=None):
+    """
+    Run every stage once and return the per-stage report. `run`, the dict
+    yielded by metrics.recorded_run, receives the report even if a stage fails.
+    """
+    queries = queries or extract_news.MACRO_QUERIES
+    run_started = datetime.now(timezone.utc)
+
+    stages = {name: StageStats(name, unit) for name, unit in [
+        ("ingest", "articles inserted"), ("prices", "return dates"), ("sentiment", "articles scored"),
+        ("backlog", "articles scored"), ("summary", "days changed"),
+        ("correlation", "days"), ("matching", "days"),
+    ]}
+
+    # 1) Ingest and price loading in the background; score batches as they arrive
+    articles = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    threads = [_thread(stages["ingest"], ingest, queries, collection_name, articles,
+                       stages["ingest"], full_backfill)]
+    if load_prices:
+        def prices():
+            stages["prices"].items = len(sp500_daily_returns.load_returns())
+        threads.append(_thread(stages["prices"], prices))
+
+    _run_stage(stages["sentiment"], score, collection_name, articles, stages["sentiment"], batch_size)
+    for thread in threads:
+        thread.join()
+
+    # 2) Anything left unscored from earlier runs (or whose claim was lost)
+    stages["backlog"].items = _run_stage(
+        stages["backlog"], sentiment_analysis.analyze_and_update_articles, collection_name, batch_size
+    )
+
+    # 3) Fold newly scored articles into the daily totals, marking their days dirty
+    daily_summary.ensure_indexes(collection_name)
+    folded = _run_stage(stages["summary"], daily_summary.fold_pending_articles, collection_name)
+    stages["summary"].items = len(folded)
+
+    # 4) Correlation and matching only for days whose sentiment or return changed
+    changed = sorted(dirty_dates.pending("correlation"))
+    if changed:
+        _run_stage(stages["correlation"], correlation_index.compute_correlation_index)
+        stages["correlation"].items = len(changed)
+    else:
+        logger.info("No changed days; skipping correlation")
+    to_match = dirty_dates.pending("match")
+    if to_match:
+        _run_stage(stages["matching"], matching_function.compute_return_sentiment_match)
+        stages["matching"].items = len(to_match)
+    else:
+        logger.info("No changed correlation entries; skipping matching")
+
+    report = [s.as_dict() for s in stages.values() if s.started is not None]
+    _print_report(report)
+    for s in report:
+        metrics.gauge("stage_wall_seconds", s["wallSeconds"], stage=s["stage"])
+        if s["perSecond"] is not None:
+            metrics.gauge("stage_items_per_second", s["perSecond"], stage=s["stage"])
+
+    # Completion marker: readers (e.g. the dashboard API) invalidate caches on a new finishedAt
+    database.db[STATE_COLLECTION].update_one(
+        {"_id": "last_run"},
+        {"$set": {
+            "startedAt": run_started.isoformat(),
+            "finishedAt": datetime.now(timezone.utc).isoformat(),
+            "collection": collection_name,
+            "changedDates": changed,
+            "stages": report,
+        }},
+        upsert=True
+    )
+    if run is not None:
+        run.update(collection=collection_name, changedDates=len(changed), stages=report)
+    failed = [s["stage"] for s in report if s["error"]]
+    if failed:
+        raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+    return report
+
+
+def _print_report(report):
+    logger.info(f"{'stage':<12}{'wall s':>9}{'items':>9}{'/s':>10}{'queue max':>11}{'queue avg':>11}")
+    for s in report:
+        logger.info(
+            f"{s['stage']:<12}{s['wallSeconds']:>9.2f}{s['items']:>9}"
+            f"{s['perSecond'] if s['perSecond'] is not None else '-':>10}"
+            f"{s['maxQueueDepth'] if s['maxQueueDepth'] is not None else '-':>11}"
+            f"{s['meanQueueDepth'] if s['meanQueueDepth'] is not None else '-':>11}"
+            + (f"  FAILED: {s['error']}" if s['error'] else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ingest → sentiment → summary → correlation → matching")
+    parser.add_argument("--collection", default="financial_news")
+    parser.add_argument("--full-backfill", action="store_true",
+                        help="ignore per-query checkpoints and request the whole lookback window")
+    parser.add_argument("--batch-size", type=int, default=None, help="sentiment inference batch size")
+    parser.add_argument("--skip-prices", action="store_true", help="don't refresh S&P 500 returns")
+    parser.add_argument("--metrics-file", help="also write the run's metrics here in Prometheus text format")
+    args = parser.parse_args()
+    with metrics.recorded_run("pipeline") as run:
+        try:
+            run_pipeline(args.collection, full_backfill=args.full_backfill,
+                         batch_size=args.batch_size, load_prices=not args.skip_prices, run=run)
+        finally:
+            if args.metrics_file:
+                with open(args.metrics_file, "w") as f:
+                    f.write(metrics.to_prometheus())
@@ -0,0 +1,126 @@
+"""
+Offline tests for phase3_correlation_index/sp500_daily_returns.py: a fake
+downloader stands in for yfinance, mongomock for Atlas and a tmp directory
+for the parquet cache.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+import replay  # pins the offline environment before any pipeline import
+
+import dirty_dates
+import sp500_daily_returns as prices
+
+
+class FakeDownloader:
+    """yfinance-shaped bars from replay.synthetic_prices, recording each (start, end) asked for."""
+
+    def __init__(self, revise=None):
+        self.calls = []
+        self.revise = revise or {}  # {"YYYY-MM-DD": close} overrides
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((start, end))
+        bars = replay.synthetic_prices(ticker, start, end)
+        for date, close in self.revise.items():
+            bars.loc[bars.index == pd.Timestamp(date), "Close"] = close
+        return bars
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(prices, "CACHE_DIR", tmp_path / "price_cache")
+    return replay.use_database()
+
+
+EMPTY = pd.DataFrame(columns=["Date"] + prices.PRICE_COLUMNS + ["Return"])  # as load_cache returns
+
+
+def bars(dates, closes):
+    return pd.DataFrame({"Date": dates, **{c: np.nan for c in prices.PRICE_COLUMNS}, "Close": closes})
+
+
+def test_merge_tail_recomputes_overlap_and_keeps_unchanged_rows_out():
+    cached, _ = prices.merge_tail(
+        EMPTY,
+        bars(["2025-01-02", "2025-01-03", "2025-01-06"], [100.0, 101.0, 102.0]),
+    )
+    # The last cached bar comes back revised, followed by a new day
+    fresh = bars(["2025-01-03", "2025-01-06", "2025-01-07"], [101.0, 103.0, 103.0])
+
+    history, changed = prices.merge_tail(cached, fresh)
+
+    assert list(history["Date"]) == ["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"]
+    assert list(changed["Date"]) == ["2025-01-06", "2025-01-07"]
+    returns = dict(zip(history["Date"], history["Return"]))
+    assert np.isnan(returns["2025-01-02"])
+    assert returns["2025-01-03"] == pytest.approx(0.01)
+    assert returns["2025-01-06"] == pytest.approx(103.0 / 101.0 - 1)
+    assert returns["2025-01-07"] == pytest.approx(0.0)
+
+
+def test_merge_tail_without_fresh_bars_changes_nothing():
+    cached, _ = prices.merge_tail(EMPTY, bars(["2025-01-02"], [100.0]))
+    history, changed = prices.merge_tail(cached, bars([], []))
+    assert history is cached
+    assert changed.empty
+
+
+def test_cold_load_fetches_the_lookback_window(db):
+    download = FakeDownloader()
+    dates = prices.load_returns(downloader=download, lookback_days=30, today=datetime(2025, 3, 14))
+
+    assert download.calls == [("2025-02-12", "2025-03-14")]
+    assert dates == sorted(dates) and dates[0] == "2025-02-12" and dates[-1] == "2025-03-13"
+    assert db["sp500_daily_returns"].count_documents({}) == len(dates)
+    assert prices.load_cache(prices.SP500_TICKER)["Date"].tolist() == dates
+
+
+def test_warm_load_fetches_only_from_the_last_cached_day(db):
+    download = FakeDownloader()
+    first = prices.load_returns(downloader=download, lookback_days=30, today=datetime(2025, 3, 14))
+    before = db["sp500_daily_returns"].find_one({"Date": "2025-03-12"})
+
+    dates = prices.load_returns(downloader=download, today=datetime(2025, 3, 19))
+
+    # The last cached bar (2025-03-13) is re-fetched; it is unchanged, so it isn't rewritten
+    assert download.calls[-1] == ("2025-03-13", "2025-03-19")
+    assert dates == ["2025-03-14", "2025-03-17", "2025-03-18"]
+    assert db["sp500_daily_returns"].find_one({"Date": "2025-03-12"}) == before
+    assert db["sp500_daily_returns"].count_documents({}) == len(first) + 3
+
+    # A cache that is already current makes no request at all
+    assert prices.load_returns(downloader=download, today=datetime(2025, 3, 18)) == []
+    assert len(download.calls) == 2
+
+
+def test_upsert_writes_only_changed_rows_and_marks_them_dirty(db, capsys):
+    prices.load_returns(downloader=FakeDownloader(), lookback_days=30, today=datetime(2025, 3, 14))
+    # Pretend correlation and matching caught up with every day loaded so far
+    dirty_dates.mark_done("correlation", dirty_dates.pending("correlation"))
+    dirty_dates.mark_done("match", dirty_dates.pending("match"))
+
+    # yfinance revises the last cached bar (a partial day) and adds one more day
+    dates = prices.load_returns(downloader=FakeDownloader(revise={"2025-03-13": 5000.0}),
+                                today=datetime(2025, 3, 15))
+
+    assert dates == ["2025-03-13", "2025-03-14"]
+    assert "upserted 2 rows" in capsys.readouterr().out
+    doc = db["sp500_daily_returns"].find_one({"Date": "2025-03-13"})
+    assert doc["Close"] == 5000.0
+    assert set(dirty_dates.pending("correlation")) == set(dates)
+
+
+def test_other_tickers_do_not_mark_dates_dirty(db):
+    prices.load_returns("^IXIC", "nasdaq_daily_returns", downloader=FakeDownloader(),
+                        lookback_days=10, today=datetime(2025, 3, 14))
+    assert db["nasdaq_daily_returns"].count_documents({}) > 0
+    assert dirty_dates.pending("correlation") == {}